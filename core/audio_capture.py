@@ -0,0 +1,406 @@
+import threading
+import time
+from math import ceil, gcd
+
+import numpy as np
+import sounddevice as sd
+from scipy.signal import resample_poly
+
+
+class AudioRingBuffer:
+    """单生产者/单消费者的预分配环形缓冲区
+
+    生产者（音频回调）只修改 write_pos，消费者（混音线程）只修改 read_pos，
+    两个计数器单调递增，因此读写双方都不需要加锁。
+    """
+
+    def __init__(self, capacity, channels, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.buffer = np.zeros((self.capacity, channels), dtype=dtype)
+        self.write_pos = 0
+        self.read_pos = 0
+
+    @property
+    def available(self):
+        return self.write_pos - self.read_pos
+
+    @property
+    def free(self):
+        return self.capacity - self.available
+
+    def write(self, data):
+        # 只写入剩余空间能容纳的部分，返回实际写入的帧数
+        frames = min(len(data), self.free)
+        if frames <= 0:
+            return 0
+
+        start = self.write_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        self.buffer[start:start + first] = data[:first]
+        if frames > first:
+            self.buffer[:frames - first] = data[first:frames]
+
+        # 数据写完之后再推进写指针
+        self.write_pos += frames
+        return frames
+
+    def read(self, frames, out):
+        # 读取到 out 中，返回实际读取的帧数
+        frames = min(frames, self.available)
+        if frames <= 0:
+            return 0
+
+        start = self.read_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if frames > first:
+            out[first:frames] = self.buffer[:frames - first]
+
+        self.read_pos += frames
+        return frames
+
+    def skip(self, frames):
+        # 丢弃最旧的数据
+        frames = min(frames, self.available)
+        self.read_pos += frames
+        return frames
+
+
+class AudioSource:
+    """以回调模式运行的输入设备，采集数据写入自己的环形缓冲区
+
+    未指定采样率和通道数时使用设备的原生参数，避免驱动层重采样或打开失败。
+    """
+
+    def __init__(self, name, device, samplerate=None, channels=None, buffer_seconds=2.0,
+                 data_ready=None):
+        self.name = name
+        self.device = device
+        if samplerate is None or channels is None:
+            info = sd.query_devices(device, 'input')
+            if samplerate is None:
+                samplerate = int(info['default_samplerate'])
+            if channels is None:
+                channels = max(1, min(2, int(info['max_input_channels'])))
+        self.samplerate = samplerate
+        self.channels = channels
+        self.ring = AudioRingBuffer(samplerate * buffer_seconds, channels)
+        self.data_ready = data_ready
+
+        # 统计计数
+        self.overflow_count = 0      # 环形缓冲区已满，回调数据被丢弃的次数
+        self.overflow_frames = 0
+        self.underflow_count = 0     # 混音时数据不足、补零的次数
+        self.underflow_frames = 0
+        self.driver_overflow_count = 0  # 驱动层报告的输入溢出次数
+
+        self.stream = sd.InputStream(
+            samplerate=samplerate,
+            channels=channels,
+            device=device,
+            dtype='float32',
+            callback=self._callback
+        )
+
+    def _callback(self, indata, frames, time_info, status):
+        # 运行在音频驱动线程中，只做内存拷贝和计数
+        if status.input_overflow:
+            self.driver_overflow_count += 1
+
+        written = self.ring.write(indata)
+        if written < frames:
+            self.overflow_count += 1
+            self.overflow_frames += frames - written
+
+        if self.data_ready is not None:
+            self.data_ready.set()
+
+    @property
+    def latency(self):
+        # 驱动报告的输入延迟（秒）
+        return self.stream.latency if self.stream is not None else 0.0
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        # 可重复调用，异常退出时清理代码会再调用一次
+        if self.stream is None:
+            return
+        stream, self.stream = self.stream, None
+        stream.stop()
+        stream.close()
+
+    def get_stats(self):
+        return {
+            'overflows': self.overflow_count,
+            'overflow_frames': self.overflow_frames,
+            'underflows': self.underflow_count,
+            'underflow_frames': self.underflow_frames,
+            'driver_overflows': self.driver_overflow_count,
+        }
+
+
+class StreamResampler:
+    """流式多相重采样
+
+    每次用 resample_poly 处理带前后重叠的片段，只保留不受边界影响的中间部分，
+    结果与整段一次性重采样完全一致。需要向后看 pad 个输入样本。
+    """
+
+    def __init__(self, src_rate, dst_rate, channels):
+        divisor = gcd(int(src_rate), int(dst_rate))
+        self.up = int(dst_rate) // divisor
+        self.down = int(src_rate) // divisor
+        self.channels = channels
+        self.passthrough = self.up == self.down
+
+        # resample_poly 默认滤波器半长为 10 * max(up, down) 个上采样点，换算成输入样本并对齐到 down
+        half_length = ceil(10 * max(self.up, self.down) / self.up) + 1
+        self.pad = ceil(half_length / self.down) * self.down
+        self._buffer = np.zeros((self.pad, channels), dtype=np.float32)
+
+    @property
+    def pending(self):
+        # 已输入但尚未输出的样本数（按输出采样率换算）
+        if self.passthrough:
+            return 0.0
+        return (len(self._buffer) - self.pad) * self.up / self.down
+
+    def process(self, data):
+        if self.passthrough:
+            return data
+        buffer = np.concatenate([self._buffer, data])
+        usable = (len(buffer) - 2 * self.pad) // self.down * self.down
+        if usable <= 0:
+            self._buffer = buffer
+            return np.zeros((0, self.channels), dtype=np.float32)
+
+        resampled = resample_poly(buffer[:usable + 2 * self.pad], self.up, self.down, axis=0)
+        start = self.pad * self.up // self.down
+        output = resampled[start:start + usable * self.up // self.down]
+        self._buffer = buffer[usable:]
+        return output.astype(np.float32)
+
+
+class DriftCompensator:
+    """根据缓冲区水位估计时钟漂移
+
+    与参考设备的水位差经过平滑后，若偏离启动时的基线超过容差，
+    每个数据块多读或少读一个样本来抵消漂移。
+    """
+
+    def __init__(self, samplerate, tolerance_ms=2.0, smoothing=0.05, warmup_blocks=20):
+        self.samplerate = samplerate
+        self.tolerance = samplerate * tolerance_ms / 1000
+        self.smoothing = smoothing
+        self.warmup_blocks = warmup_blocks
+        self.level = None
+        self.baseline = None
+        self.blocks = 0
+        self.corrected_samples = 0
+
+    def update(self, difference):
+        """difference 为本设备与参考设备的水位差（样本），返回本块需额外读取的样本数"""
+        if self.level is None:
+            self.level = float(difference)
+        else:
+            self.level += self.smoothing * (difference - self.level)
+
+        self.blocks += 1
+        if self.blocks < self.warmup_blocks:
+            return 0
+        if self.baseline is None:
+            self.baseline = self.level
+            return 0
+
+        error = self.level - self.baseline
+        if error > self.tolerance:
+            # 本设备时钟偏快，多消费一个样本
+            self.corrected_samples += 1
+            return 1
+        if error < -self.tolerance:
+            self.corrected_samples -= 1
+            return -1
+        return 0
+
+    @property
+    def drift_ms(self):
+        if self.level is None or self.baseline is None:
+            return 0.0
+        return (self.level - self.baseline) * 1000 / self.samplerate
+
+
+def _fit_length(data, length):
+    # 线性插值把数据块拉伸或压缩到指定长度，用于吸收单个样本的漂移修正
+    if len(data) == length:
+        return data
+    source = np.linspace(0, len(data) - 1, length)
+    positions = np.arange(len(data))
+    return np.stack([np.interp(source, positions, data[:, c]) for c in range(data.shape[1])],
+                    axis=1).astype(np.float32)
+
+
+def _convert_channels(data, channels):
+    # 单声道复制到各声道，多声道取前几个声道
+    if data.shape[1] == channels:
+        return data
+    if data.shape[1] == 1:
+        return np.repeat(data, channels, axis=1)
+    return data[:, :channels]
+
+
+class AudioMixer:
+    """从各设备的环形缓冲区中取出数据，统一到会话采样率后按音量混音
+
+    每个设备以原生采样率采集，在混音线程中重采样到会话采样率。
+    第一个设备根据单调时钟做漂移补偿，使输出样本数与真实时间一致，
+    其余设备根据与第一个设备的水位差做漂移补偿。
+    慢设备超时后按欠载补零，补零对应的迟到样本到达后丢弃，各路之间不会留下偏移。
+    """
+
+    def __init__(self, sources, volumes, block_size, samplerate, channels, data_ready,
+                 clock=time.monotonic_ns):
+        self.sources = sources
+        self.volumes = volumes
+        self.block_size = block_size
+        self.samplerate = samplerate
+        self.channels = channels
+        self.data_ready = data_ready
+        self.clock = clock
+        self.aligned = False
+
+        # 第一个对齐样本的采集时刻（clock 的纳秒读数），以及返回的最近一块的起始时刻
+        self.start_ns = None
+        self.block_start_ns = None
+        self.samples_read = 0
+
+        self.resamplers = [
+            StreamResampler(source.samplerate, samplerate, channels) for source in sources
+        ]
+        # 会话采样率下的各设备缓冲
+        self.tracks = [AudioRingBuffer(samplerate * 2, channels) for _ in sources]
+        self.compensators = [DriftCompensator(samplerate) for _ in sources]
+        # 超时补零的样本数：这些样本之后才到达，到达后丢弃，否则这一路会整体向后错开
+        self.late_frames = [0] * len(sources)
+        self._scratch = [
+            np.zeros((source.ring.capacity, source.channels), dtype=np.float32)
+            for source in sources
+        ]
+        self._block = np.zeros((block_size + 1, channels), dtype=np.float32)
+
+        # 等待最慢设备的最长时间，超时后按欠载处理
+        self.max_wait = 2 * block_size / samplerate
+
+    def _pull(self):
+        # 取出各设备的全部新数据，转换通道并重采样
+        for source, resampler, track, scratch in zip(
+                self.sources, self.resamplers, self.tracks, self._scratch):
+            frames = source.ring.read(source.ring.available, scratch)
+            if frames:
+                data = resampler.process(_convert_channels(scratch[:frames], self.channels))
+                if track.write(data) < len(data):
+                    source.overflow_count += 1
+
+    def _level(self, index):
+        # 水位 = 可读样本 + 重采样器中尚未输出的样本，消除重采样分段带来的抖动
+        return self.tracks[index].available + self.resamplers[index].pending
+
+    def _align(self, force=False):
+        # 各设备启动时刻不同，丢弃多出的数据使所有来源从同一时刻开始
+        # force 为真时不再等待还没有数据的设备
+        started = [i for i, track in enumerate(self.tracks) if track.available > 0]
+        if len(started) < len(self.tracks) and not force:
+            return False
+        levels = {i: self._level(i) for i in started}
+        start = min(levels.values(), default=0)
+        for i, level in levels.items():
+            self.tracks[i].skip(int(round(level - start)))
+        # 缓冲中的样本是最近 start 个采样周期内采集的，再减去驱动的输入延迟
+        latency = getattr(self.sources[0], 'latency', 0.0) or 0.0
+        self.start_ns = self.clock() - int((start / self.samplerate + latency) * 1e9)
+        self.aligned = True
+        return True
+
+    def _clock_difference(self):
+        # 参考设备的水位与按时钟计算的水位（应采集样本数 - 已输出样本数）之差
+        expected = (self.clock() - self.start_ns) * self.samplerate / 1e9 - self.samples_read
+        return self._level(0) - expected
+
+    def _fresh(self, index):
+        # 可读样本中扣除已经补过零的迟到样本
+        return self.tracks[index].available - self.late_frames[index]
+
+    def _ready(self):
+        return all(self._fresh(i) >= self.block_size + 1 for i in range(len(self.tracks)))
+
+    def read_block(self, should_continue):
+        """返回一个混音后的数据块，should_continue() 为假时返回 None"""
+        blocks = self.read_tracks(should_continue)
+        if blocks is None:
+            return None
+        return self.mix(blocks)
+
+    def mix(self, blocks):
+        # 按音量把 read_tracks() 返回的各路数据块混合成一块
+        mixed = blocks[0] * self.volumes[0]
+        for block, volume in zip(blocks[1:], self.volumes[1:]):
+            mixed += block * volume
+        return mixed
+
+    def read_tracks(self, should_continue):
+        """返回各设备对齐后的数据块列表（未乘音量），should_continue() 为假时返回 None"""
+        deadline = None
+        while should_continue():
+            self._pull()
+            if not self.aligned:
+                self._align()
+            if self.aligned and self._ready():
+                break
+
+            # 任一设备已有完整数据块时开始计时，超时后不再等待慢设备
+            if deadline is None and any(
+                    self._fresh(i) >= self.block_size for i in range(len(self.tracks))):
+                deadline = time.monotonic() + self.max_wait
+            if deadline is not None and time.monotonic() >= deadline:
+                if not self.aligned:
+                    self._align(force=True)
+                break
+
+            self.data_ready.wait(0.01)
+            self.data_ready.clear()
+        else:
+            return None
+
+        blocks = []
+        for index, track in enumerate(self.tracks):
+            if self.late_frames[index]:
+                self.late_frames[index] -= track.skip(self.late_frames[index])
+        self.block_start_ns = self.start_ns + int(self.samples_read * 1e9 / self.samplerate)
+        reference = self._level(0)
+        for index, (source, track, compensator) in enumerate(zip(
+                self.sources, self.tracks, self.compensators)):
+            if index == 0:
+                difference = self._clock_difference()
+            else:
+                difference = self._level(index) - reference
+            wanted = self.block_size + compensator.update(difference)
+
+            frames = track.read(wanted, self._block)
+            if frames < wanted:
+                source.underflow_count += 1
+                source.underflow_frames += wanted - frames
+                self.late_frames[index] += wanted - frames
+                self._block[frames:wanted] = 0
+            blocks.append(_fit_length(self._block[:wanted], self.block_size).copy())
+        self.samples_read += self.block_size
+        return blocks
+
+    def get_drift(self):
+        # 第一个设备相对时钟、其余设备相对第一个设备的漂移（毫秒）和累计修正样本数
+        return {
+            source.name: (compensator.drift_ms, compensator.corrected_samples)
+            for source, compensator in zip(self.sources, self.compensators)
+        }
+
@@ -0,0 +1,167 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import sounddevice as sd
+from PySide6.QtCore import QObject, Signal
+
+# 名称中包含这些关键字的输入设备视为系统声音（回环/立体声混音/PulseAudio 监听）
+SYSTEM_AUDIO_KEYWORDS = ('WASAPI', 'Loopback', 'Stereo Mix', '立体声混音', 'Monitor of')
+
+
+@dataclass
+class AudioDevice:
+    key: str            # "主机API:设备名"，设备插拔后索引会变化，名称不变
+    index: int
+    name: str
+    hostapi: str
+    channels: int
+    samplerate: int
+
+    @property
+    def label(self):
+        return f"{self.name} ({self.hostapi})"
+
+    @property
+    def is_system_audio(self):
+        return any(keyword in self.name for keyword in SYSTEM_AUDIO_KEYWORDS)
+
+
+class AudioDeviceRegistry(QObject):
+    """音频输入设备注册表
+
+    设备列表在后台线程中构建并缓存，按 "主机API:设备名" 查找，录制开始时不再枚举设备。
+    PortAudio 只在初始化时枚举设备，refresh()（用户点击刷新）重新初始化 PortAudio 以发现插拔的设备，
+    列表变化时发出 devices_changed。枚举和打开音频流在同一把锁内进行；open_streams() 打开的流
+    关闭后要调用 streams_closed()，有流打开时不重新初始化，推迟到最后一个流关闭后再做。
+    """
+
+    devices_changed = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self._devices = {}
+        self._default_key = None
+        self._lock = threading.Lock()
+        self._device_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._refreshing = False
+        self._open_streams = 0
+        self._reinitialize_pending = False
+
+    @property
+    def devices(self):
+        return list(self._devices.values())
+
+    def start(self):
+        # 首次构建不需要重新初始化 PortAudio
+        return self._start_refresh(reinitialize=False)
+
+    def refresh(self):
+        """后台重新初始化 PortAudio 并枚举设备，正在刷新时直接返回 False"""
+        return self._start_refresh(reinitialize=True)
+
+    def _start_refresh(self, reinitialize):
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            # 刷新期间 wait_ready() 阻塞，打开音频流前先等列表就绪
+            self._ready.clear()
+        threading.Thread(target=self._refresh, args=(reinitialize,),
+                         name="AudioDeviceRefresh", daemon=True).start()
+        return True
+
+    @contextmanager
+    def open_streams(self, timeout=3.0):
+        """打开音频流时持有：等待设备列表就绪，期间不会重新枚举设备
+
+        进入后即计为有流打开，无论是否真的打开成功，之后都要调用一次 streams_closed()。
+        """
+        self.wait_ready(timeout)
+        with self._device_lock:
+            self._open_streams += 1
+            yield
+
+    def streams_closed(self):
+        """open_streams() 打开的流已全部停止；期间被推迟的重新初始化此时补做"""
+        with self._device_lock:
+            self._open_streams = max(0, self._open_streams - 1)
+            pending = self._open_streams == 0 and self._reinitialize_pending
+        if pending:
+            self.refresh()
+
+    def _refresh(self, reinitialize):
+        try:
+            with self._device_lock:
+                if reinitialize and self._open_streams:
+                    # 重新初始化会使打开的音频流失效，先只重新读取设备列表
+                    self._reinitialize_pending = True
+                elif reinitialize:
+                    self._reinitialize_pending = False
+                    sd._terminate()
+                    sd._initialize()
+                devices, default_key = self._scan()
+            changed = (
+                {key: device.index for key, device in devices.items()} !=
+                {key: device.index for key, device in self._devices.items()} or
+                default_key != self._default_key
+            )
+            self._devices = devices
+            self._default_key = default_key
+            if changed:
+                self.devices_changed.emit()
+        except Exception as e:
+            print(f"枚举音频设备失败: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+            self._ready.set()
+
+    def _scan(self):
+        hostapis = [api['name'] for api in sd.query_hostapis()]
+        devices = {}
+        for index, info in enumerate(sd.query_devices()):
+            if info['max_input_channels'] <= 0:
+                continue
+            hostapi = hostapis[info['hostapi']]
+            key = f"{hostapi}:{info['name']}"
+            if key in devices:
+                continue
+            devices[key] = AudioDevice(
+                key=key,
+                index=index,
+                name=info['name'],
+                hostapi=hostapi,
+                channels=int(info['max_input_channels']),
+                samplerate=int(info['default_samplerate']),
+            )
+
+        default_key = None
+        default_index = sd.default.device[0]
+        for device in devices.values():
+            if device.index == default_index:
+                default_key = device.key
+        return devices, default_key
+
+    def wait_ready(self, timeout=3.0):
+        return self._ready.wait(timeout)
+
+    def get(self, key):
+        return self._devices.get(key) if key else None
+
+    def default_input(self):
+        return self.get(self._default_key)
+
+    def system_devices(self):
+        return [device for device in self._devices.values() if device.is_system_audio]
+
+    def input_devices(self):
+        return [device for device in self._devices.values() if not device.is_system_audio]
+
+    def resolve(self, key, fallback):
+        """返回 key 对应的设备；未指定或已不可用时返回 fallback() 的结果并给出提示"""
+        device = self.get(key)
+        if device is None and key:
+            print(f"音频设备 {key} 不可用，改用自动选择")
+        return device if device is not None else fallback()
@@ -0,0 +1,152 @@
+import numpy as np
+from scipy.signal import butter, sosfilt, lfilter
+
+
+class StreamingDSP:
+    """流式人声增强：带通滤波 + 分帧噪声门 + 动态范围压缩
+
+    滤波器系数只设计一次，滤波器状态、分帧历史和压缩器包络都在块之间延续，
+    因此无论音频是整段送入还是分成任意小块送入，输出都完全相同。
+    分帧噪声门需要向后看 3 个跳步，process() 返回的样本会相应滞后，
+    录制结束时调用 flush() 取出剩余样本。
+    """
+
+    FRAME_LENGTH = 512
+    HOP_LENGTH = FRAME_LENGTH // 4
+
+    def __init__(self, sample_rate, channels, strength=0.5,
+                 low_cutoff=300, high_cutoff=3400):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.strength = strength
+
+        # 人声频率范围的 6 阶巴特沃斯带通滤波器（二阶节形式，数值更稳定）
+        self.sos = butter(6, [low_cutoff, high_cutoff], btype='band',
+                          fs=sample_rate, output='sos')
+
+        # 周期汉宁窗，跳步为帧长 1/4 时各位置的窗函数之和为常数
+        hop = self.HOP_LENGTH
+        self.window = np.hanning(self.FRAME_LENGTH + 1)[:-1].astype(np.float32)
+        self.window_norm = self.window.reshape(-1, hop).sum(axis=0)
+        # 预先归一化的 4 段窗函数，形状便于和 (跳步, 样本, 通道) 广播
+        self._window_segments = (
+            self.window.reshape(-1, hop) / self.window_norm
+        )[:, None, :, None]
+
+        # 压缩器：短时包络跟踪电平，长时包络作为自适应阈值的参考
+        self.short_coeff = np.exp(-1.0 / (0.01 * sample_rate))
+        self.long_coeff = np.exp(-1.0 / (0.5 * sample_rate))
+
+        self.reset()
+
+    def reset(self):
+        hop = self.HOP_LENGTH
+        self._sos_zi = np.zeros((self.sos.shape[0], 2, self.channels))
+        self._short_zi = np.zeros((1, self.channels))
+        self._long_zi = np.zeros((1, self.channels))
+        # 开头视为 3 个跳步的静音，作为第一帧之前的历史
+        self._pending = np.zeros((3 * hop, self.channels), dtype=np.float32)
+        self._samples_in = 0
+        self._samples_out = 0
+
+    @property
+    def latency(self):
+        # 尚未输出的样本数
+        return self._samples_in - self._samples_out
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        self._samples_in += len(block)
+
+        # 1. 带通滤波，延续上一块的滤波器状态
+        filtered, self._sos_zi = sosfilt(self.sos, block, axis=0, zi=self._sos_zi)
+        buffer = np.concatenate([self._pending, filtered.astype(np.float32)])
+
+        # 2. 分帧噪声门
+        output, consumed = self._gate(buffer)
+        self._pending = buffer[consumed:]
+        if not len(output):
+            return output
+
+        # 3. 动态范围压缩
+        output = self._compress(output)
+        self._samples_out += len(output)
+        return output
+
+    def flush(self):
+        # 补足向后看所需的静音，取出剩余的全部样本
+        remaining = self.latency
+        if remaining <= 0:
+            return np.zeros((0, self.channels), dtype=np.float32)
+
+        hop = self.HOP_LENGTH
+        padding = 3 * hop + (-len(self._pending)) % hop
+        buffer = np.concatenate([
+            self._pending,
+            np.zeros((padding, self.channels), dtype=np.float32)
+        ])
+        output, _ = self._gate(buffer)
+        output = self._compress(output[:remaining])
+        self._samples_out += len(output)
+        self._pending = np.zeros((3 * self.HOP_LENGTH, self.channels), dtype=np.float32)
+        return output
+
+    def _gate(self, buffer):
+        """对 buffer 中已凑齐前后帧的跳步应用噪声门，返回 (输出, 可丢弃的样本数)"""
+        hop = self.HOP_LENGTH
+        num_hops = len(buffer) // hop
+        # buffer 开头 3 个跳步是历史，第 r 个跳步需要第 r-3..r 帧，第 r 帧向后覆盖到 r+3
+        num_out = num_hops - 6
+        if num_out <= 0:
+            return np.zeros((0, self.channels), dtype=np.float32), 0
+
+        # 按跳步切分的视图 (跳步, 跳步内样本, 通道)，两个通道一起处理
+        hops = buffer[:num_hops * hop].reshape(num_hops, hop, self.channels)
+
+        # 帧能量 = 连续 4 个跳步的能量之和，避免重复计算重叠部分
+        hop_energy = np.einsum('ijk,ijk->ik', hops, hops)
+        frame_energy = (hop_energy[:-3] + hop_energy[1:-2] +
+                        hop_energy[2:-1] + hop_energy[3:]) / self.FRAME_LENGTH
+        noise_threshold = (np.sqrt(frame_energy) * 0.1)[:, None, :]
+
+        # 每个输出跳步被 4 帧覆盖，第 m 段窗函数对应第 r-m 帧，直接求和完成重叠相加
+        magnitude = np.abs(hops[3:3 + num_out])
+        gain = np.zeros_like(magnitude)
+        for m in range(4):
+            threshold = noise_threshold[3 - m:3 - m + num_out]
+            gain += self._window_segments[m] / (1.0 + np.exp((threshold - magnitude) * 10))
+        gain = gain.reshape(-1, self.channels)
+
+        # 按降噪强度混合原始信号和门限后的信号
+        strength = self.strength * 0.8  # 降低最大强度以保持自然
+        data = buffer[3 * hop:(3 + num_out) * hop]
+        output = data * ((1 - strength) + strength * gain)
+        return output.astype(np.float32), num_out * hop
+
+    def _compress(self, data):
+        # 软膝压缩，阈值跟随长时电平
+        power = data.astype(np.float64) ** 2
+        a = self.short_coeff
+        short_env, self._short_zi = lfilter([1 - a], [1, -a], power, axis=0, zi=self._short_zi)
+        a = self.long_coeff
+        long_env, self._long_zi = lfilter([1 - a], [1, -a], power, axis=0, zi=self._long_zi)
+
+        level = np.sqrt(np.maximum(short_env, 0.0))
+        threshold = np.maximum(np.sqrt(np.maximum(long_env, 0.0)) * 1.5, 1e-6)
+        ratio = 2.0
+        knee_width = threshold * 0.3
+
+        gain = np.ones_like(level)
+        knee_mask = (level > threshold - knee_width) & (level < threshold + knee_width)
+        above_mask = level >= threshold + knee_width
+
+        knee_pos = (level - (threshold - knee_width)) / (2 * knee_width)
+        gain = np.where(knee_mask, 1.0 - (1.0 - 1.0 / ratio) * knee_pos ** 2, gain)
+        above_gain = (threshold + (level - threshold) / ratio) / np.maximum(level, 1e-12)
+        gain = np.where(above_mask, above_gain, gain)
+
+        # makeup 增益并限幅防止削波
+        makeup_gain = 1.2
+        compressed = data * gain * makeup_gain
+        return np.clip(compressed, -0.95, 0.95).astype(np.float32)
+
@@ -0,0 +1,110 @@
+import queue
+import threading
+
+import numpy as np
+import soundfile as sf
+
+# 中间音频格式：名称 -> (容器格式, 编码, 扩展名)
+AUDIO_FORMATS = {
+    'flac': ('FLAC', 'PCM_16', '.flac'),
+    'opus': ('OGG', 'OPUS', '.ogg'),
+    'wav': ('WAV', 'FLOAT', '.wav'),
+}
+
+# Opus 只支持这些采样率
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def _supported(audio_format):
+    file_format, subtype, _ = AUDIO_FORMATS[audio_format]
+    return file_format in sf.available_formats() and subtype in sf.available_subtypes(file_format)
+
+
+def resolve_audio_format(audio_format, samplerate):
+    """返回当前环境下可用的音频格式，不可用时回退到 FLAC，FLAC 也不可用时回退到 WAV"""
+    if audio_format not in AUDIO_FORMATS:
+        audio_format = 'flac'
+    if audio_format == 'opus':
+        if samplerate not in OPUS_SAMPLE_RATES:
+            print(f"Opus 不支持 {samplerate}Hz 采样率，改用 FLAC")
+            audio_format = 'flac'
+        elif not _supported('opus'):
+            print("当前 libsndfile 不支持 Opus，改用 FLAC")
+            audio_format = 'flac'
+    if audio_format == 'flac' and not _supported('flac'):
+        print("当前 libsndfile 不支持 FLAC，改用 WAV")
+        audio_format = 'wav'
+    return audio_format
+
+
+def audio_extension(audio_format):
+    return AUDIO_FORMATS[audio_format][2]
+
+
+class AudioWriter(threading.Thread):
+    """独立的音频写入线程
+
+    采集端只把数据块放进队列，编码和磁盘写入都在这个线程里完成，
+    数据攒够 batch_seconds 后一次性写入，减少小块写盘的开销。
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, samplerate, channels, audio_format='flac', batch_seconds=1.0):
+        super().__init__(name="AudioWriter", daemon=True)
+        self.path = path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.audio_format = audio_format
+        self.batch_frames = int(samplerate * batch_seconds)
+
+        self.queue = queue.Queue()
+        self.frames_written = 0
+        self.max_backlog = 0
+        self.error = None
+
+    def write(self, block):
+        # 不阻塞，磁盘再慢也不会影响采集
+        self.queue.put_nowait(block)
+        backlog = self.queue.qsize()
+        if backlog > self.max_backlog:
+            self.max_backlog = backlog
+
+    def close(self):
+        self.queue.put(self._STOP)
+        self.join()
+
+    def run(self):
+        file_format, subtype, _ = AUDIO_FORMATS[self.audio_format]
+        pending = []
+        pending_frames = 0
+        stopped = False
+        try:
+            with sf.SoundFile(self.path, mode='w', samplerate=self.samplerate,
+                              channels=self.channels, format=file_format,
+                              subtype=subtype) as audio_file:
+                while True:
+                    block = self.queue.get()
+                    if block is self._STOP:
+                        stopped = True
+                        break
+                    pending.append(block)
+                    pending_frames += len(block)
+                    if pending_frames >= self.batch_frames:
+                        self._flush(audio_file, pending)
+                        pending = []
+                        pending_frames = 0
+
+                if pending:
+                    self._flush(audio_file, pending)
+        except Exception as e:
+            self.error = e
+            print(f"音频写入错误: {e}")
+            # 出错后继续清空队列，保证 close() 能返回
+            while not stopped:
+                stopped = self.queue.get() is self._STOP
+
+    def _flush(self, audio_file, blocks):
+        data = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+        audio_file.write(np.clip(data, -1.0, 1.0))
+        self.frames_written += len(data)
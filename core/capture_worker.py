@@ -0,0 +1,182 @@
+import multiprocessing
+import time
+
+import mss
+import numpy as np
+
+from core.compositor import FrameCompositor
+from core.frame_layout import FrameLayout
+from core.shm_ring import SharedFrameRing
+from core.strip_engine import StripEngine
+
+
+def _capture_worker_main(ring, monitor, frame_size, fps, watermark, mouse, parallel, pixel_format, layout,
+                         zoom, privacy, origin_ns, paused_ns, divisor, region, region_version, zoom_requests,
+                         privacy_rects, privacy_version, running, stop):
+    # 在独立进程中截图并合成叠加层，合成结果直接写进共享内存槽位
+    engine = None
+    try:
+        if parallel:
+            engine = StripEngine()
+            engine.calibrate((monitor['height'], monitor['width'], 4),
+                             layout.content_size if layout is not None else frame_size)
+        compositor = FrameCompositor(frame_size, watermark, mouse, engine, pixel_format, layout, zoom, privacy)
+        sct = mss.mss()
+    except Exception as e:
+        ring.publish(None, ('error', f"{e}"))
+        return
+    ring.publish(None, ('ready', None))
+
+    frames = 0
+    dropped = 0
+    seen_version = 0
+    seen_zoom = 0
+    seen_privacy = 0
+    try:
+        while not stop.is_set():
+            # 暂停时等待主进程重新放行
+            if not running.wait(0.1):
+                continue
+            # 跟随窗口时主进程更新了采集区域：移动只改位置，大小变化时更换布局
+            if region_version.value != seen_version:
+                with region.get_lock():
+                    seen_version = region_version.value
+                    left, top, width, height, *content = region[:]
+                monitor.update(left=left, top=top, width=width, height=height)
+                followed = FrameLayout((width, height), compositor.frame_size, tuple(content))
+                if followed != compositor.layout:
+                    compositor.set_layout(followed)
+            # 快捷键切换放大倍数
+            if zoom_requests.value != seen_zoom and compositor.zoom is not None:
+                for _ in range(zoom_requests.value - seen_zoom):
+                    compositor.zoom.cycle()
+                seen_zoom = zoom_requests.value
+            # 跟随窗口的打码区域
+            if privacy_version.value != seen_privacy and compositor.privacy is not None:
+                with privacy_rects.get_lock():
+                    seen_privacy = privacy_version.value
+                    values = privacy_rects[:]
+                for index in range(len(compositor.privacy.rects)):
+                    compositor.privacy.move(index, values[index * 4:index * 4 + 4])
+            captured_ns = time.monotonic_ns()
+            grab_started = time.perf_counter()
+            raw = np.asarray(sct.grab(monitor))
+            grabbed = time.perf_counter()
+
+            # 所有槽位都在等待编码时放弃这一帧，由主进程重复上一帧补齐
+            index = ring.acquire(timeout=0.5)
+            if index is None:
+                dropped += 1
+                continue
+            _, changed = compositor.compose(raw, monitor, out=ring.frame(index))
+            composed = time.perf_counter()
+            ring.publish(index, (captured_ns, changed, grabbed - grab_started, composed - grabbed))
+            frames += 1
+
+            # 与进程内采集相同的节奏：等到下一个采集的时间格，扣除处理耗时
+            media = captured_ns - origin_ns.value - paused_ns.value
+            next_slot = int(round(media * fps / 1e9)) + 1
+            step = divisor.value
+            target_slot = -(-next_slot // step) * step
+            delay = target_slot * 1e9 / fps - (time.monotonic_ns() - origin_ns.value - paused_ns.value)
+            if delay > 0:
+                stop.wait(delay / 1e9)
+    except Exception as e:
+        ring.publish(None, ('error', f"{e}"))
+    finally:
+        sct.close()
+        if engine is not None:
+            engine.close()
+        ring.publish(None, ('done', {'frames': frames, 'dropped': dropped}))
+
+
+class CaptureWorker:
+    """把截图和叠加层合成放到工作进程中执行，帧通过共享内存环形缓冲区传回
+
+    watermark/mouse 为 FrameCompositor 的设置字典。会话时钟的起点、累计暂停时长和
+    降帧倍数通过共享变量传给工作进程，采集节奏与进程内采集一致。
+    parallel 为真时工作进程内按条带并行转换和缩放；pixel_format 为 'yuv420p' 时
+    槽位存放 I420 帧，共享内存和编码管道的数据量减半。
+    跟随窗口时主进程通过 move() 更新采集区域，工作进程每帧只比较一次版本号。
+    """
+
+    def __init__(self, monitor, frame_size, fps, watermark, mouse, parallel=False,
+                 pixel_format='bgr24', layout=None, zoom=None, privacy=None, slots=8):
+        context = multiprocessing.get_context('spawn')
+        width, height = frame_size
+        shape = (height * 3 // 2, width) if pixel_format == 'yuv420p' else (height, width, 3)
+        self.ring = SharedFrameRing(shape, slots, context=context)
+        self.origin_ns = context.Value('q', 0)
+        self.paused_ns = context.Value('q', 0)
+        self.divisor = context.Value('i', 1)
+        # 跟随窗口时的采集区域：左、上、宽、高和画面在输出帧中的位置
+        self.region = context.Array('i', 8)
+        self.region_version = context.Value('i', 0)
+        self.zoom_requests = context.Value('i', 0)   # 切换放大倍数的累计次数
+        # 打码区域的屏幕坐标，每个区域 4 个数
+        self.privacy_rects = context.Array('i', 4 * max(1, len(privacy or [])))
+        self.privacy_version = context.Value('i', 0)
+        self.running = context.Event()
+        self.stop_event = context.Event()
+        self.stats = {}
+        self.process = context.Process(
+            target=_capture_worker_main,
+            args=(self.ring, dict(monitor), tuple(frame_size), fps, watermark, mouse, parallel,
+                  pixel_format, layout, zoom, privacy, self.origin_ns, self.paused_ns, self.divisor,
+                  self.region, self.region_version, self.zoom_requests,
+                  self.privacy_rects, self.privacy_version, self.running, self.stop_event),
+            daemon=True
+        )
+
+    def start(self, timeout=15.0):
+        """启动工作进程并等待就绪，失败时抛出异常"""
+        self.process.start()
+        item = self.ring.receive(timeout=timeout)
+        if item is None:
+            raise RuntimeError("采集进程启动超时")
+        kind, message = item[1]
+        if kind != 'ready':
+            raise RuntimeError(message)
+
+    def resume(self, clock):
+        # 同步会话时钟后开始（或继续）采集
+        self.origin_ns.value = clock.origin_ns
+        self.paused_ns.value = clock.paused_ns
+        self.running.set()
+
+    def pause(self):
+        self.running.clear()
+
+    def move_privacy(self, rects):
+        """更新所有打码区域的屏幕坐标（跟随窗口）"""
+        with self.privacy_rects.get_lock():
+            self.privacy_rects[:len(rects) * 4] = [value for rect in rects for value in rect]
+            self.privacy_version.value += 1
+
+    def move(self, monitor, layout):
+        """更新采集区域和布局（跟随窗口），工作进程在截取下一帧之前读取"""
+        with self.region.get_lock():
+            self.region[:] = [monitor['left'], monitor['top'], *layout.source, *layout.content]
+            self.region_version.value += 1
+
+    def close(self, timeout=5.0):
+        """停止工作进程并释放共享内存；没有取走的帧直接丢弃"""
+        self.stop_event.set()
+        self.running.set()
+        deadline = time.monotonic() + timeout
+        while self.process.is_alive() or not self.ring.ready.empty():
+            item = self.ring.receive(timeout=max(0.0, deadline - time.monotonic()))
+            if item is None:
+                print("采集进程未能及时结束")
+                break
+            index, info = item
+            if index is not None:
+                self.ring.release(index)
+            elif info[0] == 'done':
+                self.stats = info[1]
+                break
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
+        return self.stats
@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from core.dirty_tiles import IncrementalScaler
+from core.frame_layout import plan_layout
+from core.smart_zoom import SmartZoom
+from core.privacy import PrivacyMask
+from core.window_tracker import default_backend
+
+try:
+    import winsound  # 点击音效只在 Windows 下可用
+except ImportError:
+    winsound = None
+
+
+_cursor_lock = threading.Lock()
+_cursor_backend = None
+_cursor_checked = False
+
+
+def cursor_state():
+    """返回 ((x, y), 左键是否按下)，坐标为物理像素，与 mss 的显示器坐标一致
+
+    由当前平台的窗口后端查询，后端不可用时返回 None，此时不绘制鼠标效果。
+    """
+    global _cursor_backend, _cursor_checked
+    with _cursor_lock:
+        if not _cursor_checked:
+            _cursor_backend = default_backend()
+            _cursor_checked = True
+    if _cursor_backend is None:
+        return None
+    try:
+        return _cursor_backend.cursor()
+    except Exception as e:
+        print(f"获取鼠标位置失败: {e}")
+        return None
+
+
+def _render_text(text, text_size):
+    # 文字水印只渲染一次，得到带透明通道的 BGRA 图像
+    font = ImageFont.truetype("simhei.ttf", text_size)  # 使用系统自带的黑体字体
+    bbox = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox((0, 0), text, font=font, stroke_width=1)
+    image = Image.new('RGBA', (bbox[2] - bbox[0], bbox[3] - bbox[1]), (0, 0, 0, 0))
+    ImageDraw.Draw(image).text((-bbox[0], -bbox[1]), text, font=font,
+                               fill=(255, 255, 255, 255), stroke_width=1, stroke_fill=(0, 0, 0, 255))
+    return cv2.cvtColor(np.array(image), cv2.COLOR_RGBA2BGRA)
+
+
+def _load_image(image_path, frame_height, opacity):
+    watermark = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+    if watermark is None:
+        return None
+    # 调整图片大小，高度为视频高度的 20%
+    h, w = watermark.shape[:2]
+    new_h = int(frame_height * 0.2)
+    new_w = int(w * new_h / h)
+    watermark = cv2.resize(watermark, (new_w, new_h))
+
+    # 处理图片透明度
+    if watermark.shape[2] == 4:
+        watermark[:, :, 3] = watermark[:, :, 3] * opacity
+    else:
+        watermark = cv2.cvtColor(watermark, cv2.COLOR_BGR2BGRA)
+        watermark[:, :, 3] = 255 * opacity
+    return watermark
+
+
+def _blend(frame, overlay, position):
+    # 按位置把 BGRA 图像混合到帧上，超出画面的部分裁掉
+    h, w = overlay.shape[:2]
+    if position == "左上":
+        x, y = 10, 10
+    elif position == "右上":
+        x, y = frame.shape[1] - w - 10, 10
+    elif position == "左下":
+        x, y = 10, frame.shape[0] - h - 10
+    else:  # 右下
+        x, y = frame.shape[1] - w - 10, frame.shape[0] - h - 10
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, frame.shape[1]), min(y + h, frame.shape[0])
+    if x1 <= x0 or y1 <= y0:
+        return
+    part = overlay[y0 - y:y1 - y, x0 - x:x1 - x]
+    roi = frame[y0:y1, x0:x1]
+    alpha = part[:, :, 3:4] / 255.0
+    roi[:] = roi * (1 - alpha) + part[:, :, :3] * alpha
+
+
+class FrameCompositor:
+    """把截图合成为输出帧：颜色转换和缩放（只处理变化的图块）、水印、鼠标效果
+
+    不依赖 Qt，水印和鼠标设置以普通字典传入，可以在采集工作进程中使用。
+    compose() 返回 (帧, 是否变化)，屏幕内容和叠加层都没变时为 False。
+    传入 engine（StripEngine）时整幅的转换缩放和聚光灯混合按条带并行执行。
+    pixel_format 为 'yuv420p' 时叠加层画在内部的 BGR 工作缓冲上，合成后转换为 I420 输出。
+    layout（FrameLayout）决定画面在输出帧中的位置，加黑边时缩放结果直接写在画布的对应区域；
+    不传时按第一帧的尺寸拉伸到 frame_size。鼠标位置按布局换算到输出帧。
+    zoom 为 SmartZoom 的参数字典时跟随鼠标放大，缩放之前先从截图中裁出视口。
+    privacy 为 PrivacyRegion 列表时在缩放缓冲上给这些区域打码，先于水印和鼠标效果。
+    """
+
+    def __init__(self, frame_size, watermark, mouse, engine=None, pixel_format='bgr24', layout=None,
+                 zoom=None, privacy=None):
+        self.frame_size = tuple(frame_size)
+        self.engine = engine
+        self.i420 = pixel_format == 'yuv420p'
+        self._work = None   # I420 模式下画叠加层用的 BGR 缓冲
+        self._i420 = None   # 上一次输出的 I420 帧，画面不变时直接沿用
+        self.set_layout(layout)
+
+        self.position = watermark.get('position', "右下")
+        self.text_image = None
+        if watermark.get('text'):
+            try:
+                self.text_image = _render_text(watermark['text'], watermark.get('size', 24))
+            except Exception as e:
+                print(f"渲染文字水印失败: {e}")
+        self.watermark_image = None
+        image_path = watermark.get('image_path')
+        if image_path and os.path.exists(image_path):
+            self.watermark_image = _load_image(image_path, self.frame_size[1], watermark.get('opacity', 0.5))
+
+        self.mouse = mouse
+        self.trail_points = []
+        self.last_mouse_pos = None
+        self.click_effects = []  # 点击效果的位置、开始时间和当前大小
+        self._last_overlay_state = None
+        self.zoom = SmartZoom(**zoom) if zoom is not None else None
+        self.privacy = PrivacyMask(privacy) if privacy else None
+
+    def set_layout(self, layout):
+        """更换布局（如跟随的窗口改变大小），输出尺寸不变，水印和鼠标效果的状态保留"""
+        self.layout = layout
+        self.canvas = None
+        content = None
+        if layout is not None and layout.letterboxed:
+            width, height = layout.output
+            left, top, content_width, content_height = layout.content
+            self.canvas = np.zeros((height, width, 3), dtype=np.uint8)
+            content = self.canvas[top:top + content_height, left:left + content_width]
+        content_size = layout.content_size if layout is not None else self.frame_size
+        self.scaler = IncrementalScaler(content_size, engine=self.engine, out=content)
+
+    def compose(self, raw, monitor, out=None, cursor=None):
+        """raw 为 BGRA 截图；out 为输出缓冲（如共享内存槽位），为 None 时新建"""
+        if self.layout is None:
+            self.layout = plan_layout(raw.shape[1::-1], self.frame_size, 'stretch')
+        if cursor is None:
+            cursor = cursor_state()
+        if cursor is not None:
+            (cursor_x, cursor_y), pressed = cursor
+            cursor_x -= monitor['left']
+            cursor_y -= monitor['top']
+        # 放大时只转换、缩放视口内的像素
+        crop = None
+        if self.zoom is not None and cursor is not None:
+            crop = self.zoom.update((cursor_x, cursor_y), pressed, raw.shape[1::-1])
+            if crop is not None:
+                x, y, width, height = crop
+                raw = raw[y:y + height, x:x + width]
+        frame, changed = self.scaler.update(raw)
+        if self.privacy is not None:
+            # 打码区域没有变化时跳过；origin 为送去缩放的画面左上角的屏幕坐标
+            origin = (monitor['left'] + (crop[0] if crop else 0), monitor['top'] + (crop[1] if crop else 0))
+            changed = self.privacy.apply(self.scaler, raw, origin) or changed
+        if self.canvas is not None:
+            frame = self.canvas
+        # 缩放缓冲在下一帧还要使用，叠加层画在副本上
+        target = out
+        if self.i420:
+            if self._work is None:
+                self._work = np.empty_like(frame)
+            out = self._work
+        if out is None:
+            out = frame.copy()
+        else:
+            np.copyto(out, frame)
+        frame = out
+
+        if self.text_image is not None:
+            _blend(frame, self.text_image, self.position)
+        if self.watermark_image is not None:
+            _blend(frame, self.watermark_image, self.position)
+
+        mouse_x = mouse_y = None
+        if cursor is not None:
+            mouse_x, mouse_y = self.layout.to_output(cursor_x, cursor_y, crop)
+            self._draw_mouse(frame, mouse_x, mouse_y, pressed)
+
+        # 叠加层状态用于判断最终画面是否变化
+        overlay_state = (
+            mouse_x, mouse_y,
+            tuple(self.trail_points[-20:]) if self.mouse['enable_trail'] else None,
+            tuple((effect['pos'], effect['size']) for effect in self.click_effects),
+        )
+        changed = changed or overlay_state != self._last_overlay_state
+        self._last_overlay_state = overlay_state
+        if self.i420:
+            return self._to_i420(frame, changed, target), changed
+        return frame, changed
+
+    def _to_i420(self, frame, changed, out):
+        # 写入共享内存槽位时每帧都要转换；新建输出时画面不变就沿用上一帧（编码器只读取不修改）
+        if out is not None:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420, dst=out)
+        if changed or self._i420 is None:
+            self._i420 = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420)
+        return self._i420
+
+    def _draw_mouse(self, frame, mouse_x, mouse_y, pressed):
+        mouse = self.mouse
+
+        # 处理鼠标轨迹
+        if mouse['enable_trail']:
+            if self.last_mouse_pos:
+                self.trail_points.append((self.last_mouse_pos, (mouse_x, mouse_y)))
+                del self.trail_points[:-20]  # 只保留最近的20个点
+            self.last_mouse_pos = (mouse_x, mouse_y)
+            for start, end in self.trail_points:
+                cv2.line(frame, start, end, mouse['trail_color'], mouse['trail_width'])
+
+        # 处理鼠标高亮
+        if mouse['enable_highlight']:
+            style = mouse['highlight_style']
+            size = mouse['highlight_size']
+            if style == "圆形光环":
+                cv2.circle(frame, (mouse_x, mouse_y), size, (255, 255, 255), 2)
+            elif style == "聚光灯":
+                mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+                cv2.circle(mask, (mouse_x, mouse_y), size, 255, -1)
+                spot = cv2.bitwise_and(frame, frame, mask=mask)
+                if self.engine is not None:
+                    self.engine.add_weighted(frame, 0.7, spot, 0.3, 0, dst=frame)
+                else:
+                    cv2.addWeighted(frame, 0.7, spot, 0.3, 0, dst=frame)
+            elif style == "波纹":
+                for i in range(3):
+                    ring = size - i * 10
+                    if ring > 0:
+                        cv2.circle(frame, (mouse_x, mouse_y), ring, (255, 255, 255), 1)
+
+        # 处理点击效果
+        if mouse['enable_click']:
+            if pressed:
+                self.click_effects.append({'pos': (mouse_x, mouse_y), 'time': time.time(), 'size': 0})
+                if mouse['enable_sound'] and winsound is not None:
+                    winsound.PlaySound("click.wav", winsound.SND_ASYNC)
+
+            current_time = time.time()
+            effects = []
+            for effect in self.click_effects:
+                if current_time - effect['time'] < 0.5:  # 效果持续0.5秒
+                    effect['size'] = min(effect['size'] + 2, mouse['click_size'])
+                    cv2.circle(frame, effect['pos'], effect['size'], mouse['click_color'], 2)
+                    effects.append(effect)
+            self.click_effects = effects
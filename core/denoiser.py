@@ -0,0 +1,289 @@
+import multiprocessing
+import queue
+import subprocess
+import time
+
+import numpy as np
+from scipy.ndimage import uniform_filter1d
+from scipy.signal import lfilter
+
+from core.audio_dsp import StreamingDSP
+
+
+def analysis_window(n_fft):
+    # 噪声轮廓和 SpectralGate 用同一个分析窗（平方根汉宁窗），幅度才在同一尺度上
+    return np.sqrt(np.hanning(n_fft + 1)[:-1])
+
+
+class NoiseProfile:
+    """噪声谱轮廓：每个频点的门限（dB）"""
+
+    def __init__(self, threshold_db, sample_rate, n_fft):
+        self.threshold_db = np.asarray(threshold_db, dtype=np.float64)
+        self.sample_rate = int(sample_rate)
+        self.n_fft = int(n_fft)
+
+    @classmethod
+    def from_audio(cls, audio, sample_rate, n_fft=1024, hop=256, n_std=1.5):
+        """从一段只有噪声的音频中学习门限：均值 + n_std 倍标准差"""
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.ndim == 2:
+            audio = audio.mean(axis=1)
+        if len(audio) < n_fft:
+            return None
+
+        frames = np.lib.stride_tricks.sliding_window_view(audio, n_fft)[::hop]
+        magnitude = np.abs(np.fft.rfft(frames * analysis_window(n_fft), axis=1))
+        magnitude_db = 20 * np.log10(np.maximum(magnitude, 1e-10))
+        threshold_db = magnitude_db.mean(axis=0) + n_std * magnitude_db.std(axis=0)
+        return cls(threshold_db, sample_rate, n_fft)
+
+    def resample(self, sample_rate, n_fft):
+        # 采样率或 FFT 长度不同时按频率插值
+        if sample_rate == self.sample_rate and n_fft == self.n_fft:
+            return self
+        source_freqs = np.fft.rfftfreq(self.n_fft, 1 / self.sample_rate)
+        target_freqs = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+        threshold_db = np.interp(target_freqs, source_freqs, self.threshold_db)
+        return NoiseProfile(threshold_db, sample_rate, n_fft)
+
+    def to_list(self):
+        return [self.sample_rate, self.n_fft] + self.threshold_db.tolist()
+
+    @classmethod
+    def from_list(cls, values):
+        if not values or len(values) < 3:
+            return None
+        values = [float(v) for v in values]
+        return cls(values[2:], int(values[0]), int(values[1]))
+
+
+class SpectralGate:
+    """流式 STFT 频谱门限降噪
+
+    低于噪声门限的频点按 strength 衰减，掩码在频率和时间上做平滑以减少音乐噪声。
+    接口与 StreamingDSP 相同：process() 返回已就绪的样本，结束时调用 flush()。
+    """
+
+    def __init__(self, sample_rate, channels, noise_profile, strength=0.5,
+                 n_fft=1024, hop=256, freq_smooth=5, time_smooth=0.5):
+        assert n_fft == 4 * hop
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.strength = strength
+        self.n_fft = n_fft
+        self.hop = hop
+        self.freq_smooth = freq_smooth
+        self.time_smooth = time_smooth
+
+        profile = noise_profile.resample(sample_rate, n_fft)
+        self.threshold = (10 ** (profile.threshold_db / 20))[:, None]
+
+        # 分析和合成都用平方根汉宁窗，4 倍重叠时合成后的总增益为 2
+        window = analysis_window(n_fft)
+        self.analysis_window = window[:, None]
+        self.synthesis_window = (window / 2)[:, None]
+        self.passthrough_window = (window ** 2 / 2)[:, None]
+
+        self.reset()
+
+    def reset(self):
+        hop = self.hop
+        # 开头 3 个跳步视为静音，输出时跳过对应部分
+        self._input = np.zeros((3 * hop, self.channels), dtype=np.float32)
+        self._overlap = np.zeros((3 * hop, self.channels))
+        self._mask_zi = np.zeros((1, self.n_fft // 2 + 1, self.channels))
+        self._skip = 3 * hop
+        self._samples_in = 0
+        self._samples_out = 0
+
+    @property
+    def latency(self):
+        return self._samples_in - self._samples_out
+
+    def process(self, block, bypass=False):
+        """bypass 为真时不做频谱处理，只经过同样的延迟线，保持输出连续"""
+        block = np.asarray(block, dtype=np.float32)
+        self._samples_in += len(block)
+        buffer = np.concatenate([self._input, block])
+        output, consumed = self._run(buffer, bypass)
+        self._input = buffer[consumed:]
+        return self._emit(output)
+
+    def flush(self):
+        remaining = self.latency
+        if remaining <= 0:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        padding = 3 * self.hop + (-len(self._input)) % self.hop
+        buffer = np.concatenate([
+            self._input,
+            np.zeros((padding, self.channels), dtype=np.float32)
+        ])
+        output, _ = self._run(buffer, False)
+        output = self._emit(output)
+        self._input = np.zeros((3 * self.hop, self.channels), dtype=np.float32)
+        return output
+
+    def _emit(self, output):
+        # 丢弃开头的静音预卷部分
+        if self._skip:
+            skipped = min(self._skip, len(output))
+            output = output[skipped:]
+            self._skip -= skipped
+        output = output[:max(0, self._samples_in - self._samples_out)]
+        self._samples_out += len(output)
+        return output.astype(np.float32)
+
+    def _run(self, buffer, bypass):
+        hop = self.hop
+        num_frames = (len(buffer) - self.n_fft) // hop + 1
+        if num_frames <= 0:
+            return np.zeros((0, self.channels)), 0
+
+        # (帧, 样本, 通道) 的滑动窗口视图，各通道一起处理
+        frames = np.lib.stride_tricks.sliding_window_view(
+            buffer[:(num_frames + 3) * hop], self.n_fft, axis=0)[::hop]
+        frames = frames.transpose(0, 2, 1)
+
+        if bypass:
+            synthesized = frames * self.passthrough_window
+        else:
+            spectrum = np.fft.rfft(frames * self.analysis_window, axis=1)
+            mask = (np.abs(spectrum) > self.threshold).astype(np.float64)
+            if self.freq_smooth > 1:
+                mask = uniform_filter1d(mask, self.freq_smooth, axis=1)
+            # 掩码的时间平滑状态在块之间延续
+            a = self.time_smooth
+            mask, self._mask_zi = lfilter([1 - a], [1, -a], mask, axis=0, zi=self._mask_zi)
+            gain = 1.0 - self.strength * (1.0 - mask)
+            synthesized = np.fft.irfft(spectrum * gain, n=self.n_fft, axis=1)
+            synthesized *= self.synthesis_window
+
+        # 重叠相加：每个跳步由 4 帧的不同段叠加
+        accumulated = np.zeros(((num_frames + 3) * hop, self.channels))
+        accumulated[:3 * hop] += self._overlap
+        segments = synthesized.reshape(num_frames, 4, hop, self.channels)
+        for m in range(4):
+            accumulated[m * hop:(m + num_frames) * hop] += segments[:, m].reshape(-1, self.channels)
+
+        self._overlap = accumulated[num_frames * hop:]
+        return accumulated[:num_frames * hop], num_frames * hop
+
+
+def _denoise_worker_main(input_queue, output_queue, sample_rate, channels,
+                         profile_values, strength, max_latency):
+    # 在独立进程中运行，避免和采集、界面争抢 GIL；没有噪声轮廓时运行人声滤波
+    if profile_values:
+        processor = SpectralGate(sample_rate, channels, NoiseProfile.from_list(profile_values), strength)
+    else:
+        processor = StreamingDSP(sample_rate, channels, strength)
+    output_queue.put(('ready', None, 0.0, 0.0, False))
+    while True:
+        item = input_queue.get()
+        if item is None:
+            output_queue.put(('done', processor.flush(), 0.0, 0.0, False))
+            break
+
+        submitted, block = item
+        # 积压超过延迟上限时跳过频谱处理，保证输出及时
+        bypass = profile_values is not None and time.monotonic() - submitted > max_latency
+        started = time.perf_counter()
+        output = processor.process(block, bypass=True) if bypass else processor.process(block)
+        elapsed = time.perf_counter() - started
+        output_queue.put(('block', output, elapsed, len(block) / sample_rate, bypass))
+
+
+class DenoiseWorker:
+    """把降噪放到工作进程中执行，按提交顺序取回结果
+
+    noise_profile 为 None 时工作进程运行人声滤波（StreamingDSP），否则运行频谱降噪。
+    """
+
+    def __init__(self, sample_rate, channels, noise_profile, strength=0.5, max_latency=0.5):
+        context = multiprocessing.get_context('spawn')
+        self.input_queue = context.Queue()
+        self.output_queue = context.Queue()
+        self.process = context.Process(
+            target=_denoise_worker_main,
+            args=(self.input_queue, self.output_queue, sample_rate, channels,
+                  noise_profile.to_list() if noise_profile is not None else None,
+                  strength, max_latency),
+            daemon=True
+        )
+        self.processing_time = 0.0
+        self.audio_time = 0.0
+        self.bypassed_blocks = 0
+
+    @property
+    def real_time_factor(self):
+        # 处理耗时 / 音频时长，小于 1 才能实时处理
+        if self.audio_time <= 0:
+            return 0.0
+        return self.processing_time / self.audio_time
+
+    def start(self, timeout=10.0):
+        # 等待工作进程就绪，避免启动耗时被算进处理延迟
+        self.process.start()
+        try:
+            self.output_queue.get(timeout=timeout)
+        except queue.Empty:
+            print("降噪进程启动超时")
+
+    def submit(self, block):
+        self.input_queue.put((time.monotonic(), block))
+
+    def _collect(self, item):
+        kind, output, elapsed, duration, bypassed = item
+        self.processing_time += elapsed
+        self.audio_time += duration
+        if bypassed:
+            self.bypassed_blocks += 1
+        return kind, output
+
+    def poll(self):
+        # 取回所有已处理完的数据块，不阻塞
+        results = []
+        while True:
+            try:
+                _, output = self._collect(self.output_queue.get_nowait())
+            except queue.Empty:
+                return results
+            results.append(output)
+
+    def close(self, timeout=10.0):
+        # 发送结束标记并取回剩余数据
+        self.input_queue.put(None)
+        results = []
+        while True:
+            try:
+                kind, output = self._collect(self.output_queue.get(timeout=timeout))
+            except queue.Empty:
+                print("降噪进程未能及时结束")
+                break
+            results.append(output)
+            if kind == 'done':
+                break
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        print(f"降噪进程实时率: {self.real_time_factor:.3f}, 跳过处理 {self.bypassed_blocks} 块")
+        return results
+
+
+def load_audio_span(file_path, start, end, sample_rate=44100):
+    """用 ffmpeg 解码文件中指定时间段的音频（单声道 float32）"""
+    startupinfo = None
+    if hasattr(subprocess, 'STARTUPINFO'):
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+    result = subprocess.run([
+        'ffmpeg', '-v', 'error',
+        '-ss', f'{start:.3f}', '-t', f'{max(0.0, end - start):.3f}',
+        '-i', file_path,
+        '-vn', '-ac', '1', '-ar', str(sample_rate),
+        '-f', 'f32le', '-'
+    ], capture_output=True, startupinfo=startupinfo)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', errors='ignore').strip())
+    return np.frombuffer(result.stdout, dtype=np.float32)
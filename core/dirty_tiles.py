@@ -0,0 +1,193 @@
+import threading
+
+import cv2
+import numpy as np
+
+
+class DirtyTileTracker:
+    """找出截图中与参考帧不同的图块
+
+    每帧比较全部像素行，任何一个像素的变化都在当帧发现。按图块行逐段比较：像素按 8 字节
+    一组比较，结果写进一个图块行大小、留在缓存里的缓冲，先按行、再按图块列归约，
+    不产生整幅大小的中间数组。传入 engine（StripEngine）时各图块行分给线程池并行比较。
+    参考帧只在变化的图块处更新。
+    """
+
+    def __init__(self, tile=64, engine=None):
+        self.tile = tile
+        self.engine = engine
+        self._reference = None
+        self._local = threading.local()
+
+    def reset(self):
+        self._reference = None
+
+    def _buffer(self, words):
+        # 每个线程一个图块行大小的比较结果缓冲
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape != (self.tile, words):
+            buffer = self._local.buffer = np.empty((self.tile, words), dtype=bool)
+        return buffer
+
+    def update(self, frame):
+        """frame 为 (高, 宽, 4) 的 uint8 数组，返回 (图块行, 图块列) 的布尔数组"""
+        height, width = frame.shape[:2]
+        rows = -(-height // self.tile)
+        columns = -(-width // self.tile)
+        if self._reference is None or self._reference.shape != frame.shape:
+            self._reference = frame.copy()
+            return np.ones((rows, columns), dtype=bool)
+
+        words = _as_words(frame)
+        reference = _as_words(self._reference)
+        changed_words = np.empty((rows, words.shape[1]), dtype=np.uint8)
+
+        def compare(first, last):
+            buffer = self._buffer(words.shape[1])
+            for row in range(first, last):
+                y0 = row * self.tile
+                y1 = min(height, y0 + self.tile)
+                changed = buffer[:y1 - y0]
+                np.not_equal(words[y0:y1], reference[y0:y1], out=changed)
+                # 布尔值按 uint8 取最大值归约，比 logical_or 快
+                np.maximum.reduce(changed.view(np.uint8), axis=0, out=changed_words[row])
+
+        if self.engine is not None:
+            self.engine.run(rows, compare)
+        else:
+            compare(0, rows)
+
+        words_per_tile = max(1, self.tile * words.shape[1] // width)
+        column_starts = np.arange(0, words.shape[1], words_per_tile)
+        mask = np.maximum.reduceat(changed_words, column_starts, axis=1)[:, :columns].astype(bool)
+        for x0, y0, x1, y1 in dirty_rects(mask, self.tile, width, height):
+            self._reference[y0:y1, x0:x1] = frame[y0:y1, x0:x1]
+        return mask
+
+
+def _as_words(frame):
+    # 宽度为偶数的 BGRA 画面按 uint64 比较，否则按 uint32
+    flat = frame.reshape(frame.shape[0], -1)
+    if flat.shape[1] % 8 == 0 and flat.flags.c_contiguous:
+        return flat.view(np.uint64)
+    if flat.shape[1] % 4 == 0 and flat.flags.c_contiguous:
+        return flat.view(np.uint32)
+    return flat
+
+
+def dirty_rects(mask, tile, width, height):
+    """把变化的图块合并为矩形 [(x0, y0, x1, y1)]：先按行合并连续图块，再合并上下相同的行段"""
+    rects = []
+    open_runs = {}
+    for row in range(mask.shape[0]):
+        runs = []
+        columns = np.flatnonzero(mask[row])
+        if len(columns):
+            breaks = np.flatnonzero(np.diff(columns) > 1)
+            starts = np.concatenate(([columns[0]], columns[breaks + 1]))
+            ends = np.concatenate((columns[breaks], [columns[-1]])) + 1
+            runs = list(zip(starts.tolist(), ends.tolist()))
+        next_runs = {}
+        for run in runs:
+            next_runs[run] = open_runs.pop(run, row)
+        for (start, end), first_row in open_runs.items():
+            rects.append((start, first_row, end, row))
+        open_runs = next_runs
+    for (start, end), first_row in open_runs.items():
+        rects.append((start, first_row, end, mask.shape[0]))
+    return [
+        (x0 * tile, y0 * tile, min(x1 * tile, width), min(y1 * tile, height))
+        for x0, y0, x1, y1 in rects
+    ]
+
+
+class IncrementalScaler:
+    """维护输出尺寸的 BGR 帧缓冲，只对变化的区域做颜色转换和缩放
+
+    区域缩放用 warpAffine 按整幅画面的同一个映射计算（与 cv2.resize 的双线性插值一致），
+    拼接处不会出现接缝。变化面积超过 full_ratio 时直接整幅转换，
+    传入 engine（StripEngine）时变化检测和整幅转换按条带并行执行。out 为预先分配的输出缓冲，
+    可以是更大画布中的一块区域（加黑边的输出直接写在画布上）。
+    """
+
+    def __init__(self, frame_size, tile=64, full_ratio=0.5, engine=None, out=None):
+        self.frame_size = tuple(frame_size)
+        self.tracker = DirtyTileTracker(tile, engine)
+        self.full_ratio = full_ratio
+        self.engine = engine
+        self.buffer = out
+        self._filled = False
+        self.mask = None
+        self.full = False
+
+    def update(self, frame):
+        """frame 为 BGRA 截图，返回 (BGR 缓冲, 是否有变化)；缓冲会被下一次调用修改
+
+        mask 为本次检测出的变化图块，full 表示本次整幅重新转换过。
+        """
+        height, width = frame.shape[:2]
+        mask = self.tracker.update(frame)
+        self.mask = mask
+        self.full = False
+        if not mask.any() and self._filled:
+            return self.buffer, False
+
+        if not self._filled or mask.mean() > self.full_ratio:
+            if self.engine is not None:
+                self.buffer = self.engine.convert_resize(frame, self.frame_size, self.buffer)
+            else:
+                self.buffer = _convert_full(frame, self.frame_size, self.buffer)
+            self._filled = True
+            self.full = True
+            return self.buffer, True
+
+        for x0, y0, x1, y1 in dirty_rects(mask, self.tracker.tile, width, height):
+            self.refresh(frame, x0, y0, x1, y1)
+        return self.buffer, True
+
+    def output_rect(self, frame_shape, x0, y0, x1, y1):
+        """源区域 [x0, x1) x [y0, y1) 对应的输出区域 (x0, y0, x1, y1)，向外取整保证覆盖"""
+        height, width = frame_shape[:2]
+        out_width, out_height = self.frame_size
+        scale_x = width / out_width
+        scale_y = height / out_height
+        return (max(0, int(np.floor(x0 / scale_x)) - 1),
+                max(0, int(np.floor(y0 / scale_y)) - 1),
+                min(out_width, int(np.ceil(x1 / scale_x)) + 1),
+                min(out_height, int(np.ceil(y1 / scale_y)) + 1))
+
+    def refresh(self, frame, x0, y0, x1, y1):
+        """重新转换、缩放源区域对应的输出区域，返回写入的输出区域（为空时返回 None）"""
+        height, width = frame.shape[:2]
+        out_width, out_height = self.frame_size
+        scale_x = width / out_width
+        scale_y = height / out_height
+        dx0, dy0, dx1, dy1 = self.output_rect(frame.shape, x0, y0, x1, y1)
+        if dx1 <= dx0 or dy1 <= dy0:
+            return None
+        # 输出区域采样需要的源范围，额外留 2 像素给插值
+        sx0 = max(0, int((dx0 + 0.5) * scale_x - 0.5) - 2)
+        sy0 = max(0, int((dy0 + 0.5) * scale_y - 0.5) - 2)
+        sx1 = min(width, int((dx1 + 0.5) * scale_x - 0.5) + 3)
+        sy1 = min(height, int((dy1 + 0.5) * scale_y - 0.5) + 3)
+        source = cv2.cvtColor(frame[sy0:sy1, sx0:sx1], cv2.COLOR_BGRA2BGR)
+        if scale_x == 1.0 and scale_y == 1.0:
+            self.buffer[dy0:dy1, dx0:dx1] = source[dy0 - sy0:dy1 - sy0, dx0 - sx0:dx1 - sx0]
+            return dx0, dy0, dx1, dy1
+        matrix = np.float32([
+            [scale_x, 0, (dx0 + 0.5) * scale_x - 0.5 - sx0],
+            [0, scale_y, (dy0 + 0.5) * scale_y - 0.5 - sy0],
+        ])
+        cv2.warpAffine(source, matrix, (dx1 - dx0, dy1 - dy0),
+                       dst=self.buffer[dy0:dy1, dx0:dx1],
+                       flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                       borderMode=cv2.BORDER_REPLICATE)
+        return dx0, dy0, dx1, dy1
+
+
+def _convert_full(frame, frame_size, out=None):
+    # 尺寸相同时只转换颜色，不缩放
+    if frame.shape[1::-1] == tuple(frame_size):
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=out)
+    return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR), frame_size, dst=out)
+
@@ -0,0 +1,290 @@
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from fractions import Fraction
+
+import cv2
+import numpy as np
+
+from core.muxer import hidden_startupinfo, x264_args
+
+try:
+    import av  # 可选依赖，可变帧率输出需要
+except ImportError:
+    av = None
+
+
+def frame_dimensions(frame, pixel_format='bgr24'):
+    """帧数组对应的画面尺寸 (宽, 高)；I420 帧是 (高 * 3 / 2, 宽) 的单通道数组"""
+    if pixel_format == 'yuv420p':
+        return frame.shape[1], frame.shape[0] * 2 // 3
+    return frame.shape[1], frame.shape[0]
+
+
+def resize_i420(frame, frame_size):
+    # Y、U、V 三个平面在数组中首尾相接，按平面分别缩放；高度不是 4 的倍数时平面边界不在行首，按一维视图切分
+    source_width, source_height = frame_dimensions(frame, 'yuv420p')
+    width, height = frame_size
+    out = np.empty((height * 3 // 2, width), dtype=np.uint8)
+    source = np.ascontiguousarray(frame).reshape(-1)
+    target = out.reshape(-1)
+    source_offset = target_offset = 0
+    for plane_width, plane_height, out_width, out_height in (
+            (source_width, source_height, width, height),
+            (source_width // 2, source_height // 2, width // 2, height // 2),
+            (source_width // 2, source_height // 2, width // 2, height // 2)):
+        plane = source[source_offset:source_offset + plane_width * plane_height]
+        resized = target[target_offset:target_offset + out_width * out_height]
+        cv2.resize(plane.reshape(plane_height, plane_width), (out_width, out_height),
+                   dst=resized.reshape(out_height, out_width), interpolation=cv2.INTER_AREA)
+        source_offset += plane_width * plane_height
+        target_offset += out_width * out_height
+    return out
+
+
+def crop_i420(frame, rect):
+    """从 I420 帧中裁出 (x, y, 宽, 高) 区域，返回新的 I420 帧；坐标和尺寸须为偶数"""
+    source_width, source_height = frame_dimensions(frame, 'yuv420p')
+    x, y, width, height = rect
+    out = np.empty((height * 3 // 2, width), dtype=np.uint8)
+    source = np.ascontiguousarray(frame).reshape(-1)
+    target = out.reshape(-1)
+    source_offset = target_offset = 0
+    for scale in (1, 2, 2):
+        plane_width, plane_height = source_width // scale, source_height // scale
+        out_width, out_height = width // scale, height // scale
+        plane = source[source_offset:source_offset + plane_width * plane_height].reshape(plane_height, plane_width)
+        target[target_offset:target_offset + out_width * out_height].reshape(out_height, out_width)[:] = \
+            plane[y // scale:y // scale + out_height, x // scale:x // scale + out_width]
+        source_offset += plane_width * plane_height
+        target_offset += out_width * out_height
+    return out
+
+
+class VideoEncoder(threading.Thread):
+    """通过管道把 BGR 帧送给 ffmpeg 编码为 H.264 中间文件
+
+    中间文件已经是目标编码，停止录制后只需复制封装。采集端只把帧放进有界队列，
+    队列满时等待编码器（背压），不会无限占用内存；接口与 cv2.VideoWriter 的 write/release 相同。
+    尺寸与 frame_size 不同的帧在编码线程里缩放，不占用采集线程；
+    标记为没有变化的帧直接沿用上一帧缩放后的数据。
+    write() 的 done 回调在这一帧写完后调用（如释放共享内存槽位），调用之后不再访问这一帧。
+    pixel_format 为 'yuv420p' 时输入已经是 I420 帧，编码器不再转换颜色，每帧数据量减半。
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, frame_size, fps, preset='ultrafast', crf=23, max_backlog_seconds=1.0,
+                 pixel_format='bgr24'):
+        super().__init__(name="VideoEncoder", daemon=True)
+        self.path = path
+        self.frame_size = frame_size
+        self.fps = fps
+        self.preset = preset
+        self.crf = crf
+        self.pixel_format = pixel_format
+
+        self.queue = queue.Queue(maxsize=max(2, int(fps * max_backlog_seconds)))
+        self.frames_written = 0
+        self.unchanged_frames = 0
+        self.max_backlog = 0
+        self.blocked_seconds = 0.0
+        self.error = None
+        self._closed = False
+
+    @staticmethod
+    def available():
+        return shutil.which('ffmpeg') is not None
+
+    def _command(self):
+        width, height = self.frame_size
+        return [
+            'ffmpeg', '-y', '-v', 'error',
+            '-f', 'rawvideo', '-pix_fmt', self.pixel_format, '-s', f'{width}x{height}',
+            '-r', str(self.fps), '-i', '-',
+            *x264_args(self.preset, self.crf),
+            self.path,
+        ]
+
+    def write(self, frame, changed=True, done=None):
+        self._enqueue((frame, changed, done))
+
+    def _fit(self, frame):
+        # 缩放到编码尺寸（编码档位降低分辨率时），尺寸相同时原样返回
+        if frame_dimensions(frame, self.pixel_format) == tuple(self.frame_size):
+            return frame
+        if self.pixel_format == 'yuv420p':
+            return resize_i420(frame, self.frame_size)
+        return cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
+
+    def _enqueue(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # 编码跟不上时等待，记录阻塞时间
+            started = time.perf_counter()
+            self.queue.put(item)
+            self.blocked_seconds += time.perf_counter() - started
+        backlog = self.queue.qsize()
+        if backlog > self.max_backlog:
+            self.max_backlog = backlog
+
+    def release(self):
+        # 可重复调用，也可以在多个线程中同时等待编码完成
+        if not self._closed:
+            self._closed = True
+            if self.is_alive():
+                self.queue.put(self._STOP)
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        process = None
+        stopped = False
+        previous = None
+        try:
+            process = subprocess.Popen(self._command(), stdin=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, startupinfo=hidden_startupinfo())
+            while True:
+                item = self.queue.get()
+                if item is self._STOP:
+                    stopped = True
+                    break
+                frame, changed, done = item
+                source = frame
+                if not changed and previous is not None:
+                    frame = previous
+                    self.unchanged_frames += 1
+                else:
+                    frame = self._fit(frame)
+                frame = np.ascontiguousarray(frame)
+                process.stdin.write(frame.data)
+                # 带 done 回调的帧在回调后可能被覆盖，只沿用编码器自己缩放出的副本
+                if done is None or frame is not source:
+                    previous = frame
+                elif changed:
+                    previous = None
+                if done is not None:
+                    done()
+                self.frames_written += 1
+            _, stderr = process.communicate()
+            if process.returncode != 0:
+                raise RuntimeError(stderr.decode('utf-8', errors='ignore').strip())
+        except Exception as e:
+            self.error = e
+            print(f"视频编码错误: {e}")
+            if process is not None and process.poll() is None:
+                process.kill()
+            # 出错后继续清空队列，保证 release() 能返回
+            while not stopped:
+                stopped = self._discard(self.queue.get())
+
+    def _discard(self, item):
+        # 丢弃队列中的帧时同样调用 done 回调，返回是否是结束标记
+        if item is self._STOP:
+            return True
+        if item[2] is not None:
+            item[2]()
+        return False
+
+
+class VfrEncoder(VideoEncoder):
+    """可变帧率编码：画面没有变化的帧不送给编码器
+
+    用 PyAV 在进程内编码，每帧的时间戳就是它在固定帧率时间格上的序号，直接写入容器。
+    画面一直不变时也至少每 max_interval 秒编码一帧，并且每 keyframe_interval 秒
+    插入一个关键帧，保证播放器可以拖动定位。
+    """
+
+    def __init__(self, path, frame_size, fps, preset='ultrafast', crf=23,
+                 max_interval=1.0, keyframe_interval=2.0, **kwargs):
+        super().__init__(path, frame_size, fps, preset, crf, **kwargs)
+        self.max_interval_slots = max(1, int(round(max_interval * fps)))
+        self.keyframe_slots = max(1, int(round(keyframe_interval * fps)))
+        self._slot = 0            # 下一帧的时间格序号，每次 write 前进一格
+        self._last_sent = None    # 上次送去编码的时间格
+        self._last_frame = None
+        self._last_done = None    # 被省略的最后一帧的 done 回调，结尾可能还要补编码这一帧
+
+    @staticmethod
+    def available():
+        return av is not None
+
+    def write(self, frame, changed=True, done=None):
+        slot = self._slot
+        self._slot += 1
+        if self._last_done is not None:
+            self._last_done()
+            self._last_done = None
+        self._last_frame = frame
+        if (not changed and self._last_sent is not None and
+                slot - self._last_sent < self.max_interval_slots):
+            self.unchanged_frames += 1
+            self._last_done = done
+            return
+        self._last_sent = slot
+        self._enqueue((frame, slot, done))
+
+    def release(self):
+        # 结尾的重复帧被省略时补上最后一帧，保证分段时长与时间格一致
+        if not self._closed and self._last_sent is not None and self._last_sent < self._slot - 1:
+            self._last_sent = self._slot - 1
+            self._enqueue((self._last_frame, self._slot - 1, self._last_done))
+        elif self._last_done is not None:
+            self._last_done()
+        self._last_done = None
+        self._last_frame = None
+        super().release()
+
+    def run(self):
+        container = None
+        stopped = False
+        try:
+            container = av.open(self.path, mode='w')
+            stream = container.add_stream('libx264', rate=self.fps)
+            stream.width, stream.height = self.frame_size
+            stream.pix_fmt = 'yuv420p'
+            stream.codec_context.time_base = Fraction(1, self.fps)
+            stream.options = {
+                'preset': self.preset,
+                'crf': str(self.crf),
+                'forced-idr': '1',
+                'x264-params': 'repeat-headers=1',
+            }
+            last_keyframe = None
+            while True:
+                item = self.queue.get()
+                if item is self._STOP:
+                    stopped = True
+                    break
+                frame, slot, done = item
+                frame = self._fit(frame)
+                video_frame = av.VideoFrame.from_ndarray(np.ascontiguousarray(frame), format=self.pixel_format)
+                # from_ndarray 已经复制了像素，可以释放原帧
+                if done is not None:
+                    done()
+                video_frame.pts = slot
+                video_frame.time_base = Fraction(1, self.fps)
+                if last_keyframe is None or slot - last_keyframe >= self.keyframe_slots:
+                    video_frame.pict_type = av.video.frame.PictureType.I
+                    last_keyframe = slot
+                for packet in stream.encode(video_frame):
+                    container.mux(packet)
+                self.frames_written += 1
+            for packet in stream.encode():
+                container.mux(packet)
+        except Exception as e:
+            self.error = e
+            print(f"视频编码错误: {e}")
+            # 出错后继续清空队列，保证 release() 能返回
+            while not stopped:
+                stopped = self._discard(self.queue.get())
+        finally:
+            if container is not None:
+                try:
+                    container.close()
+                except Exception as e:
+                    print(f"关闭视频文件失败: {e}")
+
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+
+
+def _even(value):
+    # 编码要求宽高为偶数
+    return max(2, int(value) // 2 * 2)
+
+
+@dataclass(frozen=True)
+class FrameLayout:
+    """采集画面到输出帧的布局，录制开始前算好，逐帧处理时不再计算
+
+    source 为实际采集的尺寸（原始尺寸输出时已裁成偶数），output 为编码尺寸，
+    content 为采集画面缩放后在输出帧中的位置 (x, y, 宽, 高)，其余部分是黑边。
+    """
+    source: tuple
+    output: tuple
+    content: tuple
+
+    @property
+    def content_size(self):
+        return self.content[2], self.content[3]
+
+    @property
+    def needs_resize(self):
+        return self.content_size != tuple(self.source)
+
+    @property
+    def letterboxed(self):
+        return self.content_size != tuple(self.output)
+
+    def to_output(self, x, y, crop=None):
+        """采集画面中的坐标换算到输出帧（如鼠标位置）；crop 为缩放前裁出的区域 (x, y, 宽, 高)"""
+        if crop is not None:
+            x = (x - crop[0]) * self.source[0] / crop[2]
+            y = (y - crop[1]) * self.source[1] / crop[3]
+        left, top, width, height = self.content
+        return (int(left + x * width / self.source[0]),
+                int(top + y * height / self.source[1]))
+
+    def follow(self, source_size, upscale=False):
+        """采集尺寸变化后（如跟随的窗口改变大小）的布局：输出尺寸不变，画面保持宽高比加黑边"""
+        # 奇数宽高先裁掉一行/一列，尺寸没有实际变化时得到与原来相同的布局
+        return plan_layout((_even(source_size[0]), _even(source_size[1])), self.output, 'letterbox', upscale)
+
+
+def plan_layout(source_size, target_size, mode='fit', upscale=False):
+    """计算输出布局
+
+    mode 为 'fit' 时保持宽高比缩小到 target_size 以内，输出尺寸就是画面尺寸，没有黑边；
+    'letterbox' 时输出固定为 target_size，画面保持宽高比居中，其余部分加黑边；
+    'stretch' 时直接拉伸到 target_size。upscale 为假时画面不会被放大，
+    小区域按原始尺寸输出，完全不需要缩放。
+    """
+    source_width, source_height = source_size
+    target_width, target_height = target_size
+    if mode == 'stretch':
+        output = (_even(target_width), _even(target_height))
+        return FrameLayout(tuple(source_size), output, (0, 0) + output)
+
+    scale = min(target_width / source_width, target_height / source_height)
+    if not upscale:
+        scale = min(scale, 1.0)
+    if scale == 1.0:
+        # 原始尺寸：宽高为奇数时少采集一行/一列，不做缩放
+        source_size = (_even(source_width), _even(source_height))
+        content_size = source_size
+    else:
+        content_size = (_even(round(source_width * scale)), _even(round(source_height * scale)))
+
+    if mode == 'letterbox':
+        output = (_even(target_width), _even(target_height))
+        left = (output[0] - content_size[0]) // 4 * 2
+        top = (output[1] - content_size[1]) // 4 * 2
+        return FrameLayout(tuple(source_size), output, (left, top) + content_size)
+    return FrameLayout(tuple(source_size), content_size, (0, 0) + content_size)
+
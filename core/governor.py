@@ -0,0 +1,124 @@
+import time
+from dataclasses import dataclass
+
+# x264 预设从慢到快
+X264_PRESETS = ('medium', 'fast', 'faster', 'veryfast', 'superfast', 'ultrafast')
+
+
+@dataclass(frozen=True)
+class EncoderLevel:
+    preset: str
+    crf: int
+    fps_divisor: int = 1   # 每 fps_divisor 个时间格采集一帧，其余时间格重复上一帧
+    scale: float = 1.0     # 编码分辨率相对输出分辨率的比例
+
+    def describe(self, fps):
+        return (f"{self.preset} crf{self.crf} {fps / self.fps_divisor:g}fps "
+                f"{int(self.scale * 100)}%")
+
+
+def build_ladder(preset='ultrafast', crf=23, max_crf=31, min_scale=0.5):
+    """降级顺序：先换更快的预设、提高 CRF，再降帧率，最后降分辨率"""
+    levels = []
+    start = X264_PRESETS.index(preset) if preset in X264_PRESETS else len(X264_PRESETS) - 1
+    for name in X264_PRESETS[start:]:
+        levels.append(EncoderLevel(name, crf))
+    fastest = levels[-1].preset
+    for step in range(crf + 4, max_crf + 1, 4):
+        levels.append(EncoderLevel(fastest, step))
+    worst_crf = levels[-1].crf
+    levels.append(EncoderLevel(fastest, worst_crf, 2))
+    scale = 0.75
+    while scale >= min_scale - 1e-6:
+        levels.append(EncoderLevel(fastest, worst_crf, 2, scale))
+        scale -= 0.25
+    return levels
+
+
+class QualityGovernor:
+    """根据编码队列积压和各阶段耗时调整编码档位
+
+    每个统计窗口（interval 秒）计算负载 = max(队列最大占用比例, 每帧采集合成耗时 / 帧间隔)。
+    连续 down_after 个窗口负载超过 high 时降一档，连续 up_after 个窗口低于 low 时升一档；
+    某一档每次因过载被降下来，之后升回这一档需要的窗口数翻倍，避免来回振荡。
+    每次调整都记录到 decisions 并打印。
+    """
+
+    def __init__(self, ladder, fps, interval=1.0, high=0.8, low=0.4,
+                 down_after=2, up_after=5, log=print, clock=time.monotonic):
+        self.ladder = ladder
+        self.fps = fps
+        self.interval = interval
+        self.high = high
+        self.low = low
+        self.down_after = down_after
+        self.up_after = up_after
+        self.log = log
+        self.clock = clock
+
+        self.index = 0
+        self._penalty = [0] * len(ladder)
+        self.decisions = []  # [(时间, 原档位, 新档位, 原因)]
+        self._started = clock()
+        self._reset_window(self._started)
+        self._over = 0
+        self._under = 0
+
+    @property
+    def level(self):
+        return self.ladder[self.index]
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._stages = {}
+        self._frames = 0
+        self._peak_backlog = 0.0
+
+    def record(self, stage, seconds):
+        # 记录一帧某个阶段的耗时，如 'capture'、'compose'
+        self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def update(self, backlog, capacity):
+        """每帧调用一次，档位变化时返回新档位，否则返回 None"""
+        self._frames += 1
+        if capacity:
+            self._peak_backlog = max(self._peak_backlog, backlog / capacity)
+        now = self.clock()
+        if now - self._window_start < self.interval:
+            return None
+
+        budget = self.level.fps_divisor / self.fps
+        work = sum(self._stages.values()) / max(self._frames, 1)
+        load = max(self._peak_backlog, work / budget)
+        stages = ', '.join(f"{name} {seconds / self._frames * 1000:.1f}ms"
+                           for name, seconds in self._stages.items())
+        reason = f"负载 {load:.2f} (积压 {self._peak_backlog:.0%}, {stages})"
+        self._reset_window(now)
+
+        if load > self.high:
+            self._over += 1
+            self._under = 0
+        elif load < self.low:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.down_after and self.index < len(self.ladder) - 1:
+            return self._change(self.index + 1, now, reason)
+        if self.index > 0 and self._under >= self.up_after * 2 ** self._penalty[self.index - 1]:
+            return self._change(self.index - 1, now, reason)
+        return None
+
+    def _change(self, index, now, reason):
+        previous = self.level
+        if index > self.index:
+            self._penalty[self.index] = min(self._penalty[self.index] + 1, 4)
+        self.index = index
+        self._over = self._under = 0
+        self.decisions.append((now - self._started, previous, self.level, reason))
+        direction = "降低" if index > self.ladder.index(previous) else "提高"
+        self.log(f"[{now - self._started:.1f}s] 编码档位{direction}: "
+                 f"{previous.describe(self.fps)} -> {self.level.describe(self.fps)}，{reason}")
+        return self.level
+
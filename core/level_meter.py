@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+
+SILENCE_FLOOR_DB = -100.0
+
+
+def _to_db(value):
+    return 20 * np.log10(value) if value > 1e-5 else SILENCE_FLOOR_DB
+
+
+class LevelMeter:
+    """逐块累计各音频源的峰值和 RMS，按固定间隔发布，检测静音和削波
+
+    每个数据块只做 max/min 和一次点积归约，不产生额外的数组拷贝。
+    publish(levels) 收到 {名称: (峰值dB, RMS dB)}，warn(名称, 类型) 在
+    持续静音或频繁削波时调用一次，类型为 'silent' 或 'clipped'，恢复正常后为 'ok'。
+    """
+
+    def __init__(self, names, samplerate, publish, warn=None, interval=0.1,
+                 silence_db=-60.0, silence_seconds=3.0,
+                 clip_level=0.999, clip_blocks=3, clip_window=2.0):
+        self.names = list(names)
+        self.samplerate = samplerate
+        self.publish = publish
+        self.warn = warn
+        self.interval = interval
+        self.silence_level = 10 ** (silence_db / 20)
+        self.silence_seconds = silence_seconds
+        self.clip_level = clip_level
+        self.clip_blocks = clip_blocks
+        self.clip_window = clip_window
+
+        count = len(self.names)
+        self._peak = np.zeros(count)
+        self._energy = np.zeros(count)
+        self._frames = 0
+        self._last_publish = time.monotonic()
+
+        self._silent_time = np.zeros(count)
+        self._clip_times = [[] for _ in range(count)]
+        self._state = ['ok'] * count
+
+    def update(self, blocks):
+        """blocks 与 names 一一对应，每块形状 (帧, 通道)，返回各块的 RMS dB"""
+        now = time.monotonic()
+        block_levels = []
+        for index, block in enumerate(blocks):
+            peak = max(float(block.max()), -float(block.min()))
+            energy = float(np.einsum('ij,ij->', block, block)) / block.shape[1]
+            if peak > self._peak[index]:
+                self._peak[index] = peak
+            self._energy[index] += energy
+            self._check(index, peak, energy / len(block), len(block), now)
+            block_levels.append(_to_db(np.sqrt(energy / len(block))))
+        self._frames += len(blocks[0])
+
+        if now - self._last_publish >= self.interval and self._frames:
+            rms = np.sqrt(self._energy / self._frames)
+            self.publish({
+                name: (_to_db(self._peak[i]), _to_db(rms[i]))
+                for i, name in enumerate(self.names)
+            })
+            self._peak[:] = 0
+            self._energy[:] = 0
+            self._frames = 0
+            self._last_publish = now
+        return block_levels
+
+    def _check(self, index, peak, mean_square, frames, now):
+        # 连续静音超过 silence_seconds，或 clip_window 秒内有 clip_blocks 块削波
+        if mean_square < self.silence_level ** 2:
+            self._silent_time[index] += frames / self.samplerate
+        else:
+            self._silent_time[index] = 0.0
+
+        clip_times = self._clip_times[index]
+        if peak >= self.clip_level:
+            clip_times.append(now)
+        while clip_times and now - clip_times[0] > self.clip_window:
+            clip_times.pop(0)
+
+        if self._silent_time[index] >= self.silence_seconds:
+            state = 'silent'
+        elif len(clip_times) >= self.clip_blocks:
+            state = 'clipped'
+        elif self._state[index] == 'clipped' and clip_times:
+            state = 'clipped'  # 削波记录清空之前保持警告
+        else:
+            state = 'ok'
+
+        if state != self._state[index]:
+            self._state[index] = state
+            if self.warn is not None:
+                self.warn(self.names[index], state)
+
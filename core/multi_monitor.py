@@ -0,0 +1,137 @@
+import threading
+import time
+
+import mss
+import numpy as np
+
+
+class MonitorGrabber(threading.Thread):
+    """单个显示器的采集线程，持有自己的 mss 实例（mss 不能跨线程共用）
+
+    每次被 MonitorGroup 放行后截取一帧，交给 handler(截图, 采集时刻) 处理；
+    handler 在本线程中执行，各显示器的拷贝、合成和编码互相并行。
+    handler 为 None 时只保留截图（raw），由录制线程自己处理。
+    """
+
+    def __init__(self, group, monitor, handler):
+        super().__init__(name=f"MonitorGrabber-{monitor['left']},{monitor['top']}", daemon=True)
+        self.group = group
+        self.monitor = dict(monitor)
+        self.handler = handler
+        self.raw = None
+        self.captured_ns = 0
+        self.grab_seconds = 0.0
+        self.error = None
+
+    def run(self):
+        try:
+            sct = mss.mss()
+        except Exception as e:
+            self.error = e
+            sct = None
+        try:
+            while True:
+                self.group._start.wait()
+                if sct is not None:
+                    try:
+                        self.captured_ns = time.monotonic_ns()
+                        started = time.perf_counter()
+                        self.raw = np.asarray(sct.grab(self.monitor))
+                        self.grab_seconds = time.perf_counter() - started
+                        if self.handler is not None:
+                            self.handler(self.raw, self.captured_ns)
+                    except Exception as e:
+                        if self.error is None:
+                            print(f"显示器 {self.name} 采集失败: {e}")
+                        self.error = e
+                self.group._done.wait()
+        except threading.BrokenBarrierError:
+            pass
+        finally:
+            if sct is not None:
+                sct.close()
+
+
+class MonitorGroup:
+    """多个显示器同步采集：每个显示器一个常驻线程，grab() 同时放行所有线程并等待全部完成
+
+    所有显示器在同一时刻开始截图，同一次 grab() 的结果属于固定帧率时间格上的同一个位置；
+    max_skew_ns 记录各显示器采集时刻的最大差值，用于确认对齐程度。
+    """
+
+    def __init__(self, monitors, handlers):
+        self._start = threading.Barrier(len(monitors) + 1)
+        self._done = threading.Barrier(len(monitors) + 1)
+        self.grabbers = [MonitorGrabber(self, monitor, handler) for monitor, handler in zip(monitors, handlers)]
+        self.max_skew_ns = 0
+        for grabber in self.grabbers:
+            grabber.start()
+
+    def grab(self):
+        """所有显示器各截取一帧，返回 (最慢的截图耗时, 各显示器采集时刻的最大差值 ns)"""
+        self._start.wait()
+        self._done.wait()
+        captured = [grabber.captured_ns for grabber in self.grabbers]
+        skew = max(captured) - min(captured)
+        self.max_skew_ns = max(self.max_skew_ns, skew)
+        return max(grabber.grab_seconds for grabber in self.grabbers), skew
+
+    def close(self):
+        self._start.abort()
+        self._done.abort()
+        for grabber in self.grabbers:
+            grabber.join(timeout=2.0)
+
+
+def stitch_canvas(monitors, source_size):
+    """按显示器在虚拟桌面中的位置拼成一幅 BGRA 画布，返回 (画布, 各显示器对应的画布区域)
+
+    画布尺寸为 source_size（布局裁成偶数后的虚拟桌面尺寸），显示器之间的空隙保持黑色。
+    """
+    left = min(monitor['left'] for monitor in monitors)
+    top = min(monitor['top'] for monitor in monitors)
+    width, height = source_size
+    canvas = np.zeros((height, width, 4), dtype=np.uint8)
+    views = []
+    for monitor in monitors:
+        x0, y0 = monitor['left'] - left, monitor['top'] - top
+        views.append(canvas[y0:min(height, y0 + monitor['height']), x0:min(width, x0 + monitor['width'])])
+    return canvas, views
+
+
+def copy_into(view):
+    # 拼接模式的 handler：截图直接拷进画布中属于该显示器的区域
+    def handler(raw, captured_ns):
+        np.copyto(view, raw[:view.shape[0], :view.shape[1]])
+    return handler
+
+
+class MonitorRecording:
+    """单独保存为一个文件的显示器：在采集线程里合成叠加层，按时间格写入自己的编码器
+
+    时间格由录制线程在放行采集前统一给出（slot），所有显示器的文件帧数和时间轴一致，
+    停止后各自与同一条音轨封装。
+    """
+
+    def __init__(self, monitor, compositor, encoder, output_file):
+        self.monitor = dict(monitor)
+        self.compositor = compositor
+        self.encoder = encoder
+        self.output_file = output_file
+        self.slot = 0
+        self.next_slot = 0
+        self.last_frame = None
+
+    def handler(self, raw, captured_ns):
+        frame, changed = self.compositor.compose(raw, self.monitor)
+        slot = self.slot
+        if slot < self.next_slot:
+            return
+        # 落后时重复上一帧补齐，与主画面的补帧方式相同
+        filler = self.last_frame if self.last_frame is not None else frame
+        for _ in range(slot - self.next_slot):
+            self.encoder.write(filler, changed=False)
+        self.encoder.write(frame, changed)
+        self.last_frame = frame
+        self.next_slot = slot + 1
+
@@ -0,0 +1,162 @@
+import os
+import subprocess
+import time
+
+# 各输出容器可以直接复制、不需要重新编码的编码格式
+COPY_CODECS = {
+    '.mp4': {
+        'video': {'h264', 'hevc'},
+        'audio': {'aac', 'mp3'},
+    },
+    '.mkv': {
+        'video': {'h264', 'hevc', 'mjpeg', 'vp9', 'av1'},
+        'audio': {'aac', 'mp3', 'opus', 'flac', 'vorbis', 'pcm_s16le', 'pcm_f32le'},
+    },
+}
+
+
+
+def x264_args(preset='ultrafast', crf=23):
+    """所有 libx264 编码共用的 ffmpeg 参数"""
+    return [
+        '-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p',
+        # 每个关键帧重复参数集，不同编码参数的分段可以直接拼接
+        '-x264-params', 'repeat-headers=1',
+    ]
+
+
+VIDEO_ENCODE_ARGS = x264_args()
+AUDIO_ENCODE_ARGS = ['aac', '-b:a', '192k']
+
+
+def hidden_startupinfo():
+    # Windows 下运行 ffmpeg 时不弹出控制台窗口
+    if not hasattr(subprocess, 'STARTUPINFO'):
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startupinfo
+
+
+def run_ffmpeg(args):
+    """以参数列表运行 ffmpeg（不经过 shell），失败时抛出带错误输出的异常"""
+    result = subprocess.run(['ffmpeg', '-y', '-v', 'error'] + args,
+                            capture_output=True, startupinfo=hidden_startupinfo())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', errors='ignore').strip())
+
+
+def probe_codecs(path):
+    """返回文件中各流的 [(类型, 编码)]，如 [('video', 'h264'), ('audio', 'flac')]"""
+    result = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'stream=codec_type,codec_name',
+                             '-of', 'csv=p=0', path],
+                            capture_output=True, startupinfo=hidden_startupinfo())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', errors='ignore').strip())
+    streams = []
+    for line in result.stdout.decode('utf-8', errors='ignore').split():
+        fields = line.split(',')
+        if len(fields) >= 2:
+            streams.append((fields[1], fields[0]))
+    return streams
+
+
+def probe_video_size(path):
+    result = subprocess.run(['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+                             '-show_entries', 'stream=width,height', '-of', 'csv=p=0', path],
+                            capture_output=True, startupinfo=hidden_startupinfo())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', errors='ignore').strip())
+    width, height = result.stdout.decode('utf-8', errors='ignore').split()[0].split(',')[:2]
+    return int(width), int(height)
+
+
+def concat_segments(paths, output_path, frame_size):
+    """把编码档位变化产生的多个视频分段拼接成一个文件，返回重新编码的分段数
+
+    只有降分辨率档位录制的分段（尺寸不等于 frame_size）逐个放大到 frame_size 重新编码，
+    其余分段保持原样，最后所有分段直接复制码流拼接。
+    """
+    width, height = frame_size
+    scaled = []
+    playlist = output_path + ".txt"
+    try:
+        with open(playlist, 'w', encoding='utf-8') as f:
+            for path in paths:
+                if probe_video_size(path) != (width, height):
+                    base, ext = os.path.splitext(path)
+                    upscaled = f"{base}_scaled{ext}"
+                    run_ffmpeg(['-i', path, '-vf', f'scale={width}:{height}']
+                               + VIDEO_ENCODE_ARGS + [upscaled])
+                    scaled.append(upscaled)
+                    path = upscaled
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        run_ffmpeg(['-f', 'concat', '-safe', '0', '-i', playlist, '-c', 'copy', output_path])
+        return len(scaled)
+    finally:
+        for path in scaled + [playlist]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _first_codec(path, codec_type):
+    for stream_type, codec in probe_codecs(path):
+        if stream_type == codec_type:
+            return codec
+    return None
+
+
+def mux(video_path, audio_tracks, output_path, premix=False, allow_copy=True):
+    """把中间视频和音轨封装为输出文件，能复制的流直接复制
+
+    audio_tracks 为 [(文件, 标题, 音量)]；premix 为真时额外生成一条混音轨放在最前面，
+    音量只作用于混音轨（必须编码），各分轨保持原始电平。返回 {流: 'copy'/'encode'} 和耗时秒。
+    """
+    started = time.perf_counter()
+    copyable = COPY_CODECS.get(os.path.splitext(output_path)[1].lower(), {'video': set(), 'audio': set()})
+    plan = {}
+
+    args = ['-i', video_path]
+    for path, _, _ in audio_tracks:
+        args += ['-i', path]
+
+    maps = ['-map', '0:v:0']
+    codecs = []
+    if allow_copy and _first_codec(video_path, 'video') in copyable['video']:
+        codecs += ['-c:v', 'copy']
+        plan['video'] = 'copy'
+    else:
+        codecs += VIDEO_ENCODE_ARGS
+        plan['video'] = 'encode'
+
+    titles = []
+    if premix and len(audio_tracks) > 1:
+        inputs = ''.join(
+            f'[{i + 1}:a]volume={volume:.2f}[a{i}];' for i, (_, _, volume) in enumerate(audio_tracks)
+        )
+        labels = ''.join(f'[a{i}]' for i in range(len(audio_tracks)))
+        args += ['-filter_complex', f'{inputs}{labels}amix=inputs={len(audio_tracks)}:normalize=0[mix]']
+        maps += ['-map', '[mix]']
+        titles.append("混音")
+
+    for i, (path, title, _) in enumerate(audio_tracks):
+        maps += ['-map', f'{i + 1}:a:0']
+        titles.append(title)
+    for index, title in enumerate(titles):
+        # 混音轨经过滤镜只能编码，其余音轨编码与容器匹配时直接复制
+        track = index - (len(titles) - len(audio_tracks))
+        if track < 0:
+            mode = 'encode'
+        else:
+            path = audio_tracks[track][0]
+            mode = 'copy' if allow_copy and _first_codec(path, 'audio') in copyable['audio'] else 'encode'
+        codecs += [f'-c:a:{index}', 'copy'] if mode == 'copy' else [f'-c:a:{index}'] + AUDIO_ENCODE_ARGS
+        if len(titles) > 1:
+            codecs += [f'-metadata:s:a:{index}', f'title={title}']
+        plan[title] = mode
+    if titles:
+        codecs += ['-disposition:a:0', 'default']
+
+    run_ffmpeg(args + maps + codecs + [output_path])
+    return plan, time.perf_counter() - started
+
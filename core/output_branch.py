@@ -0,0 +1,159 @@
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from core.encoder import VideoEncoder, frame_dimensions, resize_i420, crop_i420
+from core.frame_layout import plan_layout
+
+
+def _even(value):
+    return int(value) // 2 * 2
+
+
+@dataclass(frozen=True)
+class OutputBranch:
+    """同一次录制的一路额外输出（如 720p 代理文件）
+
+    crop 为主画面（合成后的输出帧）中的区域 (x, y, 宽, 高)，None 为整幅；
+    画面保持宽高比缩小到 size 以内，不放大。每 fps_divisor 个时间格输出一帧。
+    输出文件名为主文件名加 _name 后缀，与主文件共用同一条音轨。
+    """
+    name: str
+    size: tuple
+    crop: tuple = None
+    fps_divisor: int = 1
+    preset: str = 'ultrafast'
+    crf: int = 23
+
+
+class BranchFanout(threading.Thread):
+    """把主画面分发给各路额外输出，在自己的线程里裁剪、缩放，不占用采集线程
+
+    主画面每个时间格调用一次 write()（包括补齐的重复帧），与主编码器收到的帧一一对应。
+    裁剪区域和输出尺寸相同的分支共用同一次裁剪缩放的结果；画面没有变化时不做任何计算，
+    编码器直接沿用上一帧。write() 的 done 回调在本线程取用完这一帧后调用（如释放共享内存槽位）。
+    """
+
+    _STOP = object()
+
+    def __init__(self, branches, source_size, fps, pixel_format, temp_dir, output_file,
+                 max_backlog_seconds=1.0):
+        super().__init__(name="BranchFanout", daemon=True)
+        self.source_size = tuple(source_size)
+        self.pixel_format = pixel_format
+        self.queue = queue.Queue(maxsize=max(2, int(fps * max_backlog_seconds)))
+        self.blocked_seconds = 0.0
+        self.derive_seconds = 0.0
+        self.derived = 0
+        self.shared = 0
+        self.outputs = []
+        base, ext = os.path.splitext(output_file)
+        for number, branch in enumerate(branches):
+            crop = self._normalize_crop(branch.crop)
+            size = plan_layout(crop[2:], branch.size, 'fit').output
+            divisor = max(1, int(branch.fps_divisor))
+            path = os.path.join(temp_dir, f"temp_video_branch{number}.mkv")
+            encoder = VideoEncoder(path, size, fps / divisor, branch.preset, branch.crf,
+                                   max_backlog_seconds, pixel_format)
+            self.outputs.append({
+                'branch': branch,
+                'key': (crop, size),
+                'divisor': divisor,
+                'encoder': encoder,
+                'output_file': f"{base}_{branch.name}{ext}",
+                'changed': False,
+            })
+
+    def _normalize_crop(self, crop):
+        # 裁剪区域限制在画面内，坐标和尺寸取偶数（I420 色度平面按 2x2 采样）
+        width, height = self.source_size
+        if crop is None:
+            return 0, 0, width, height
+        x, y, crop_width, crop_height = crop
+        x = _even(min(max(x, 0), width - 2))
+        y = _even(min(max(y, 0), height - 2))
+        return x, y, max(2, _even(min(crop_width, width - x))), max(2, _even(min(crop_height, height - y)))
+
+    def start(self):
+        for output in self.outputs:
+            output['encoder'].start()
+        super().start()
+
+    def write(self, frame, changed=True, done=None):
+        try:
+            self.queue.put_nowait((frame, changed, done))
+        except queue.Full:
+            started = time.perf_counter()
+            self.queue.put((frame, changed, done))
+            self.blocked_seconds += time.perf_counter() - started
+
+    def release(self):
+        if self.is_alive():
+            self.queue.put(self._STOP)
+            self.join()
+        for output in self.outputs:
+            output['encoder'].release()
+
+    def _derive(self, frame, crop, size, copy):
+        # 裁剪后缩放到分支尺寸；整幅且尺寸相同时直接使用主画面（需要时复制一份）
+        x, y, width, height = crop
+        whole = (x, y, width, height) == (0, 0) + self.source_size
+        if self.pixel_format == 'yuv420p':
+            part = frame if whole else crop_i420(frame, crop)
+            if frame_dimensions(part, 'yuv420p') != size:
+                return resize_i420(part, size)
+        else:
+            part = frame if whole else frame[y:y + height, x:x + width]
+            if (width, height) != size:
+                return cv2.resize(part, size, interpolation=cv2.INTER_AREA)
+        return part.copy() if copy and np.may_share_memory(part, frame) else part
+
+    def run(self):
+        slot = 0
+        while True:
+            item = self.queue.get()
+            if item is self._STOP:
+                break
+            frame, changed, done = item
+            results = {}
+            try:
+                for output in self.outputs:
+                    output['changed'] = output['changed'] or changed
+                    if slot % output['divisor'] != 0:
+                        continue
+                    key = output['key']
+                    if not output['changed'] and 'last' in output:
+                        # 这一路的画面没有变化，编码器沿用上一帧
+                        output['encoder'].write(output['last'], changed=False)
+                        continue
+                    if key in results:
+                        self.shared += 1
+                    else:
+                        started = time.perf_counter()
+                        results[key] = self._derive(frame, *key, copy=done is not None)
+                        self.derive_seconds += time.perf_counter() - started
+                        self.derived += 1
+                    output['last'] = results[key]
+                    output['encoder'].write(results[key], True)
+                    output['changed'] = False
+            except Exception as e:
+                print(f"额外输出处理失败: {e}")
+            finally:
+                if done is not None:
+                    done()
+            slot += 1
+
+    def describe(self):
+        lines = []
+        for output in self.outputs:
+            encoder = output['encoder']
+            lines.append(f"{output['branch'].name} {encoder.frame_size} {encoder.fps:g}fps: "
+                         f"{encoder.frames_written} 帧")
+        return (f"额外输出: {'; '.join(lines)}; 裁剪缩放 {self.derived} 次"
+                f"（共用 {self.shared} 次，平均 {self.derive_seconds / max(self.derived, 1) * 1000:.2f}ms）")
+
@@ -0,0 +1,109 @@
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+
+@dataclass(frozen=True)
+class PrivacyRegion:
+    """录制时需要打码的区域（如聊天窗格、密码输入框）
+
+    rect 为屏幕坐标 (x, y, 宽, 高)；window 为要跟随的窗口句柄时，rect 是相对窗口左上角的坐标。
+    style 为 'mosaic'（缩小再放大的像素化）或 'blur'（方框模糊），strength 为马赛克块大小
+    或模糊半径（输出像素）。
+    """
+    rect: tuple
+    style: str = 'mosaic'
+    strength: int = 16
+    window: int = None
+
+
+def redact(buffer, rect, style, strength):
+    """对输出缓冲中的 (x0, y0, x1, y1) 区域原地打码"""
+    x0, y0, x1, y1 = rect
+    roi = buffer[y0:y1, x0:x1]
+    height, width = roi.shape[:2]
+    if style == 'blur':
+        size = 2 * max(1, strength) + 1
+        cv2.blur(roi, (size, size), dst=roi, borderType=cv2.BORDER_REPLICATE)
+        return
+    # 马赛克：先按块求平均缩小，再用最近邻放大回原尺寸
+    block = max(2, strength)
+    small = cv2.resize(roi, (max(1, width // block), max(1, height // block)), interpolation=cv2.INTER_AREA)
+    cv2.resize(small, (width, height), dst=roi, interpolation=cv2.INTER_NEAREST)
+
+
+class PrivacyMask:
+    """在合成阶段给隐私区域打码，直接处理增量缩放的输出缓冲
+
+    缩放缓冲在帧之间保留，打过码的像素在画面没变时一直保持，所以只在区域内有图块变化、
+    整幅重新转换或区域移动时才重新处理：先把区域从截图重新转换一遍（保证模糊不会叠加），
+    再打码。没有定义区域时合成器不创建这个对象，没有任何开销。
+    """
+
+    def __init__(self, regions):
+        self.regions = list(regions)
+        self.rects = [tuple(region.rect) for region in self.regions]  # 当前的屏幕坐标
+        self._applied = [None] * len(self.regions)  # 上次打码时在截图中的位置
+        self.redacted = 0
+        self.skipped = 0
+        self.seconds = 0.0
+
+    def move(self, index, rect):
+        # 跟随窗口的区域由录制线程更新屏幕坐标
+        self.rects[index] = tuple(rect)
+
+    def apply(self, scaler, frame, origin):
+        """scaler 刚处理完 frame（origin 为 frame 左上角的屏幕坐标），返回是否修改了缓冲"""
+        started = time.perf_counter()
+        height, width = frame.shape[:2]
+        tile = scaler.tracker.tile
+        # 输出区域向外扩 1 像素，换算到截图约 1 个缩放倍数，检测变化时多留出这一圈
+        pad = int(np.ceil(width / scaler.frame_size[0])) + 3
+        modified = False
+        rects = []
+        for x, y, region_width, region_height in self.rects:
+            x0, y0 = max(0, x - origin[0]), max(0, y - origin[1])
+            x1, y1 = min(width, x + region_width - origin[0]), min(height, y + region_height - origin[1])
+            rects.append((x0, y0, x1, y1) if x1 > x0 and y1 > y0 else None)
+        # 区域移动或移出截图后，旧位置的打码要从截图重新转换清除；与之重叠的区域之后都要重新打码
+        restored = []
+        if not scaler.full:
+            for index, previous in enumerate(self._applied):
+                if previous is None or previous == rects[index]:
+                    continue
+                # 截图尺寸可能已经变化，旧位置裁到当前截图范围内
+                previous = (min(previous[0], width), min(previous[1], height),
+                            min(previous[2], width), min(previous[3], height))
+                if previous[2] > previous[0] and previous[3] > previous[1]:
+                    scaler.refresh(frame, *previous)
+                    restored.append(previous)
+                    modified = True
+        for index, region in enumerate(self.regions):
+            rect = rects[index]
+            if rect is None:
+                self._applied[index] = None
+                continue
+            x0, y0, x1, y1 = rect
+            if scaler.full:
+                output = scaler.output_rect(frame.shape, *rect)
+            else:
+                overlaps = any(px0 < x1 + pad and x0 - pad < px1 and py0 < y1 + pad and y0 - pad < py1
+                               for px0, py0, px1, py1 in restored)
+                if rect == self._applied[index] and not overlaps:
+                    tiles = scaler.mask[max(0, y0 - pad) // tile:(min(height, y1 + pad) - 1) // tile + 1,
+                                        max(0, x0 - pad) // tile:(min(width, x1 + pad) - 1) // tile + 1]
+                    if not tiles.any():
+                        self.skipped += 1
+                        continue
+                output = scaler.refresh(frame, *rect)
+            self._applied[index] = rect
+            if output is None or output[2] <= output[0] or output[3] <= output[1]:
+                continue
+            redact(scaler.buffer, output, region.style, region.strength)
+            self.redacted += 1
+            modified = True
+        self.seconds += time.perf_counter() - started
+        return modified
+
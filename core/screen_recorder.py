@@ -5,71 +5,260 @@ import cv2
 import mss
 import threading
 import time
-import sounddevice as sd
 import soundfile as sf
 import tempfile
 import os
-from moviepy import VideoFileClip, AudioFileClip, CompositeVideoClip
-from PySide6.QtGui import QColor, QCursor
-import win32api
-import winsound
-from PIL import Image, ImageDraw, ImageFont
-from scipy.signal import butter, lfilter
-import noisereduce as nr
+import shutil
+from dataclasses import replace
+from PySide6.QtGui import QColor
+from core.audio_capture import AudioSource, AudioMixer
+from core.audio_writer import AudioWriter, resolve_audio_format, audio_extension
+from core.audio_dsp import StreamingDSP
+from core.denoiser import DenoiseWorker, NoiseProfile
+from core.sync import (PtsWriter, align_audio,
+                       STREAM_VIDEO, STREAM_AUDIO, EVENT_PAUSE, EVENT_RESUME)
+from core.session import RecordingSession
+from core.level_meter import LevelMeter
+from core.vad import VadWriter, vad_path
+from core.encoder import VideoEncoder, VfrEncoder
+from core.muxer import mux, concat_segments
+from core.governor import QualityGovernor, build_ladder
+from core.compositor import FrameCompositor
+from core.capture_worker import CaptureWorker
+from core.strip_engine import StripEngine
+from core.frame_layout import plan_layout
+from core.window_tracker import WindowTracker, default_backend
+from core.multi_monitor import MonitorGroup, MonitorRecording, stitch_canvas, copy_into
+from core.output_branch import BranchFanout
+from core.audio_devices import AudioDeviceRegistry
 
 class ScreenRecorder(QObject):
     recording_finished = Signal(str)
+    audio_levels = Signal(dict)        # {音频源: (峰值dB, RMS dB)}，约每 0.1 秒一次
+    audio_warning = Signal(str, str)   # (音频源, 'silent'/'clipped'/'ok')
     
     def __init__(self):
         super().__init__()
-        self.recording = False
-        self.paused = False
+        self.session = RecordingSession()
         self.output_file = None
         self.fps = 30
-        self.frame_size = (1920, 1080)
+        self.frame_size = (1920, 1080)   # 用户设置的输出尺寸
+        self.output_size = None          # 本次录制按布局实际输出的尺寸
         self.temp_video = None
         self.temp_audio = None
+        self.temp_sync = None
+        self.pts_writer = None
+        self.temp_vad = None
+        self.finalize_seconds = None  # 上次停止录制到文件就绪的耗时
+        self.adaptive_quality = True   # 编码跟不上时自动降低编码档位
+        self.governor = None
+        self.video_segments = []       # 每次调整编码档位开始一个新的视频分段
+        self.variable_frame_rate = False  # 画面不变时不编码重复帧（需要 PyAV）
+        self.vfr_max_interval = 1.0       # 可变帧率时两帧之间的最长间隔（秒）
+        self.multiprocess_capture = False  # 截图合成和降噪放到独立进程，帧通过共享内存传递
+        self._capture_worker = None
+        self.strip_parallel = False        # 整幅转换缩放按条带分给线程池，条带数自动选择
+        self.i420_pipeline = False         # 合成后立即转换为 I420，队列、共享内存和管道的数据量减半
+        self.pixel_format = 'bgr24'        # 本次录制实际使用的帧格式
+        # 输出布局：'letterbox' 固定为 frame_size 并保持宽高比加黑边，'fit' 按区域比例缩小、
+        # 输出尺寸随区域变化；layout_upscale 为假时小区域按原始尺寸输出
+        self.layout_mode = 'letterbox'
+        self.layout_upscale = True
+        self.layout = None
+        self.follow_window = None   # 要跟随的窗口句柄，窗口移动或改变大小时采集区域随之更新
+        self.window_tracker = None
+        # 同时录制所有显示器：'stitched' 拼接为一个画面，'separate' 每个显示器单独保存为一个文件，
+        # 共用同一条音轨；每个显示器一个采集线程，按同一个时钟的时间格对齐
+        self.all_monitors = None
+        self._monitors = []
+        self.monitor_recordings = []
+        # 同一份采集画面的额外输出（OutputBranch 列表，如 720p 代理文件），各自裁剪、缩放、降帧和编码
+        self.output_branches = []
+        self.fanout = None
+        # 跟随鼠标自动放大：SmartZoom 的参数字典，None 为关闭；cycle_zoom() 切换放大倍数（快捷键）
+        self.smart_zoom = None
+        self.zoom_requests = 0
+        # 需要打码的区域（PrivacyRegion 列表），可以跟随窗口；privacy_rects 为本次录制中各区域的屏幕坐标
+        self.privacy_regions = []
+        self.privacy_rects = []
+        self.privacy_trackers = []
         self.audio_source = "系统声音 + 麦克风"
         self.system_volume = 100
         self.mic_volume = 100
+        self.audio_sources = []
+        self.sample_rate = 48000  # 会话采样率，各设备以原生采样率采集后统一重采样
+        self.channels = 2
+        self.audio_format = "flac"  # 中间音频格式：flac/opus/wav
+        self.multitrack_audio = False  # 系统声音和麦克风分别保存为独立音轨
+        self.premix_track = True       # 分轨时额外生成混音轨作为第一条音轨
+        self.audio_tracks = []         # 分轨录制的 [(名称, 临时文件, 音量)]
         
         # 音频降噪设置
         self.noise_reduction_enabled = False
         self.noise_reduction_strength = 0.5  # 降噪强度 0.0-1.0
+        self.noise_reduction_mode = "spectral"  # spectral: 频谱降噪, voice: 人声滤波
+        self.noise_profile = None
+        self._noise_sampler = None
+        
+        # 音频设备在后台枚举并缓存，打开音频流和重新枚举互斥
+        self.system_device = ""  # 设备键 "主机API:设备名"，空为自动选择
+        self.mic_device = ""     # 空为系统默认输入设备
+        self.device_registry = AudioDeviceRegistry()
+        self.device_registry.start()
+        
+    @property
+    def recording(self):
+        return self.session.active
+        
+    @property
+    def paused(self):
+        return self.session.paused
+        
+    @property
+    def clock(self):
+        return self.session.clock
         
     def start_recording(self, region=None, output_file="output.mp4"):
-        self.recording = True
-        self.paused = False
+        # 进入准备状态，音频设备就绪后由音频线程切换到录制状态
+        if self.session.arm() is None:
+            return
         self.output_file = output_file
         
         # 创建临时文件
         temp_dir = tempfile.gettempdir()
-        self.temp_video = os.path.join(temp_dir, "temp_video.mp4")
-        self.temp_audio = os.path.join(temp_dir, "temp_audio.wav")
-        
-        # 使用 MJPG 编码器代替 H264
-        fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-        self.writer = cv2.VideoWriter(
-            self.temp_video.replace('.mp4', '.avi'),  # 临时使用 AVI 格式
-            fourcc, 
-            self.fps,
-            self.frame_size,
-            isColor=True
-        )
+        self.audio_format = resolve_audio_format(self.audio_format, self.sample_rate)
+        self.temp_audio = os.path.join(temp_dir, "temp_audio" + audio_extension(self.audio_format))
+        
+        # 音视频共用一个时钟，时间戳写入旁路文件，合并时据此对齐
+        self.temp_sync = os.path.join(temp_dir, "temp_sync.pts")
+        self.pts_writer = PtsWriter(self.temp_sync, self.fps, self.sample_rate)
+        # 语音活动索引：录制时顺带记录每块电平，供文件页快速裁剪静音
+        self.temp_vad = os.path.join(temp_dir, "temp_vad.vad")
+        
+        # 录制开始前算好输出布局，编码尺寸取布局的输出尺寸；原始尺寸输出时采集区域裁成偶数
+        with mss.mss() as sct:
+            # 如果没有指定区域，使用主显示器
+            monitor = dict(region) if region is not None else dict(sct.monitors[1])
+            desktop = sct.monitors[0]
+            self._monitors = []
+            separate = False
+            if self.all_monitors and region is None and len(sct.monitors) > 2:
+                self._monitors = [dict(item) for item in sct.monitors[1:]]
+                # 分别保存需要 ffmpeg 编码器，否则改为拼接；拼接时采集整个虚拟桌面的范围
+                separate = self.all_monitors == 'separate' and VideoEncoder.available()
+                if not separate:
+                    monitor = dict(desktop)
+        self.window_tracker = None
+        if self.follow_window is not None and region is not None:
+            # 在后台线程里查询窗口位置，采集循环每帧只读取最新结果
+            backend = default_backend()
+            if backend is not None:
+                bounds = (desktop['left'], desktop['top'], desktop['width'], desktop['height'])
+                self.window_tracker = WindowTracker(
+                    backend, self.follow_window,
+                    (monitor['left'], monitor['top'], monitor['width'], monitor['height']), bounds)
+                self.window_tracker.start()
+        self._start_privacy_trackers()
+        self.layout = plan_layout((monitor['width'], monitor['height']), self.frame_size,
+                                  self.layout_mode, self.layout_upscale)
+        monitor['width'], monitor['height'] = self.layout.source
+        self.output_size = self.layout.output
+        print(f"采集 {self.layout.source[0]}x{self.layout.source[1]} -> "
+              f"输出 {self.output_size[0]}x{self.output_size[1]}")
+        
+        # 通过管道直接编码为 H.264，停止后只需复制封装；没有 ffmpeg 时退回 MJPG
+        self.video_segments = []
+        self.governor = None
+        # I420 需要 ffmpeg 编码器和偶数尺寸，cv2.VideoWriter 后备方案只接受 BGR
+        width, height = self.output_size
+        self.pixel_format = 'bgr24'
+        if self.i420_pipeline and VideoEncoder.available() and width % 2 == 0 and height % 2 == 0:
+            self.pixel_format = 'yuv420p'
+        if VideoEncoder.available():
+            self.temp_video = os.path.join(temp_dir, "temp_video.mkv")
+            ladder = build_ladder()
+            if self.adaptive_quality:
+                self.governor = QualityGovernor(ladder, self.fps)
+            self.writer = self._open_video_segment(ladder[0])
+        else:
+            self.temp_video = os.path.join(temp_dir, "temp_video.avi")
+            self.writer = cv2.VideoWriter(
+                self.temp_video,
+                cv2.VideoWriter_fourcc(*'MJPG'),
+                self.fps,
+                self.output_size,
+                isColor=True
+            )
+        self.monitor_recordings = []
+        if separate:
+            self._open_monitor_recordings()
+        self.zoom_requests = 0
+        self.fanout = None
+        if self.output_branches and VideoEncoder.available():
+            self.fanout = BranchFanout(self.output_branches, self.output_size, self.fps, self.pixel_format,
+                                       temp_dir, self.output_file)
+            self.fanout.start()
         
         # 开始录制线程
-        self.record_thread = threading.Thread(target=self._record_screen, args=(region,))
+        self.record_thread = threading.Thread(target=self._record_screen, args=(monitor,))
         self.audio_thread = threading.Thread(target=self._record_audio)
         
         self.record_thread.start()
         self.audio_thread.start()
         
-    def _record_screen(self, region=None):
-        settings = QSettings("ScreenRecorder", "Watermark")
+    def _open_monitor_recordings(self):
+        # 分别保存时第一个显示器走主录制流程，其余显示器各自合成、编码，输出文件名加显示器编号
+        watermark, mouse = self._overlay_settings()
+        mouse = dict(mouse, enable_sound=False)  # 点击音效只由主画面播放一次
+        level = build_ladder()[0]
+        base, ext = os.path.splitext(self.output_file)
+        for number, item in enumerate(self._monitors[1:], 2):
+            layout = plan_layout((item['width'], item['height']), self.frame_size,
+                                 self.layout_mode, self.layout_upscale)
+            item = dict(item, width=layout.source[0], height=layout.source[1])
+            path = os.path.join(os.path.dirname(self.temp_video), f"temp_video_monitor{number}.mkv")
+            encoder = VideoEncoder(path, layout.output, self.fps, level.preset, level.crf,
+                                   pixel_format=self.pixel_format)
+            encoder.start()
+            compositor = FrameCompositor(layout.output, watermark, mouse, None, self.pixel_format, layout,
+                                         privacy=self._privacy_settings())
+            self.monitor_recordings.append(
+                MonitorRecording(item, compositor, encoder, f"{base}_显示器{number}{ext}"))
         
-        # 加载水印设置
-        text = settings.value("text", "")
-        text_size = int(settings.value("size", 24))
+    def _open_video_segment(self, level):
+        # 按编码档位开始一个新的视频分段，编码尺寸保持偶数
+        width, height = self.output_size
+        size = (int(width * level.scale) // 2 * 2, int(height * level.scale) // 2 * 2)
+        path = os.path.join(os.path.dirname(self.temp_video),
+                            f"temp_video_seg{len(self.video_segments)}.mkv")
+        if self.variable_frame_rate and VfrEncoder.available():
+            encoder = VfrEncoder(path, size, self.fps, level.preset, level.crf,
+                                 max_interval=self.vfr_max_interval, pixel_format=self.pixel_format)
+        else:
+            encoder = VideoEncoder(path, size, self.fps, level.preset, level.crf,
+                                   pixel_format=self.pixel_format)
+        encoder.start()
+        self.video_segments.append(encoder)
+        return encoder
+        
+    def _switch_encoder(self, level):
+        previous = self.writer
+        self.writer = self._open_video_segment(level)
+        # 旧分段在后台编码完剩余的帧，采集线程不等待
+        threading.Thread(target=previous.release, daemon=True).start()
+        
+    def _write_frame(self, frame, changed=True):
+        # cv2.VideoWriter 后备方案不区分重复帧
+        if isinstance(self.writer, VideoEncoder):
+            self.writer.write(frame, changed)
+        else:
+            self.writer.write(frame)
+        if self.fanout is not None:
+            self.fanout.write(frame, changed)
+        
+    def _overlay_settings(self):
+        # 读取水印和鼠标效果设置，转换为不依赖 Qt 的字典，可以传给采集进程
+        settings = QSettings("ScreenRecorder", "Watermark")
         
         # 修改透明度值的处理
         opacity = settings.value("opacity", 0.5)  # 默认值改为浮点数
@@ -78,209 +267,313 @@ class ScreenRecorder(QObject):
             opacity = float(opacity)
         except (ValueError, TypeError):
             opacity = 0.5  # 如果转换失败，使用默认值
-            
-        # 将 0-1 的浮点数转换为 0-255 的整数（用于 OpenCV）
-        text_opacity = int(opacity * 255)
-        
-        image_path = settings.value("image_path", "")
-        position = settings.value("position", "右下")
-        
-        # 加载水印图片
-        watermark_image = None
-        if image_path and os.path.exists(image_path):
-            watermark_image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
-            if watermark_image is not None:
-                # 调整图片大小
-                h, w = watermark_image.shape[:2]
-                new_h = int(self.frame_size[1] * 0.2)  # 设置为视频高度的 20%
-                new_w = int(w * new_h / h)
-                watermark_image = cv2.resize(watermark_image, (new_w, new_h))
-                
-                # 处理图片透明度
-                if watermark_image.shape[2] == 4:  # 如果有 alpha 通道
-                    alpha = watermark_image[:, :, 3] * opacity  # 应用透明度设置
-                    watermark_image[:, :, 3] = alpha
-                else:
-                    # 如果没有 alpha 通道，创建一个
-                    alpha = np.ones((new_h, new_w)) * 255 * opacity
-                    watermark_image = cv2.cvtColor(watermark_image, cv2.COLOR_BGR2BGRA)
-                    watermark_image[:, :, 3] = alpha
         
-        # 加载鼠标设置
-        mouse_settings = QSettings("ScreenRecorder", "Mouse")
-        enable_click = mouse_settings.value("enable_click", True, type=bool)
-        click_color = QColor(mouse_settings.value("click_color", "#FF0000"))
-        click_size = mouse_settings.value("click_size", 20, type=int)
-        enable_sound = mouse_settings.value("enable_sound", True, type=bool)
+        watermark = {
+            'text': settings.value("text", ""),
+            'size': int(settings.value("size", 24)),
+            'opacity': opacity,
+            'image_path': settings.value("image_path", ""),
+            'position': settings.value("position", "右下"),
+        }
         
-        enable_trail = mouse_settings.value("enable_trail", True, type=bool)
-        trail_color = QColor(mouse_settings.value("trail_color", "#0000FF"))
-        trail_width = mouse_settings.value("trail_width", 2, type=int)
+        def bgr(color):
+            return (color.blue(), color.green(), color.red())
         
-        enable_highlight = mouse_settings.value("enable_highlight", True, type=bool)
-        highlight_style = mouse_settings.value("highlight_style", "圆形光环")
-        highlight_size = mouse_settings.value("highlight_size", 50, type=int)
+        mouse_settings = QSettings("ScreenRecorder", "Mouse")
+        mouse = {
+            'enable_click': mouse_settings.value("enable_click", True, type=bool),
+            'click_color': bgr(QColor(mouse_settings.value("click_color", "#FF0000"))),
+            'click_size': mouse_settings.value("click_size", 20, type=int),
+            'enable_sound': mouse_settings.value("enable_sound", True, type=bool),
+            'enable_trail': mouse_settings.value("enable_trail", True, type=bool),
+            'trail_color': bgr(QColor(mouse_settings.value("trail_color", "#0000FF"))),
+            'trail_width': mouse_settings.value("trail_width", 2, type=int),
+            'enable_highlight': mouse_settings.value("enable_highlight", True, type=bool),
+            'highlight_style': mouse_settings.value("highlight_style", "圆形光环"),
+            'highlight_size': mouse_settings.value("highlight_size", 50, type=int),
+        }
+        return watermark, mouse
         
-        # 鼠标轨迹历史
-        trail_points = []
-        last_mouse_pos = None
-        click_effects = []  # 存储点击效果的位置和时间
+    def _record_screen(self, monitor):
+        watermark, mouse = self._overlay_settings()
         
         with mss.mss() as sct:
-            # 如果没有指定区域，使用主显示器
-            if region is None:
-                monitor = sct.monitors[1]  # 主显示器
-            else:
-                monitor = region
+            # 独立进程模式在准备阶段启动采集进程，和音频设备的初始化同时进行
+            if self.multiprocess_capture and not self._monitors:
+                try:
+                    self._capture_worker = CaptureWorker(monitor, self.output_size, self.fps,
+                                                         watermark, mouse, self.strip_parallel,
+                                                         self.pixel_format, self.layout, self.smart_zoom,
+                                                         self._privacy_settings())
+                    self._capture_worker.start()
+                except Exception as e:
+                    print(f"采集进程启动失败，改为在录制线程中采集: {e}")
+                    self._close_capture_worker()
             
-            while self.recording:
-                if not self.paused:
-                    # 捕获屏幕
-                    screenshot = sct.grab(monitor)
-                    frame = np.array(screenshot)
-                    
-                    # 转换颜色空间
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                    
-                    # 调整大小
-                    frame = cv2.resize(frame, self.frame_size)
-                    
-                    # 添加水印
-                    if text:
-                        # 创建透明层
-                        overlay = frame.copy()
-                        
-                        # 设置字体
-                        fontpath = "simhei.ttf"  # 使用系统自带的黑体字体
-                        font = ImageFont.truetype(fontpath, text_size)
-                        img_pil = Image.fromarray(frame)
-                        draw = ImageDraw.Draw(img_pil)
-                        
-                        # 获取文字大小
-                        bbox = draw.textbbox((0, 0), text, font=font)
-                        text_width = bbox[2] - bbox[0]
-                        text_height = bbox[3] - bbox[1]
-                        
-                        # 确定位置
-                        if position == "左上":
-                            pos = (10, 10)
-                        elif position == "右上":
-                            pos = (frame.shape[1] - text_width - 10, 10)
-                        elif position == "左下":
-                            pos = (10, frame.shape[0] - text_height - 10)
-                        else:  # 右下
-                            pos = (frame.shape[1] - text_width - 10, 
-                                  frame.shape[0] - text_height - 10)
-                        
-                        # 绘制文字
-                        draw.text(
-                            pos, 
-                            text,
-                            font=font,
-                            fill=(255, 255, 255),
-                            stroke_width=1,
-                            stroke_fill=(0, 0, 0)
-                        )
-                        
-                        # 转换回OpenCV格式
-                        frame = np.array(img_pil)
-                    
-                    if watermark_image is not None:
-                        # 添加图片水印
-                        h, w = watermark_image.shape[:2]
-                        
-                        # 确定位置
-                        if position == "左上":
-                            x, y = 10, 10
-                        elif position == "右上":
-                            x, y = frame.shape[1] - w - 10, 10
-                        elif position == "左下":
-                            x, y = 10, frame.shape[0] - h - 10
-                        else:  # 右下
-                            x, y = frame.shape[1] - w - 10, frame.shape[0] - h - 10
-                            
-                        # 合并水印
-                        roi = frame[y:y+h, x:x+w]
-                        if watermark_image.shape[2] == 4:  # 带透明通道
-                            alpha = watermark_image[:, :, 3] / 255.0
-                            for c in range(3):
-                                roi[:, :, c] = (
-                                    roi[:, :, c] * (1 - alpha) +
-                                    watermark_image[:, :, c] * alpha
-                                )
-                        else:
-                            roi[:] = watermark_image
-                    
-                    # 获取当前鼠标位置
-                    mouse_pos = QCursor.pos()
-                    mouse_x = mouse_pos.x() - monitor['left']
-                    mouse_y = mouse_pos.y() - monitor['top']
-                    
-                    # 处理鼠标轨迹
-                    if enable_trail:
-                        if last_mouse_pos:
-                            trail_points.append((last_mouse_pos, (mouse_x, mouse_y)))
-                        last_mouse_pos = (mouse_x, mouse_y)
-                        
-                        # 绘制轨迹
-                        for start, end in trail_points[-20:]:  # 只保留最近的20个点
-                            cv2.line(frame, start, end, 
-                                   (trail_color.blue(), trail_color.green(), trail_color.red()),
-                                   trail_width)
-                    
-                    # 处理鼠标高亮
-                    if enable_highlight:
-                        if highlight_style == "圆形光环":
-                            cv2.circle(frame, (mouse_x, mouse_y), highlight_size,
-                                     (255, 255, 255), 2)
-                        elif highlight_style == "聚光灯":
-                            mask = np.zeros(frame.shape[:2], dtype=np.uint8)
-                            cv2.circle(mask, (mouse_x, mouse_y), highlight_size, 255, -1)
-                            frame = cv2.addWeighted(frame, 0.7, 
-                                                  cv2.bitwise_and(frame, frame, mask=mask), 0.3, 0)
-                        elif highlight_style == "波纹":
-                            for i in range(3):
-                                size = highlight_size - i * 10
-                                if size > 0:
-                                    cv2.circle(frame, (mouse_x, mouse_y), size,
-                                             (255, 255, 255), 1)
-                    
-                    # 处理点击效果
-                    if enable_click:
-                        buttons = win32api.GetKeyState(0x01)  # 检查鼠标左键状态
-                        if buttons < 0:  # 鼠标按下
-                            click_effects.append({
-                                'pos': (mouse_x, mouse_y),
-                                'time': time.time(),
-                                'size': 0
-                            })
-                            if enable_sound:
-                                winsound.PlaySound("click.wav", winsound.SND_ASYNC)
-                        
-                        # 更新和绘制点击效果
-                        current_time = time.time()
-                        new_effects = []
-                        for effect in click_effects:
-                            if current_time - effect['time'] < 0.5:  # 效果持续0.5秒
-                                effect['size'] = min(effect['size'] + 2, click_size)
-                                cv2.circle(frame, effect['pos'], effect['size'],
-                                         (click_color.blue(), click_color.green(), click_color.red()),
-                                         2)
-                                new_effects.append(effect)
-                        click_effects = new_effects
-                    
-                    # 写入帧
-                    self.writer.write(frame)
-                    
-                    # 控制帧率
-                    time.sleep(1/self.fps)
+            resume = None
+            if self._capture_worker is not None:
+                resume = self._record_from_worker(self._capture_worker, monitor)
+            if self._capture_worker is None or resume is not None:
+                # 采集进程出错时在录制线程中接着采集，时间格和上一帧接续，视频不中断；
+                # 编码器可能还在读共享内存，采集进程等停止录制时再关闭
+                self._record_in_process(sct, monitor, watermark, mouse, *(resume or ()))
         
         self.writer.release()
         
+    def _record_in_process(self, sct, monitor, watermark, mouse, next_slot=0, last_frame=None):
+        # 只对变化的图块做颜色转换和缩放，再画水印和鼠标效果；
+        # 多线程时在准备阶段实测选出条带数
+        engine = None
+        if self.strip_parallel:
+            engine = StripEngine()
+            strips = engine.calibrate((monitor['height'], monitor['width'], 4), self.layout.content_size)
+            print(f"画面处理使用 {strips} 个条带（{engine.workers} 核）")
+        compositor = FrameCompositor(self.output_size, watermark, mouse, engine, self.pixel_format,
+                                     self.layout, self.smart_zoom, self._privacy_settings())
+        # 多显示器时每个显示器一个采集线程，同时截图
+        group, canvas = self._open_monitor_group(monitor) if self._monitors else (None, None)
+        
+        # next_slot 为固定帧率时间格上的下一个位置，last_frame 为上一帧（用于补帧）
+        tracker = self.window_tracker
+        tracked = 0
+        zoom_requests = self.zoom_requests
+        
+        # 暂停时阻塞在状态机上，停止后退出
+        while self.session.wait_while_paused():
+            while zoom_requests < self.zoom_requests and compositor.zoom is not None:
+                zoom_requests += 1
+                print(f"放大倍数: {compositor.zoom.cycle():g}x")
+            # 打码区域跟随窗口移动
+            if self.privacy_trackers and self._follow_privacy_windows():
+                for item in [compositor] + [recording.compositor for recording in self.monitor_recordings]:
+                    for index, rect in enumerate(self.privacy_rects):
+                        item.privacy.move(index, rect)
+            # 跟随的窗口移动或改变大小时更新采集区域
+            if tracker is not None and tracker.state[0] != tracked:
+                tracked, rect = tracker.state
+                layout = self._follow_window(monitor, rect)
+                if layout is not None:
+                    compositor.set_layout(layout)
+            # 捕获屏幕，记录采集时刻
+            captured_pts = self.clock.now()
+            captured = self.clock.media_now()
+            grab_started = time.perf_counter()
+            if group is None:
+                screenshot = sct.grab(monitor)
+                frame = np.asarray(screenshot)
+            else:
+                # 单独保存的显示器在各自线程里按同一个时间格写入
+                for recording in self.monitor_recordings:
+                    recording.slot = int(round(captured * self.fps / 1e9))
+                group.grab()
+                frame = canvas if canvas is not None else group.grabbers[0].raw
+            grabbed = time.perf_counter()
+            
+            # 屏幕内容和叠加层都没变时 changed 为 False，告诉编码器这是重复帧
+            frame, changed = compositor.compose(frame, monitor)
+            composed = time.perf_counter()
+            
+            # 按采集时刻放到固定帧率的时间格上：落后时重复上一帧补齐，超前时丢弃
+            slot = int(round(captured * self.fps / 1e9))
+            if slot >= next_slot:
+                filler = last_frame if last_frame is not None else frame
+                for _ in range(slot - next_slot):
+                    self._write_frame(filler, changed=False)
+                self._write_frame(frame, changed)
+                self.pts_writer.write(STREAM_VIDEO, captured_pts, slot)
+                last_frame = frame
+                next_slot = slot + 1
+            
+            divisor = self._update_governor(grabbed - grab_started, composed - grabbed)
+            
+            # 控制帧率：等到下一个采集的时间格（降帧时跳过的时间格由上一帧补齐），
+            # 扣除本帧的处理耗时；暂停或停止时立即醒来
+            target_slot = -(-next_slot // divisor) * divisor
+            delay = target_slot * 1e9 / self.fps - self.clock.media_now()
+            if delay > 0:
+                self.session.wait(delay / 1e9)
+
+        if compositor.privacy is not None:
+            privacy = compositor.privacy
+            print(f"打码 {privacy.redacted} 次，区域没有变化跳过 {privacy.skipped} 次，"
+                  f"平均 {privacy.seconds / max(privacy.redacted + privacy.skipped, 1) * 1000:.2f}ms")
+        if group is not None:
+            group.close()
+            print(f"{len(group.grabbers)} 个显示器同步采集，采集时刻最大相差 {group.max_skew_ns / 1e6:.1f}ms")
+        if engine is not None:
+            engine.close()
+        
+    def _open_monitor_group(self, monitor):
+        """启动各显示器的采集线程，返回 (MonitorGroup, 拼接画布)；分别保存时画布为 None"""
+        if not self.monitor_recordings:
+            canvas, views = stitch_canvas(self._monitors, self.layout.source)
+            return MonitorGroup(self._monitors, [copy_into(view) for view in views]), canvas
+        monitors = [monitor] + [recording.monitor for recording in self.monitor_recordings]
+        handlers = [None] + [recording.handler for recording in self.monitor_recordings]
+        return MonitorGroup(monitors, handlers), None
+        
+    def _record_from_worker(self, worker, monitor):
+        """帧由采集进程写在共享内存槽位里，这里只负责放到时间格上并交给编码器
+
+        每次写入编码器占用一次槽位引用，编码完成后释放。正常停止时返回 None；
+        采集进程出错时返回 (下一个时间格, 上一帧的拷贝)，由录制线程接着采集。
+        """
+        ring = worker.ring
+        resume = None
+        next_slot = 0
+        last = None  # 上一帧的 (槽位, 帧)，补帧时使用，换成新帧后才释放
+        tracker = self.window_tracker
+        tracked = 0
+        try:
+            while self.session.wait_while_paused():
+                if not worker.running.is_set():
+                    worker.resume(self.clock)
+                if tracker is not None and tracker.state[0] != tracked:
+                    tracked, rect = tracker.state
+                    self._follow_window(monitor, rect)
+                    worker.move(monitor, self.layout)
+                worker.zoom_requests.value = self.zoom_requests
+                if self.privacy_trackers and self._follow_privacy_windows():
+                    worker.move_privacy(self.privacy_rects)
+                item = ring.receive(timeout=0.1)
+                if item is None:
+                    if not worker.process.is_alive():
+                        raise RuntimeError("采集进程意外退出")
+                    continue
+                index, info = item
+                if index is None:
+                    if info[0] == 'error':
+                        raise RuntimeError(info[1])
+                    continue
+                
+                captured_ns, changed, grab_seconds, compose_seconds = info
+                captured_pts = self.clock.to_pts(captured_ns)
+                # 暂停前后采集的帧直接丢弃
+                if self.session.paused or self.session.in_pause(captured_pts, captured_pts):
+                    worker.pause()
+                    ring.release(index)
+                    continue
+                captured = captured_pts - self.clock.paused_ns
+                slot = int(round(captured * self.fps / 1e9))
+                if slot < next_slot:
+                    ring.release(index)
+                    continue
+                
+                frame = ring.frame(index)
+                filler = last if last is not None else (index, frame)
+                for _ in range(slot - next_slot):
+                    self._write_shared_frame(ring, *filler, changed=False)
+                self._write_shared_frame(ring, index, frame, changed)
+                self.pts_writer.write(STREAM_VIDEO, captured_pts, slot)
+                if last is not None:
+                    ring.release(last[0])
+                last = (index, frame)
+                next_slot = slot + 1
+                
+                worker.divisor.value = self._update_governor(grab_seconds, compose_seconds)
+        except Exception as e:
+            print(f"采集进程错误，改为在录制线程中采集: {e}")
+            resume = (next_slot, last[1].copy() if last is not None else None)
+        finally:
+            worker.pause()
+            if last is not None:
+                ring.release(last[0])
+        return resume
+        
+    def _start_privacy_trackers(self):
+        # 跟随窗口的打码区域：按窗口当前位置换算成屏幕坐标，每个窗口一个后台线程查询位置
+        self.privacy_rects = [tuple(region.rect) for region in self.privacy_regions]
+        self.privacy_trackers = []
+        handles = {region.window for region in self.privacy_regions if region.window is not None}
+        backend = default_backend() if handles else None
+        for handle in handles:
+            geometry = backend.geometry(handle) if backend is not None else None
+            if geometry is None:
+                print(f"打码区域要跟随的窗口不可用，按屏幕坐标处理: {handle}")
+                continue
+            indices = [index for index, region in enumerate(self.privacy_regions) if region.window == handle]
+            tracker = WindowTracker(backend, handle, geometry)
+            tracker.start()
+            self.privacy_trackers.append({'tracker': tracker, 'indices': indices, 'version': -1})
+        self._follow_privacy_windows()
+        
+    def _follow_privacy_windows(self):
+        """窗口移动后更新跟随窗口的打码区域的屏幕坐标，返回是否有变化"""
+        changed = False
+        for item in self.privacy_trackers:
+            version, (left, top, _, _) = item['tracker'].state
+            if version == item['version']:
+                continue
+            item['version'] = version
+            for index in item['indices']:
+                x, y, width, height = self.privacy_regions[index].rect
+                self.privacy_rects[index] = (left + x, top + y, width, height)
+            changed = True
+        return changed
+        
+    def _privacy_settings(self):
+        # 传给合成器的打码区域，坐标为录制开始时的屏幕坐标
+        return [replace(region, rect=rect) for region, rect in zip(self.privacy_regions, self.privacy_rects)]
+        
+    def cycle_zoom(self):
+        # 由快捷键调用，采集线程（或采集进程）在下一帧切换放大倍数
+        if self.recording and self.smart_zoom is not None:
+            self.zoom_requests += 1
+        
+    def _follow_window(self, monitor, rect):
+        """按窗口的新位置更新采集区域：移动时只平移，大小变化时重新布局，输出尺寸不变
+
+        返回新的布局，大小没有变化时返回 None
+        """
+        left, top, width, height = rect
+        monitor['left'], monitor['top'] = left, top
+        layout = self.layout.follow((width, height), self.layout_upscale)
+        if layout == self.layout:
+            return None
+        self.layout = layout
+        monitor['width'], monitor['height'] = layout.source
+        print(f"跟随窗口: 采集 {width}x{height} -> 画面 {layout.content}")
+        return layout
+        
+    def _write_shared_frame(self, ring, index, frame, changed):
+        # cv2.VideoWriter 后备方案同步写入，写完即可释放槽位
+        if isinstance(self.writer, VideoEncoder):
+            ring.retain(index)
+            self.writer.write(frame, changed, done=lambda: ring.release(index))
+        else:
+            self.writer.write(frame)
+        if self.fanout is not None:
+            ring.retain(index)
+            self.fanout.write(frame, changed, done=lambda: ring.release(index))
+        
+    def _update_governor(self, grab_seconds, compose_seconds):
+        # 统计采集和合成耗时以及编码队列积压，由调节器决定是否切换编码档位，返回降帧倍数
+        if self.governor is None:
+            return 1
+        self.governor.record('capture', grab_seconds)
+        self.governor.record('compose', compose_seconds)
+        level = self.governor.update(self.writer.queue.qsize(), self.writer.queue.maxsize)
+        if level is not None:
+            self._switch_encoder(level)
+        return self.governor.level.fps_divisor
+        
+    def _close_capture_worker(self):
+        # 所有编码器释放之后调用，共享内存在这里删除
+        worker = self._capture_worker
+        self._capture_worker = None
+        if worker is None:
+            return
+        try:
+            stats = worker.close()
+            if stats:
+                print(f"采集进程: {stats['frames']} 帧, 没有空闲槽位丢弃 {stats['dropped']} 帧")
+        except Exception as e:
+            print(f"关闭采集进程失败: {e}")
+        
     def _record_audio(self):
         # 设置音频参数
-        sample_rate = 44100
-        channels = 2
+        sample_rate = self.sample_rate
+        channels = self.channels
         chunk_size = 4096  # 增加缓冲区大小
         
         # 根据音频源设置选择录制方式
@@ -292,269 +585,388 @@ class ScreenRecorder(QObject):
             duration = 1  # 临时duration，后面会根据视频长度调整
             samples = np.zeros((int(duration * sample_rate), channels), dtype=np.float32)
             sf.write(self.temp_audio, samples, sample_rate)
+            self.session.start()
             return
             
+        # 编码和写盘放在独立线程，采集线程只负责入队；分轨时每个设备一个写入线程
+        writers = []
+        self.audio_tracks = []
+        sources = []
+        streams_opened = False
+        denoiser = None
+        vad = None
         try:
-            with sf.SoundFile(self.temp_audio, mode='w', samplerate=sample_rate,
-                            channels=channels) as audio_file:
-                
-                # 设置输入流
-                streams = []
+            # 设置输入设备，每个设备以回调方式写入自己的环形缓冲区
+            data_ready = threading.Event()
+            volumes = []
+            # 设备列表就绪后再打开音频流，打开期间不会重新枚举设备
+            with self.device_registry.open_streams():
+                streams_opened = True
                 if record_system:
                     try:
-                        # 获取系统声音设备
-                        devices = sd.query_devices()
-                        wasapi_devices = [
-                            i for i, d in enumerate(devices)
-                            if 'WASAPI' in d['name'] and d['max_input_channels'] > 0
-                        ]
-                        if wasapi_devices:
-                            system_stream = sd.InputStream(
-                                samplerate=sample_rate,
-                                channels=channels,
-                                device=wasapi_devices[0]
-                            )
-                            streams.append(system_stream)
+                        # 获取系统声音设备：用户指定的设备，否则使用第一个回环设备
+                        device = self.device_registry.resolve(self.system_device, self._auto_system_device)
+                        if device is not None:
+                            print(f"系统声音设备: {device.label}")
+                            sources.append(AudioSource(
+                                "系统声音", device.index, data_ready=data_ready
+                            ))
+                            volumes.append(self.system_volume / 100)
+                        else:
+                            print("未找到系统声音设备")
                     except Exception as e:
                         print(f"系统声音录制初始化失败: {e}")
-                
+            
                 if record_mic:
                     try:
-                        mic_stream = sd.InputStream(
-                            samplerate=sample_rate,
-                            channels=channels,
-                            device=None  # 使用默认输入设备
-                        )
-                        streams.append(mic_stream)
+                        sources.append(AudioSource(
+                            "麦克风", self._mic_device_index(), data_ready=data_ready
+                        ))
+                        volumes.append(self.mic_volume / 100)
                     except Exception as e:
                         print(f"麦克风录制初始化失败: {e}")
-                
-                # 开始录制
-                for stream in streams:
-                    stream.start()
-                
-                while self.recording:
-                    if not self.paused:
-                        # 使用更大的缓冲区
-                        mixed_audio = np.zeros((chunk_size, channels), dtype=np.float32)
-                        
-                        for i, stream in enumerate(streams):
-                            try:
-                                data, _ = stream.read(chunk_size)
-                                volume = (self.system_volume if i == 0 else self.mic_volume) / 100
-                                mixed_audio += data * volume
-                            except Exception as e:
-                                print(f"音频录制错误: {e}")
-                                continue
-                        
-                        # 在录制音频时应用降噪
-                        if self.audio_source != "静音" and self.noise_reduction_enabled:
-                            try:
-                                mixed_audio = self._process_audio(mixed_audio, sample_rate)
-                            except Exception as e:
-                                print(f"降噪处理错误: {e}")
-                        
-                        audio_file.write(mixed_audio)
-                
-                # 停止所有流
-                for stream in streams:
-                    stream.stop()
-                    stream.close()
-                    
-        except Exception as e:
-            print(f"音频录制错误: {e}")
-            # 创建静音文件作为后备
-            duration = 1
-            samples = np.zeros((int(duration * sample_rate), channels), dtype=np.float32)
-            sf.write(self.temp_audio, samples, sample_rate)
-        
-    def _process_audio(self, audio_data, sample_rate):
-        if not self.noise_reduction_enabled:
-            return audio_data
-            
-        # 确保音频数据足够长
-        if len(audio_data) < 2048:
-            return audio_data
             
-        try:
-            # 将音频数据转换为float32类型
-            audio_float = audio_data.astype(np.float32)
+            self.audio_sources = sources
+            if not sources:
+                raise RuntimeError("没有可用的音频输入设备")
             
-            # 1. 语音增强的带通滤波
-            nyquist = sample_rate / 2
-            # 人声频率范围：300Hz - 3400Hz
-            low_cutoff = 300 / nyquist
-            high_cutoff = 3400 / nyquist
+            # 分轨时只对麦克风音轨降噪，混音推迟到合并阶段；否则对混音结果降噪
+            multitrack = self.multitrack_audio and len(sources) > 1
+            if multitrack:
+                extension = audio_extension(self.audio_format)
+                for index, (source, volume) in enumerate(zip(sources, volumes)):
+                    path = os.path.join(os.path.dirname(self.temp_audio),
+                                        f"temp_audio_track{index}{extension}")
+                    self.audio_tracks.append((source.name, path, volume))
+                    writers.append(AudioWriter(path, sample_rate, channels, self.audio_format))
+                mic_tracks = [i for i, source in enumerate(sources) if source.name == "麦克风"]
+                processed_index = mic_tracks[0] if mic_tracks else None
+            else:
+                writers.append(AudioWriter(self.temp_audio, sample_rate, channels, self.audio_format))
+                processed_index = 0
+            for writer in writers:
+                writer.start()
             
-            # 创建巴特沃斯带通滤波器
-            b, a = butter(6, [low_cutoff, high_cutoff], btype='band')
+            # 降噪处理的状态在整个录制过程中延续，工作进程在设备启动前就绪
+            # 独立进程模式下人声滤波也在工作进程中运行
+            dsp = None
+            if self.noise_reduction_enabled and processed_index is not None:
+                spectral = self.noise_reduction_mode == "spectral" and self.noise_profile is not None
+                if spectral and not multitrack and any(source.name != "麦克风" for source in sources):
+                    # 噪声轮廓是从麦克风学到的，用它处理混入的系统声音会把系统声音一起压掉
+                    print("系统声音混在同一音轨中，不使用频谱降噪，改用人声滤波")
+                    spectral = False
+                if spectral or self.multiprocess_capture:
+                    try:
+                        denoiser = DenoiseWorker(sample_rate, channels,
+                                                 self.noise_profile if spectral else None,
+                                                 self.noise_reduction_strength)
+                        denoiser.start()
+                    except Exception as e:
+                        print(f"降噪进程启动失败: {e}")
+                        denoiser = None
+                if denoiser is None:
+                    dsp = StreamingDSP(sample_rate, channels, self.noise_reduction_strength)
             
-            # 2. 对每个通道分别处理
-            enhanced_audio = np.zeros_like(audio_float)
-            for channel in range(audio_float.shape[1]):
-                # 应用带通滤波
-                channel_data = lfilter(b, a, audio_float[:, channel])
-                
-                # 计算信号能量
-                frame_length = 512
-                hop_length = frame_length // 4
-                num_frames = 1 + (len(channel_data) - frame_length) // hop_length
-                
-                # 使用重叠帧处理
-                processed_data = np.zeros_like(channel_data)
-                for i in range(num_frames):
-                    start = i * hop_length
-                    end = start + frame_length
-                    
-                    # 获取当前帧
-                    frame = channel_data[start:end]
-                    
-                    # 计算帧能量
-                    frame_energy = np.mean(frame ** 2)
-                    
-                    # 自适应阈值
-                    noise_threshold = np.sqrt(frame_energy) * 0.1
-                    
-                    # 非线性抑制
-                    gain = 1.0 / (1.0 + np.exp(-(np.abs(frame) - noise_threshold) * 10))
-                    processed_frame = frame * gain
-                    
-                    # 使用重叠相加法
-                    if i == 0:
-                        processed_data[start:end] = processed_frame
-                    else:
-                        # 创建渐变窗口
-                        fade_in = np.linspace(0, 1, hop_length)
-                        fade_out = np.linspace(1, 0, frame_length - hop_length)
-                        window = np.concatenate([fade_in, fade_out])
-                        
-                        # 应用渐变
-                        processed_data[start:end] = processed_data[start:end] * (1 - window) + \
-                                                  processed_frame * window
-                
-                # 应用降噪强度
-                strength = self.noise_reduction_strength * 0.8  # 降低最大强度以保持自然
-                enhanced_audio[:, channel] = channel_data * (1 - strength) + processed_data * strength
+            # 开始录制，设备启动后会话进入录制状态
+            for source in sources:
+                source.start()
+            self.session.start()
             
-            # 3. 动态范围压缩
-            compressed = np.zeros_like(enhanced_audio)
-            for channel in range(enhanced_audio.shape[1]):
-                data = enhanced_audio[:, channel]
-                
-                # 计算RMS能量
-                rms = np.sqrt(np.mean(data ** 2))
-                
-                # 自适应压缩阈值
-                threshold = rms * 1.5
+            for source in sources:
+                print(f"{source.name}: {source.samplerate}Hz, {source.channels} 声道")
+            mixer = AudioMixer(sources, volumes, chunk_size, sample_rate, channels, data_ready)
+            meter = LevelMeter([source.name for source in sources], sample_rate,
+                               self.audio_levels.emit, self.audio_warning.emit)
+            vad = VadWriter(self.temp_vad, chunk_size / sample_rate)
+            while self.session.capturing:
+                # 没有数据时阻塞在设备回调的事件上
+                blocks = mixer.read_tracks(lambda: self.session.capturing)
+                if blocks is None:
+                    break
                 
-                # 软膝压缩
-                ratio = 2.0
-                knee_width = threshold * 0.3
+                # 电平按混音前的各路原始数据计算，暂停期间也继续显示
+                block_levels = meter.update(blocks)
+                if not multitrack:
+                    blocks = [mixer.mix(blocks)]
                 
-                # 计算增益
-                gain = np.ones_like(data)
-                magnitude = np.abs(data)
+                # 暂停期间继续消费缓冲区以保持漂移估计连续，完全落在暂停区间内的数据块丢弃，
+                # 跨越暂停边界的数据块保留，合并时按暂停时间戳精确裁剪
+                block_pts = self.clock.to_pts(mixer.block_start_ns)
+                block_end = block_pts + len(blocks[0]) * 1e9 / sample_rate
+                if self.session.in_pause(block_pts, block_end):
+                    continue
+                self.pts_writer.write(STREAM_AUDIO, block_pts, len(blocks[0]))
+                # 索引按成片时间（扣除暂停）记录，取各路中最响的电平
+                vad.add((block_pts - self.clock.paused_ns) / 1e9, max(block_levels))
                 
-                # 软膝区域
-                knee_mask = (magnitude > (threshold - knee_width)) & (magnitude < (threshold + knee_width))
-                above_mask = magnitude >= (threshold + knee_width)
-                
-                # 软膝压缩
-                knee_gain = 1.0 - (1.0 - 1.0/ratio) * ((magnitude[knee_mask] - (threshold - knee_width)) / (2 * knee_width)) ** 2
-                gain[knee_mask] = knee_gain
-                
-                # 硬压缩
-                gain[above_mask] = (threshold + (magnitude[above_mask] - threshold) / ratio) / magnitude[above_mask]
-                
-                # 应用增益
-                compressed[:, channel] = data * gain
+                for index, (block, writer) in enumerate(zip(blocks, writers)):
+                    # 在录制音频时应用降噪
+                    processed_blocks = [block]
+                    if index == processed_index and denoiser is not None:
+                        denoiser.submit(block)
+                        processed_blocks = denoiser.poll()
+                    elif index == processed_index and dsp is not None:
+                        try:
+                            processed_blocks = [dsp.process(block)]
+                        except Exception as e:
+                            print(f"降噪处理错误: {e}")
+                            dsp = None
+                    
+                    for processed in processed_blocks:
+                        writer.write(processed)
             
-            # 4. 最终处理
-            # 应用makeup增益
-            makeup_gain = 1.2
-            compressed *= makeup_gain
+            if denoiser is not None:
+                for processed in denoiser.close():
+                    writers[processed_index].write(processed)
+                denoiser = None
+            elif dsp is not None:
+                writers[processed_index].write(dsp.flush())
             
-            # 限幅以防止削波
-            compressed = np.clip(compressed, -0.95, 0.95)
+            # 停止所有设备
+            for source in sources:
+                source.stop()
             
-            # 转换回int16
-            return (compressed * 32768.0).astype(np.int16)
+            for name, stats in self.get_audio_stats().items():
+                print(f"{name} 音频统计: {stats}")
+            for name, (drift_ms, corrected) in mixer.get_drift().items():
+                print(f"{name} 时钟漂移: {drift_ms:.2f}ms, 累计修正 {corrected} 个样本")
+                
+        except Exception as e:
+            print(f"音频录制错误: {e}")
+            # 音频失败时不影响视频录制
+            self.session.start()
+            # 写入静音数据作为后备
+            if not writers:
+                writers.append(AudioWriter(self.temp_audio, sample_rate, channels, self.audio_format))
+                writers[0].start()
+            duration = 1
+            for writer in writers:
+                writer.write(np.zeros((int(duration * sample_rate), channels), dtype=np.float32))
+        finally:
+            for source in sources:
+                try:
+                    source.stop()
+                except Exception as e:
+                    print(f"关闭音频设备失败: {e}")
+            if streams_opened:
+                self.device_registry.streams_closed()
+            if denoiser is not None and denoiser.process.is_alive():
+                denoiser.process.terminate()
+            if vad is not None:
+                vad.close()
+            for writer in writers:
+                writer.close()
+                print(f"音频写入完成 {os.path.basename(writer.path)}: {writer.frames_written} 帧, "
+                      f"最大积压 {writer.max_backlog} 块")
+        
+    def _auto_system_device(self):
+        devices = self.device_registry.system_devices()
+        return devices[0] if devices else None
+        
+    def _mic_device_index(self):
+        # 用户指定的麦克风，否则为 None（系统默认输入设备）
+        device = self.device_registry.resolve(self.mic_device, lambda: None)
+        if device is not None:
+            print(f"麦克风设备: {device.label}")
+            return device.index
+        return None
+        
+    def start_noise_sampling(self):
+        # 倒计时期间打开麦克风采集环境噪声
+        self.stop_noise_sampling()
+        sampler = None
+        with self.device_registry.open_streams():
+            try:
+                sampler = AudioSource("噪声采样", self._mic_device_index(), buffer_seconds=12)
+                sampler.start()
+            except Exception as e:
+                print(f"噪声采样启动失败: {e}")
+                if sampler is not None:
+                    sampler.stop()
+                sampler = None
+        self._noise_sampler = sampler
+        if sampler is None:
+            self.device_registry.streams_closed()
             
+    def stop_noise_sampling(self):
+        # 结束噪声采样，返回学习到的噪声轮廓
+        sampler = self._noise_sampler
+        if sampler is None:
+            return None
+        self._noise_sampler = None
+        
+        try:
+            sampler.stop()
+        except Exception as e:
+            print(f"关闭噪声采样设备失败: {e}")
+        self.device_registry.streams_closed()
+        try:
+            audio = np.zeros((sampler.ring.available, sampler.channels), dtype=np.float32)
+            sampler.ring.read(len(audio), audio)
+            # 跳过设备刚打开时的不稳定数据
+            audio = audio[int(0.2 * sampler.samplerate):]
+            return NoiseProfile.from_audio(audio, sampler.samplerate)
+        except Exception as e:
+            print(f"噪声采样失败: {e}")
+            return None
+        
+    def get_audio_stats(self):
+        # 各音频设备的溢出/欠载计数
+        return {source.name: source.get_stats() for source in self.audio_sources}
+        
+    def _sync_audio(self, audio_path):
+        # 按时间戳补齐/裁剪音频，使其与视频的固定帧率时间格对齐，失败时返回原文件
+        base, _ = os.path.splitext(audio_path)
+        try:
+            synced = align_audio(self.temp_sync, audio_path, base + "_synced.flac")
+            if synced:
+                return synced
         except Exception as e:
-            print(f"音频降噪处理失败: {e}")
-            return audio_data
+            print(f"音视频同步失败，使用原始音频: {e}")
+        return audio_path
+        
+    def _join_video_segments(self):
+        # 只有一个分段时直接使用，否则先拼接为一个文件
+        if not self.video_segments:
+            return self.temp_video
+        paths = [encoder.path for encoder in self.video_segments]
+        if len(paths) == 1:
+            return paths[0]
+        scaled = concat_segments(paths, self.temp_video, self.output_size)
+        print(f"拼接 {len(paths)} 个视频分段，其中 {scaled} 个降分辨率分段放大到输出尺寸")
+        return self.temp_video
         
     def _merge_audio_video(self):
+        segment_paths = [encoder.path for encoder in self.video_segments]
+        video_path = segment_paths[0] if segment_paths else self.temp_video
+        if self.audio_tracks:
+            tracks = self.audio_tracks
+        else:
+            tracks = [("音频", self.temp_audio, 1.0)]
+        audio_paths = [path for _, path, _ in tracks]
+        synced_paths = []
         try:
-            # 使用 moviepy 合并音频和视频，并转换为 MP4
-            video_clip = VideoFileClip(self.temp_video.replace('.mp4', '.avi'))
-            audio_clip = AudioFileClip(self.temp_audio)
-            
-            # 设置输出参数
-            final_clip = video_clip.with_audio(audio_clip)
-            final_clip.write_videofile(
+            video_path = self._join_video_segments()
+            synced_paths = [self._sync_audio(path) for path in audio_paths]
+            # 单音轨的音量在混音时已经应用；分轨文件保存原始电平，音量只作用于混音轨
+            plan, elapsed = mux(
+                video_path,
+                [(path, name, volume) for (name, _, volume), path in zip(tracks, synced_paths)],
                 self.output_file,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True,
-                fps=self.fps,
-                threads=4,
-                preset='ultrafast',
-                ffmpeg_params=[
-                    '-crf', '23',
-                    '-pix_fmt', 'yuv420p'
-                ]
+                premix=bool(self.audio_tracks) and self.premix_track,
             )
-            
-            # 清理资源
-            video_clip.close()
-            audio_clip.close()
+            print(f"封装完成 {elapsed:.2f}s: {plan}")
+            # 单独保存的其他显示器和额外输出使用同一条（已对齐的）音轨
+            for path, output_file in self._extra_outputs():
+                plan, elapsed = mux(
+                    path,
+                    [(audio, name, volume) for (name, _, volume), audio in zip(tracks, synced_paths)],
+                    output_file,
+                    premix=bool(self.audio_tracks) and self.premix_track,
+                )
+                print(f"封装 {os.path.basename(output_file)} 完成 {elapsed:.2f}s: {plan}")
             
         except Exception as e:
             print(f"合并音视频失败: {e}")
-            # 尝试直接复制视频文件作为备选方案
-            import shutil
+            # 只保留视频作为备选方案
             try:
-                # 转换 AVI 到 MP4
-                os.system(f'ffmpeg -i {self.temp_video.replace(".mp4", ".avi")} -c:v libx264 -preset ultrafast {self.output_file}')
+                mux(video_path, [], self.output_file)
             except Exception as copy_error:
                 print(f"转换视频文件失败: {copy_error}")
         
         finally:
             # 清理临时文件
             try:
-                if os.path.exists(self.temp_video.replace('.mp4', '.avi')):
-                    os.remove(self.temp_video.replace('.mp4', '.avi'))
-                if os.path.exists(self.temp_audio):
-                    os.remove(self.temp_audio)
+                temp_paths = [self.temp_video, self.temp_sync] + segment_paths + audio_paths + synced_paths
+                temp_paths += [path for path, _ in self._extra_outputs()]
+                for path in temp_paths:
+                    if path and os.path.exists(path):
+                        os.remove(path)
             except Exception as cleanup_error:
                 print(f"清理临时文件失败: {cleanup_error}")
         
+    def _extra_outputs(self):
+        # 主文件之外的视频：[(临时视频, 输出文件)]
+        outputs = [(recording.encoder.path, recording.output_file) for recording in self.monitor_recordings]
+        if self.fanout is not None:
+            outputs += [(output['encoder'].path, output['output_file']) for output in self.fanout.outputs]
+        return outputs
+        
+    def _save_vad_index(self):
+        # 合并成功后把语音活动索引放到视频旁边
+        try:
+            if self.temp_vad and os.path.exists(self.temp_vad):
+                if os.path.exists(self.output_file):
+                    shutil.move(self.temp_vad, vad_path(self.output_file))
+                else:
+                    os.remove(self.temp_vad)
+        except Exception as e:
+            print(f"保存语音活动索引失败: {e}")
+        
     def pause_recording(self):
-        self.paused = True
+        timestamp = self.session.pause()
+        if timestamp is not None:
+            self.pts_writer.write(EVENT_PAUSE, timestamp)
+            if self._capture_worker is not None:
+                self._capture_worker.pause()
         
     def resume_recording(self):
-        self.paused = False
+        timestamp = self.session.resume()
+        if timestamp is not None:
+            self.pts_writer.write(EVENT_RESUME, timestamp)
         
     def stop_recording(self):
         if not self.recording:
             return
             
-        self.recording = False
+        # 从停止到输出文件就绪的耗时
+        stop_started = time.perf_counter()
+        # 停止时若处于暂停状态，暂停区间在此结束
+        paused = self.session.paused
+        timestamp = self.session.finish()
+        if paused and timestamp is not None:
+            self.pts_writer.write(EVENT_RESUME, timestamp)
         try:
             if hasattr(self, 'record_thread'):
                 self.record_thread.join()
                 self.audio_thread.join()
+                if self.window_tracker is not None:
+                    self.window_tracker.stop()
+                    self.window_tracker = None
+                for item in self.privacy_trackers:
+                    item['tracker'].stop()
+                self.privacy_trackers = []
                 
                 # 确保视频写入器正确关闭
                 if hasattr(self, 'writer') and self.writer:
                     self.writer.release()
+                self.pts_writer.close()
+                    
+                for encoder in self.video_segments + [item.encoder for item in self.monitor_recordings]:
+                    encoder.release()
+                    skipped = "省略" if isinstance(encoder, VfrEncoder) else "其中"
+                    print(f"视频编码 {os.path.basename(encoder.path)} {encoder.frame_size}: "
+                          f"{encoder.frames_written} 帧 ({skipped}重复 {encoder.unchanged_frames} 帧), "
+                          f"最大积压 {encoder.max_backlog} 帧, "
+                          f"等待编码 {encoder.blocked_seconds:.2f}s")
+                if self.fanout is not None:
+                    self.fanout.release()
+                    print(self.fanout.describe())
+                if self.governor is not None and self.governor.decisions:
+                    print(f"编码档位共调整 {len(self.governor.decisions)} 次，"
+                          f"最终 {self.governor.level.describe(self.fps)}")
+                self._close_capture_worker()
                     
                 self._merge_audio_video()
+                self._save_vad_index()
+                self.finalize_seconds = time.perf_counter() - stop_started
+                print(f"停止到文件就绪: {self.finalize_seconds:.2f}s")
                 self.recording_finished.emit(self.output_file)
         except Exception as e:
             print(f"停止录制失败: {e}")
+        finally:
+            self.session.reset()
 
     def _add_watermark(self, frame):
         if self.settings.get_watermark_type() == "text":
@@ -0,0 +1,126 @@
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+from core.sync import SyncClock
+
+
+class RecordingSession(QObject):
+    """录制会话状态机：idle -> arming -> recording <-> paused -> finalizing -> idle
+
+    状态保存在条件变量中，工作线程在暂停时阻塞等待而不是空转；
+    每次状态切换都会唤醒等待的线程，并通过 state_changed 发出 (状态, 会话时间秒)。
+    """
+
+    IDLE = 'idle'
+    ARMING = 'arming'
+    RECORDING = 'recording'
+    PAUSED = 'paused'
+    FINALIZING = 'finalizing'
+
+    _TRANSITIONS = {
+        IDLE: (ARMING,),
+        ARMING: (RECORDING, FINALIZING),
+        RECORDING: (PAUSED, FINALIZING),
+        PAUSED: (RECORDING, FINALIZING),
+        FINALIZING: (IDLE,),
+    }
+
+    state_changed = Signal(str, float)
+
+    def __init__(self):
+        super().__init__()
+        self._condition = threading.Condition()
+        self._state = self.IDLE
+        self.clock = SyncClock()
+        # 暂停区间 [(开始, 结束)]，时间为会话时间戳（纳秒），未结束的区间结束时间为 None
+        self.pauses = []
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def active(self):
+        # 从准备开始到停止之前
+        return self._state in (self.ARMING, self.RECORDING, self.PAUSED)
+
+    @property
+    def capturing(self):
+        return self._state in (self.RECORDING, self.PAUSED)
+
+    @property
+    def paused(self):
+        return self._state == self.PAUSED
+
+    def _transition(self, state, update=None, source=None):
+        with self._condition:
+            if state not in self._TRANSITIONS[self._state]:
+                return None
+            if source is not None and self._state != source:
+                return None
+            if update is not None:
+                update()
+            self._state = state
+            timestamp = self.clock.now()
+            self._condition.notify_all()
+        # 在锁外发信号，避免槽函数里再调用状态机时死锁
+        self.state_changed.emit(state, timestamp / 1e9)
+        return timestamp
+
+    def arm(self):
+        def reset_clock():
+            self.clock = SyncClock()
+        return self._transition(self.ARMING, reset_clock)
+
+    def start(self):
+        """进入录制状态，会话时钟从这一刻开始计时"""
+        def reset_clock():
+            self.clock = SyncClock()
+            self.pauses = []
+        return self._transition(self.RECORDING, reset_clock, source=self.ARMING)
+
+    def pause(self):
+        """返回暂停开始的会话时间戳，当前状态不能暂停时返回 None"""
+        def begin():
+            self.pauses.append([self.clock.pause(), None])
+        if self._transition(self.PAUSED, begin) is None:
+            return None
+        return self.pauses[-1][0]
+
+    def resume(self):
+        def end():
+            self.pauses[-1][1] = self.clock.resume()
+        if self._transition(self.RECORDING, end, source=self.PAUSED) is None:
+            return None
+        return self.pauses[-1][1]
+
+    def finish(self):
+        def end_pause():
+            if self._state == self.PAUSED:
+                self.pauses[-1][1] = self.clock.resume()
+        return self._transition(self.FINALIZING, end_pause)
+
+    def reset(self):
+        return self._transition(self.IDLE)
+
+    def wait_while_paused(self, timeout=None):
+        """阻塞到不再处于准备或暂停状态，返回是否应继续录制"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._state not in (self.ARMING, self.PAUSED), timeout)
+            return self._state == self.RECORDING
+
+    def wait(self, timeout):
+        """等待 timeout 秒或直到状态变化，返回是否仍在录制"""
+        with self._condition:
+            if self._state == self.RECORDING and timeout > 0:
+                self._condition.wait(timeout)
+            return self._state == self.RECORDING
+
+    def in_pause(self, start, end):
+        """会话时间段 [start, end) 是否完全落在某个暂停区间内"""
+        for pause_start, pause_end in self.pauses:
+            if start >= pause_start and (pause_end is None or end <= pause_end):
+                return True
+        return False
@@ -1,4 +1,5 @@
 from PySide6.QtCore import QSettings
+import json
 import os
 from datetime import datetime
 
@@ -53,4 +54,123 @@ class Settings:
         return self.settings.value('shortcut_drawing', 'Ctrl+D')
         
     def set_shortcut_drawing(self, sequence):
-        self.settings.setValue('shortcut_drawing', sequence) 
\ No newline at end of file
+        self.settings.setValue('shortcut_drawing', sequence)
+        
+    def get_shortcut_zoom(self):
+        return self.settings.value('shortcut_zoom', 'Ctrl+Shift+Z')
+        
+    def set_shortcut_zoom(self, sequence):
+        self.settings.setValue('shortcut_zoom', sequence)
+        
+    def get_audio_format(self):
+        return self.settings.value('audio_format', 'flac')
+        
+    def set_audio_format(self, audio_format):
+        self.settings.setValue('audio_format', audio_format)
+        
+    def get_multitrack_audio(self):
+        return self.settings.value('multitrack_audio', False, type=bool)
+        
+    def set_multitrack_audio(self, enabled):
+        self.settings.setValue('multitrack_audio', enabled)
+        
+    def get_premix_track(self):
+        return self.settings.value('premix_track', True, type=bool)
+        
+    def set_premix_track(self, enabled):
+        self.settings.setValue('premix_track', enabled)
+        
+    def get_adaptive_quality(self):
+        return self.settings.value('adaptive_quality', True, type=bool)
+        
+    def set_adaptive_quality(self, enabled):
+        self.settings.setValue('adaptive_quality', enabled)
+        
+    def get_variable_frame_rate(self):
+        return self.settings.value('variable_frame_rate', False, type=bool)
+        
+    def set_variable_frame_rate(self, enabled):
+        self.settings.setValue('variable_frame_rate', enabled)
+        
+    def get_vfr_max_interval(self):
+        return self.settings.value('vfr_max_interval', 1, type=int)
+        
+    def set_vfr_max_interval(self, seconds):
+        self.settings.setValue('vfr_max_interval', seconds)
+        
+    def get_multiprocess_capture(self):
+        return self.settings.value('multiprocess_capture', False, type=bool)
+        
+    def set_multiprocess_capture(self, enabled):
+        self.settings.setValue('multiprocess_capture', enabled)
+        
+    def get_strip_parallel(self):
+        return self.settings.value('strip_parallel', False, type=bool)
+        
+    def set_strip_parallel(self, enabled):
+        self.settings.setValue('strip_parallel', enabled)
+        
+    def get_i420_pipeline(self):
+        return self.settings.value('i420_pipeline', False, type=bool)
+        
+    def set_i420_pipeline(self, enabled):
+        self.settings.setValue('i420_pipeline', enabled)
+        
+    def get_smart_zoom(self):
+        return self.settings.value('smart_zoom', False, type=bool)
+        
+    def set_smart_zoom(self, enabled):
+        self.settings.setValue('smart_zoom', enabled)
+        
+    def get_proxy_output(self):
+        return self.settings.value('proxy_output', False, type=bool)
+        
+    def set_proxy_output(self, enabled):
+        self.settings.setValue('proxy_output', enabled)
+        
+    def get_privacy_regions(self):
+        # 打码区域按屏幕坐标 [x, y, 宽, 高] 保存为 JSON 文本
+        try:
+            return [tuple(rect) for rect in json.loads(self.settings.value('privacy_regions', '[]'))]
+        except (TypeError, ValueError) as e:
+            print(f"读取打码区域失败: {e}")
+            return []
+        
+    def set_privacy_regions(self, rects):
+        self.settings.setValue('privacy_regions', json.dumps([list(rect) for rect in rects]))
+        
+    def get_privacy_style(self):
+        return self.settings.value('privacy_style', 'mosaic')
+        
+    def set_privacy_style(self, style):
+        self.settings.setValue('privacy_style', style)
+        
+    def get_privacy_follow_window(self):
+        return self.settings.value('privacy_follow_window', False, type=bool)
+        
+    def set_privacy_follow_window(self, enabled):
+        self.settings.setValue('privacy_follow_window', enabled)
+        
+    def get_region_output(self):
+        return self.settings.value('region_output', 'fit')
+        
+    def set_region_output(self, mode):
+        self.settings.setValue('region_output', mode)
+        
+    def get_system_audio_device(self):
+        return self.settings.value('system_audio_device', '')
+        
+    def set_system_audio_device(self, key):
+        self.settings.setValue('system_audio_device', key)
+        
+    def get_mic_device(self):
+        return self.settings.value('mic_device', '')
+        
+    def set_mic_device(self, key):
+        self.settings.setValue('mic_device', key)
+        
+    def get_noise_profile(self):
+        return self.settings.value('noise_profile', None)
+        
+    def set_noise_profile(self, values):
+        self.settings.setValue('noise_profile', values)
@@ -0,0 +1,108 @@
+import multiprocessing
+import queue
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """跨进程传递视频帧的共享内存环形缓冲区
+
+    一块共享内存分成 slots 个等大的槽位，进程之间只传递槽位序号，像素不经过管道复制。
+    生产者 acquire() 取得空闲槽位，直接写入 frame(index) 后 publish()；
+    消费者 receive() 取得槽位，用 retain()/release() 计数，引用全部释放后槽位回到空闲队列。
+    对象可以作为 Process 的参数传给子进程，子进程中按名字重新映射同一块共享内存。
+    """
+
+    def __init__(self, shape, slots=8, dtype=np.uint8, context=None):
+        context = context or multiprocessing.get_context('spawn')
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        size = int(np.prod(self.shape)) * self.dtype.itemsize * slots
+        self._memory = shared_memory.SharedMemory(create=True, size=size)
+        self._owner = True
+        self.free = context.Queue()
+        self.ready = context.Queue()
+        for index in range(slots):
+            self.free.put(index)
+        self._attach()
+
+    def _attach(self):
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=self._memory.buf)
+        self._refs = [0] * self.slots
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {
+            'name': self._memory.name,
+            'shape': self.shape,
+            'dtype': self.dtype.str,
+            'slots': self.slots,
+            'free': self.free,
+            'ready': self.ready,
+        }
+
+    def __setstate__(self, state):
+        self.shape = state['shape']
+        self.dtype = np.dtype(state['dtype'])
+        self.slots = state['slots']
+        self.free = state['free']
+        self.ready = state['ready']
+        try:
+            # 子进程只映射不负责删除，Python 3.13 起可以不登记到资源跟踪器
+            self._memory = shared_memory.SharedMemory(name=state['name'], track=False)
+        except TypeError:
+            self._memory = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._attach()
+
+    def frame(self, index):
+        return self._frames[index]
+
+    def acquire(self, timeout=None):
+        """取得一个空闲槽位，超时返回 None"""
+        try:
+            return self.free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def publish(self, index, info=None):
+        self.ready.put((index, info))
+
+    def receive(self, timeout=None):
+        """取得 (槽位, 附加信息)，槽位引用计数为 1；超时返回 None"""
+        try:
+            index, info = self.ready.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if index is not None:
+            self.retain(index)
+        return index, info
+
+    def retain(self, index):
+        with self._lock:
+            self._refs[index] += 1
+
+    def release(self, index):
+        # 可以在编码线程中调用
+        with self._lock:
+            self._refs[index] -= 1
+            if self._refs[index] > 0:
+                return
+        self.free.put(index)
+
+    def close(self):
+        self._frames = None
+        try:
+            self._memory.close()
+        except BufferError:
+            # 还有帧的视图没有释放，映射随进程结束一起回收
+            pass
+        if self._owner:
+            try:
+                self._memory.unlink()
+            except FileNotFoundError:
+                pass
+
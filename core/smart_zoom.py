@@ -0,0 +1,88 @@
+import math
+import time
+
+
+def _even(value):
+    return max(2, int(value) // 2 * 2)
+
+
+class SmartZoom:
+    """跟随鼠标的自动放大：缩放之前先从截图中裁出视口，放大后每帧要转换、缩放的像素更少
+
+    视口保持画面的宽高比，放大倍数和视口位置都按时间常数平滑过渡，鼠标在视口中间区域
+    （离边缘 margin 比例以内不算）移动时视口不动，画面不会跟着抖动，静止时仍能只处理变化的图块。
+    cycle() 在 levels 之间切换（快捷键）；click_zoom 为真时点击临时放大到最大倍数，
+    最后一次点击 hold_seconds 秒后恢复。倍数为 1 时 update() 返回 None，截图原样使用。
+    """
+
+    def __init__(self, levels=(1.0, 2.0), click_zoom=True, hold_seconds=3.0,
+                 follow_seconds=0.25, zoom_seconds=0.4, margin=0.2):
+        self.levels = tuple(levels)
+        self.level_index = 0
+        self.click_zoom = click_zoom
+        self.hold_seconds = hold_seconds
+        self.follow_seconds = follow_seconds
+        self.zoom_seconds = zoom_seconds
+        self.margin = margin
+        self.scale = self.levels[0]
+        self.center = None
+        self._hold_until = 0.0
+        self._pressed = False
+        self._last_update = None
+
+    def _target(self, now):
+        if self.click_zoom and now < self._hold_until:
+            return max(self.levels)
+        return self.levels[self.level_index]
+
+    def cycle(self):
+        """切换到下一个放大倍数，返回新的倍数"""
+        self.level_index = (self.level_index + 1) % len(self.levels)
+        self._hold_until = 0.0
+        return self.levels[self.level_index]
+
+    def update(self, cursor, pressed, source_size, now=None):
+        """按鼠标位置（截图内的坐标）更新视口，返回裁剪区域 (x, y, 宽, 高)，不放大时返回 None"""
+        now = time.monotonic() if now is None else now
+        width, height = source_size
+        if self.center is None:
+            self.center = (width / 2, height / 2)
+        dt = 0.0 if self._last_update is None else max(0.0, now - self._last_update)
+        self._last_update = now
+        if pressed and not self._pressed:
+            self._hold_until = now + self.hold_seconds
+        self._pressed = pressed
+
+        # 放大倍数按指数平滑接近目标，足够接近时直接取目标值，视口尺寸随之固定
+        target = self._target(now)
+        self.scale += (target - self.scale) * (1 - math.exp(-dt / self.zoom_seconds))
+        if abs(target - self.scale) < 0.01:
+            self.scale = target
+        if self.scale <= 1.0:
+            self.center = (width / 2, height / 2)
+            return None
+
+        view_width = _even(round(width / self.scale))
+        view_height = _even(round(height / self.scale))
+        # 鼠标离开视口中间区域时，把视口移到鼠标刚好落在中间区域边缘的位置
+        center_x, center_y = self.center
+        desired = []
+        for position, center, size in ((cursor[0], center_x, view_width), (cursor[1], center_y, view_height)):
+            reach = size * (0.5 - self.margin)
+            if position < center - reach:
+                center = position + reach
+            elif position > center + reach:
+                center = position - reach
+            desired.append(center)
+        follow = 1 - math.exp(-dt / self.follow_seconds)
+        center_x += (desired[0] - center_x) * follow
+        center_y += (desired[1] - center_y) * follow
+        # 视口不能超出画面
+        center_x = min(max(center_x, view_width / 2), width - view_width / 2)
+        center_y = min(max(center_y, view_height / 2), height - view_height / 2)
+        self.center = (center_x, center_y)
+        # 起点取偶数，可以为 0（_even 的下限 2 只用于尺寸）
+        x = min(int(center_x - view_width / 2) // 2 * 2, width - view_width)
+        y = min(int(center_y - view_height / 2) // 2 * 2, height - view_height)
+        return x, y, view_width, view_height
+
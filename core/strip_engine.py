@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# 已经测过的 (输入尺寸, 输出尺寸, 线程数) -> 最快的条带数，同一进程内只测一次
+_calibrated = {}
+_calibrated_lock = threading.Lock()
+
+
+class StripEngine:
+    """把整幅画面的颜色转换、缩放和混合按水平条带分给常驻线程池执行
+
+    OpenCV 的函数在计算时释放 GIL，各条带可以真正并行。条带边界按输出行划分并取偶数，
+    缩放时每个条带用 warpAffine 按整幅画面的同一个映射采样，条带之间没有接缝。
+    条带数由 calibrate() 在 1 到 CPU 核数之间实测选出，单核或 OpenCV 自身已经并行时为 1，
+    这时直接调用整幅处理，不经过线程池。
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.strips = 1
+        self._pool = None
+        if self.workers > 1:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers - 1, thread_name_prefix="StripEngine")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def run(self, rows, func, strips=None):
+        """把 [0, rows) 分成条带，并行调用 func(起始行, 结束行)；当前线程处理第一个条带"""
+        strips = min(strips or self.strips, max(1, rows // 16))
+        if strips <= 1 or self._pool is None:
+            func(0, rows)
+            return
+        bounds = [min(rows, (rows * i // strips) // 2 * 2) for i in range(strips)] + [rows]
+        futures = [self._pool.submit(func, bounds[i], bounds[i + 1]) for i in range(1, strips)]
+        func(bounds[0], bounds[1])
+        for future in futures:
+            future.result()
+
+    def convert_resize(self, frame, frame_size, out=None, strips=None):
+        """BGRA 截图转换为 frame_size 的 BGR 帧，out 为输出缓冲（为 None 时新建）"""
+        width, height = frame_size
+        if out is None:
+            out = np.empty((height, width, 3), dtype=np.uint8)
+        strips = strips or self.strips
+        if strips <= 1 or self._pool is None:
+            # 单条带时与原来的整幅处理完全相同
+            if frame.shape[1::-1] == tuple(frame_size):
+                return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=out)
+            cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR), frame_size, dst=out)
+            return out
+
+        source_height, source_width = frame.shape[:2]
+        scale_x = source_width / width
+        scale_y = source_height / height
+        if scale_x == 1.0 and scale_y == 1.0:
+            self.run(height, lambda y0, y1: cv2.cvtColor(frame[y0:y1], cv2.COLOR_BGRA2BGR, dst=out[y0:y1]),
+                     strips)
+            return out
+
+        def strip(y0, y1):
+            # 输出行 [y0, y1) 采样需要的源行范围，额外留 2 行给插值
+            sy0 = max(0, int((y0 + 0.5) * scale_y - 0.5) - 2)
+            sy1 = min(source_height, int((y1 + 0.5) * scale_y - 0.5) + 3)
+            matrix = np.float32([
+                [scale_x, 0, 0.5 * scale_x - 0.5],
+                [0, scale_y, (y0 + 0.5) * scale_y - 0.5 - sy0],
+            ])
+            flags = cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP
+            if scale_x * scale_y >= 1.0:
+                # 缩小时先缩放再转换颜色，转换的像素更少
+                scaled = cv2.warpAffine(frame[sy0:sy1], matrix, (width, y1 - y0),
+                                        flags=flags, borderMode=cv2.BORDER_REPLICATE)
+                cv2.cvtColor(scaled, cv2.COLOR_BGRA2BGR, dst=out[y0:y1])
+            else:
+                converted = cv2.cvtColor(frame[sy0:sy1], cv2.COLOR_BGRA2BGR)
+                cv2.warpAffine(converted, matrix, (width, y1 - y0), dst=out[y0:y1],
+                               flags=flags, borderMode=cv2.BORDER_REPLICATE)
+
+        self.run(height, strip, strips)
+        return out
+
+    def add_weighted(self, first, alpha, second, beta, gamma, dst, strips=None):
+        # 按条带执行的 cv2.addWeighted，用于整幅画面的混合（如聚光灯效果）
+        self.run(dst.shape[0], lambda y0, y1: cv2.addWeighted(
+            first[y0:y1], alpha, second[y0:y1], beta, gamma, dst=dst[y0:y1]), strips)
+        return dst
+
+    def calibrate(self, shape, frame_size, repeat=5):
+        """用随机画面实测 1 到 CPU 核数个条带的耗时，选最快的条带数并返回"""
+        key = (tuple(shape), tuple(frame_size), self.workers)
+        with _calibrated_lock:
+            if key in _calibrated:
+                self.strips = _calibrated[key]
+                return self.strips
+
+        frame = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+        out = np.empty((frame_size[1], frame_size[0], 3), dtype=np.uint8)
+        candidates = sorted({1, 2, 4, 8, self.workers} & set(range(1, self.workers + 1)))
+        timings = {}
+        for strips in candidates:
+            self.convert_resize(frame, frame_size, out, strips)  # 预热
+            started = time.perf_counter()
+            for _ in range(repeat):
+                self.convert_resize(frame, frame_size, out, strips)
+            timings[strips] = (time.perf_counter() - started) / repeat
+        # 多条带要明显更快才采用，避免测量抖动导致无谓地使用线程池
+        best = min(timings, key=timings.get)
+        if timings[best] > timings[1] * 0.9:
+            best = 1
+        self.strips = best
+        with _calibrated_lock:
+            _calibrated[key] = best
+        return best
+
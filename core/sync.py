@@ -0,0 +1,230 @@
+import struct
+import threading
+import time
+
+import numpy as np
+import soundfile as sf
+
+# 时间戳旁路文件：文件头 + 定长记录 (流类型, 时间戳纳秒, 计数)
+PTS_MAGIC = b'DCPTS\x00\x01\x00'
+_HEADER = struct.Struct('<8sdI')      # 魔数, 视频帧率, 音频采样率
+_RECORD = struct.Struct('<BqI')
+RECORD_DTYPE = np.dtype([('stream', 'u1'), ('pts', '<i8'), ('count', '<u4')])
+
+STREAM_VIDEO = 0   # count 为帧在视频文件中的序号
+STREAM_AUDIO = 1   # count 为数据块的样本数
+EVENT_PAUSE = 2
+EVENT_RESUME = 3
+
+
+class SyncClock:
+    """录制会话共享的单调时钟
+
+    now() 返回自会话开始的纳秒数；media_now() 扣除暂停时长，
+    对应成片中的时间位置。
+    """
+
+    def __init__(self):
+        self.origin_ns = time.monotonic_ns()
+        self.paused_ns = 0
+        self._pause_started = None
+
+    def now(self):
+        return time.monotonic_ns() - self.origin_ns
+
+    def to_pts(self, monotonic_ns):
+        # 把 time.monotonic_ns() 的读数换算成会话时间戳
+        return monotonic_ns - self.origin_ns
+
+    def media_now(self):
+        if self._pause_started is not None:
+            return self._pause_started - self.paused_ns
+        return self.now() - self.paused_ns
+
+    def pause(self):
+        if self._pause_started is None:
+            self._pause_started = self.now()
+        return self._pause_started
+
+    def resume(self):
+        now = self.now()
+        if self._pause_started is not None:
+            self.paused_ns += now - self._pause_started
+            self._pause_started = None
+        return now
+
+
+class PtsWriter:
+    """写入时间戳旁路文件，视频和音频线程共用"""
+
+    def __init__(self, path, fps, samplerate):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'wb', buffering=64 * 1024)
+        self._file.write(_HEADER.pack(PTS_MAGIC, float(fps), int(samplerate)))
+
+    def write(self, stream, pts, count=0):
+        record = _RECORD.pack(stream, int(pts), int(count))
+        with self._lock:
+            if self._file is not None:
+                self._file.write(record)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_pts(path):
+    """读取旁路文件，返回 (帧率, 采样率, 记录数组)"""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError("时间戳文件不完整")
+        magic, fps, samplerate = _HEADER.unpack(header)
+        if magic != PTS_MAGIC:
+            raise ValueError("不是有效的时间戳文件")
+        data = f.read()
+    # 录制异常中断时最后一条记录可能不完整
+    usable = len(data) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+    return fps, samplerate, np.frombuffer(data[:usable], dtype=RECORD_DTYPE)
+
+
+def _pause_intervals(records):
+    # 成对的暂停/恢复事件，未恢复的暂停持续到结束
+    intervals = []
+    started = None
+    for record in records[records['stream'] >= EVENT_PAUSE]:
+        if record['stream'] == EVENT_PAUSE and started is None:
+            started = int(record['pts'])
+        elif record['stream'] == EVENT_RESUME and started is not None:
+            intervals.append((started, int(record['pts'])))
+            started = None
+    if started is not None:
+        intervals.append((started, np.iinfo(np.int64).max))
+    return np.array(intervals, dtype=np.float64).reshape(-1, 2)
+
+
+def media_time(pts, pauses):
+    """会话时间戳减去此前累计的暂停时长，落在暂停区间内的时间戳归到暂停起点"""
+    pts = np.asarray(pts, dtype=np.float64)
+    if not len(pauses):
+        return pts
+    paused = np.clip(pts[:, None] - pauses[None, :, 0], 0, (pauses[:, 1] - pauses[:, 0])[None, :])
+    return pts - paused.sum(axis=1)
+
+
+def plan_audio_segments(records, samplerate, tolerance=2):
+    """根据时间戳把音频文件切成连续段，返回 [(源起点, 目标起点, 样本数), ...]
+
+    目标起点以成片的第 0 帧为零点；相邻数据块的时间戳误差在 tolerance 个样本内视为连续。
+    跨过暂停起点或恢复点的数据块在对应的样本位置切开，暂停期间的样本不写入成片。
+    """
+    audio = records[records['stream'] == STREAM_AUDIO]
+    if not len(audio):
+        return []
+
+    pauses = _pause_intervals(records)
+    counts = audio['count'].astype(np.int64)
+    sources = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    starts = audio['pts'].astype(np.float64)
+    ends = starts + counts * 1e9 / samplerate
+
+    # 每个数据块扣除暂停区间后的片段 (源起点, 会话时间戳, 样本数)
+    pieces = []
+    for source, start, end, count in zip(sources.tolist(), starts.tolist(), ends.tolist(), counts.tolist()):
+        cuts = pauses[(pauses[:, 0] < end) & (pauses[:, 1] > start)]
+        if not len(cuts):
+            pieces.append((source, start, count))
+            continue
+        position = start
+        for pause_start, pause_end in cuts.tolist():
+            if pause_start > position:
+                pieces.append(_piece(source, start, position, pause_start, count, samplerate))
+            position = max(position, pause_end)
+        if position < end:
+            pieces.append(_piece(source, start, position, end, count, samplerate))
+    pieces = [piece for piece in pieces if piece[2] > 0]
+    if not pieces:
+        return []
+
+    targets = np.round(media_time([piece[1] for piece in pieces], pauses) * samplerate / 1e9).astype(np.int64)
+    segments = []
+    for (source, _, count), target in zip(pieces, targets.tolist()):
+        if segments:
+            last = segments[-1]
+            # 源文件中相接、目标位置也相接的片段合并为一段
+            if source == last[0] + last[2] and abs(target - (last[1] + last[2])) <= tolerance:
+                last[2] += count
+                continue
+        segments.append([source, target, count])
+    return [tuple(segment) for segment in segments]
+
+
+def _piece(source, block_start, piece_start, piece_end, count, samplerate):
+    # 数据块中 [piece_start, piece_end) 这段会话时间对应的样本
+    first = min(count, int(round((piece_start - block_start) * samplerate / 1e9)))
+    last = min(count, int(round((piece_end - block_start) * samplerate / 1e9)))
+    return source + first, piece_start, last - first
+
+
+def video_frame_count(records):
+    video = records[records['stream'] == STREAM_VIDEO]
+    if not len(video):
+        return 0
+    return int(video['count'].max()) + 1
+
+
+def write_aligned_audio(source_path, output_path, segments, total_frames, chunk_frames=65536):
+    """按分段计划流式写出与视频对齐的音频：缺口补静音，重叠部分裁掉，结尾补齐或截断到 total_frames"""
+    with sf.SoundFile(source_path) as source, \
+            sf.SoundFile(output_path, mode='w', samplerate=source.samplerate,
+                         channels=source.channels, format='FLAC', subtype='PCM_16') as output:
+        silence = np.zeros((chunk_frames, source.channels), dtype=np.float32)
+        position = 0
+
+        def write_silence(frames):
+            nonlocal position
+            while frames > 0:
+                size = min(frames, chunk_frames)
+                output.write(silence[:size])
+                position += size
+                frames -= size
+
+        for source_start, target_start, frames in segments:
+            if target_start > position:
+                write_silence(min(target_start, total_frames) - position)
+            # 与已写入部分重叠的开头丢弃
+            skip = max(0, position - target_start)
+            frames = min(frames - skip, total_frames - position)
+            if frames <= 0:
+                continue
+            source.seek(source_start + skip)
+            while frames > 0:
+                data = source.read(min(frames, chunk_frames), dtype='float32', always_2d=True)
+                if not len(data):
+                    break
+                output.write(data)
+                position += len(data)
+                frames -= len(data)
+
+        write_silence(total_frames - position)
+    return position
+
+
+def align_audio(pts_path, audio_path, output_path):
+    """用时间戳旁路文件把音频对齐到视频，成功返回对齐后的文件路径，无法对齐时返回 None"""
+    fps, samplerate, records = read_pts(pts_path)
+    segments = plan_audio_segments(records, samplerate)
+    frame_count = video_frame_count(records)
+    if not segments or not frame_count:
+        return None
+
+    total_frames = int(round(frame_count / fps * samplerate))
+    first_offset = segments[0][1] / samplerate * 1000
+    print(f"音视频同步: 音频起点偏移 {first_offset:.1f}ms, {len(segments)} 段, "
+          f"视频 {frame_count} 帧")
+    write_aligned_audio(audio_path, output_path, segments, total_frames)
+    return output_path
+
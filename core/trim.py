@@ -0,0 +1,116 @@
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+
+from core.muxer import AUDIO_ENCODE_ARGS, VIDEO_ENCODE_ARGS, hidden_startupinfo
+from core.vad import read_vad, vad_path, levels_from_audio, detect_activity, plan_trim
+
+
+def _run(command):
+    # 隐藏控制台窗口运行 ffmpeg/ffprobe，失败时抛出带错误输出的异常
+    result = subprocess.run(command, capture_output=True, startupinfo=hidden_startupinfo())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', errors='ignore').strip())
+    return result.stdout.decode('utf-8', errors='ignore')
+
+
+def probe_duration(path):
+    output = _run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+                   '-of', 'csv=p=0', path])
+    return float(output.strip())
+
+
+def probe_keyframes(path):
+    """视频流所有关键帧的时间（秒），只读取关键帧，不解码其他帧"""
+    output = _run(['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-skip_frame', 'nokey',
+                   '-show_entries', 'frame=pts_time', '-of', 'csv=p=0', path])
+    times = [float(line.split(',')[0]) for line in output.split() if line and line[0].isdigit()]
+    return np.array(sorted(times))
+
+
+def load_activity(path):
+    """读取视频旁的语音活动索引；没有索引的旧录制从音轨重新计算"""
+    index = vad_path(path)
+    if os.path.exists(index):
+        block_seconds, times, levels = read_vad(index)
+    else:
+        from core.denoiser import load_audio_span
+        block_seconds = 0.1
+        samplerate = 16000
+        audio = load_audio_span(path, 0.0, probe_duration(path), samplerate)
+        times, levels = levels_from_audio(audio, samplerate, block_seconds)
+    return detect_activity(times, levels, block_seconds)
+
+
+def _snap_to_keyframes(keep, keyframes, max_shift):
+    # 每个区间的起点前移到不晚于它的最近关键帧，前移超过 max_shift 秒时返回 None
+    snapped = []
+    for start, end in keep:
+        earlier = keyframes[keyframes <= start + 1e-3]
+        keyframe = float(earlier[-1]) if len(earlier) else 0.0
+        if start - keyframe > max_shift:
+            return None
+        if snapped and keyframe <= snapped[-1][1]:
+            snapped[-1][1] = max(snapped[-1][1], end)
+        else:
+            snapped.append([keyframe, end])
+    return snapped
+
+
+def _cut_copy(path, segments, output_path):
+    # 各区间从关键帧开始直接复制码流，再用 concat 分离器拼接，不重新编码
+    temp_dir = tempfile.mkdtemp(prefix="trim_")
+    extension = os.path.splitext(output_path)[1]
+    parts = []
+    try:
+        for i, (start, end) in enumerate(segments):
+            part = os.path.join(temp_dir, f"part{i}{extension}")
+            _run(['ffmpeg', '-y', '-v', 'error', '-ss', f'{start:.3f}', '-i', path,
+                  '-t', f'{end - start:.3f}', '-map', '0', '-c', 'copy',
+                  '-avoid_negative_ts', 'make_zero', part])
+            parts.append(part)
+        if len(parts) == 1:
+            os.replace(parts[0], output_path)
+            return
+        playlist = os.path.join(temp_dir, "parts.txt")
+        with open(playlist, 'w', encoding='utf-8') as f:
+            for part in parts:
+                f.write(f"file '{part}'\n")
+        _run(['ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', playlist,
+              '-map', '0', '-c', 'copy', output_path])
+    finally:
+        for name in os.listdir(temp_dir):
+            os.remove(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+
+
+def _cut_reencode(path, keep, output_path):
+    # 关键帧太稀疏时按区间精确选取帧和采样并重新编码，所有音轨使用相同的选择条件
+    condition = '+'.join(f'between(t,{start:.3f},{end:.3f})' for start, end in keep)
+    _run(['ffmpeg', '-y', '-v', 'error', '-i', path, '-map', '0',
+          '-vf', f"select='{condition}',setpts=N/FRAME_RATE/TB",
+          '-af', f"aselect='{condition}',asetpts=N/SR/TB",
+          *VIDEO_ENCODE_ARGS, '-c:a', *AUDIO_ENCODE_ARGS, output_path])
+
+
+def trim_video(path, output_path, mode='edges', max_pause=2.0, max_shift=2.0):
+    """裁掉首尾静音（mode='edges'）或同时缩短长停顿（mode='pauses'）
+
+    能对齐到关键帧时直接复制码流，否则重新编码。返回 'copy'/'reencode'，
+    没有检测到声音或无需裁剪时返回 None。
+    """
+    segments = load_activity(path)
+    duration = probe_duration(path)
+    keep = plan_trim(segments, duration, mode, max_pause=max_pause)
+    if not keep or (len(keep) == 1 and keep[0][0] <= 0.05 and keep[0][1] >= duration - 0.05):
+        return None
+
+    snapped = _snap_to_keyframes(keep, probe_keyframes(path), max_shift)
+    if snapped is not None:
+        _cut_copy(path, snapped, output_path)
+        return 'copy'
+    _cut_reencode(path, keep, output_path)
+    return 'reencode'
+
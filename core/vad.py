@@ -0,0 +1,110 @@
+import struct
+
+import numpy as np
+
+# 语音活动索引：文件头 (魔数, 数据块时长秒) + 每块一条记录 (成片时间毫秒, 电平)
+VAD_MAGIC = b'DCVAD\x00\x01\x00'
+_HEADER = struct.Struct('<8sf')
+_RECORD = struct.Struct('<IB')
+RECORD_DTYPE = np.dtype([('time_ms', '<u4'), ('level', 'u1')])
+
+# 电平按 0.5dB 量化到一个字节，覆盖 -127.5dB 到 0dB
+_LEVEL_FLOOR_DB = -127.5
+
+
+def _quantize(level_db):
+    return int(np.clip(round((level_db - _LEVEL_FLOOR_DB) * 2), 0, 255))
+
+
+def vad_path(video_path):
+    # 索引文件与视频同名，扩展名为 .vad
+    return f"{video_path.rsplit('.', 1)[0]}.vad"
+
+
+class VadWriter:
+    """录制时逐块写入 RMS 电平，每块 5 字节，一小时约 200KB"""
+
+    def __init__(self, path, block_seconds):
+        self.path = path
+        self._file = open(path, 'wb', buffering=64 * 1024)
+        self._file.write(_HEADER.pack(VAD_MAGIC, float(block_seconds)))
+
+    def add(self, media_seconds, level_db):
+        self._file.write(_RECORD.pack(max(0, int(round(media_seconds * 1000))), _quantize(level_db)))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_vad(path):
+    """返回 (数据块时长秒, 时间数组秒, 电平数组dB)"""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError("语音活动索引不完整")
+        magic, block_seconds = _HEADER.unpack(header)
+        if magic != VAD_MAGIC:
+            raise ValueError("不是有效的语音活动索引")
+        data = f.read()
+    usable = len(data) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+    records = np.frombuffer(data[:usable], dtype=RECORD_DTYPE)
+    times = records['time_ms'] / 1000.0
+    levels = records['level'] / 2.0 + _LEVEL_FLOOR_DB
+    return block_seconds, times, levels
+
+
+def levels_from_audio(audio, samplerate, block_seconds=0.1):
+    """没有索引的旧录制：从解码出的音频按块计算电平，返回 (时间数组, 电平数组)"""
+    block = max(1, int(samplerate * block_seconds))
+    count = len(audio) // block
+    frames = np.asarray(audio[:count * block], dtype=np.float32).reshape(count, -1)
+    mean_square = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+    levels = 10 * np.log10(np.maximum(mean_square, 1e-13))
+    return np.arange(count) * block / samplerate, levels
+
+
+def detect_activity(times, levels, block_seconds, threshold_db=None, hangover=0.3):
+    """根据电平检测有声音的区间，返回 [(开始秒, 结束秒), ...]
+
+    未指定门限时取噪声底（电平的 10% 分位数）以上 12dB，且不低于 -55dB；
+    间隔小于 hangover 秒的区间合并，避免把字词之间的停顿当成静音。
+    """
+    if not len(times):
+        return []
+    if threshold_db is None:
+        threshold_db = max(np.percentile(levels, 10) + 12, -55.0)
+
+    segments = []
+    for time, active in zip(times.tolist(), (levels > threshold_db).tolist()):
+        if not active:
+            continue
+        end = time + block_seconds
+        if segments and time - segments[-1][1] <= hangover:
+            segments[-1][1] = max(segments[-1][1], end)
+        else:
+            segments.append([time, end])
+    return [tuple(segment) for segment in segments]
+
+
+def plan_trim(segments, duration, mode='edges', padding=0.3, max_pause=2.0):
+    """计算要保留的区间
+
+    mode 为 'edges' 时只裁掉首尾静音；为 'pauses' 时同时把超过 max_pause 秒的停顿缩短到 max_pause 秒。
+    """
+    if not segments:
+        return []
+    start = max(0.0, segments[0][0] - padding)
+    end = min(duration, segments[-1][1] + padding)
+    if mode == 'edges':
+        return [(start, end)] if end > start else []
+
+    keep = [[start, None]]
+    for (_, previous_end), (next_start, _) in zip(segments, segments[1:]):
+        if next_start - previous_end > max_pause:
+            keep[-1][1] = previous_end + max_pause / 2
+            keep.append([next_start - max_pause / 2, None])
+    keep[-1][1] = end
+    return [(a, b) for a, b in keep if b > a]
+
@@ -0,0 +1,246 @@
+import os
+import sys
+import threading
+import time
+
+try:
+    import win32api
+    import win32con
+    import win32gui
+except ImportError:
+    win32gui = None
+
+try:
+    from Xlib import X, display as xdisplay  # 可选依赖，Linux 下跟随窗口需要 python-xlib
+except ImportError:
+    xdisplay = None
+
+
+class Win32Backend:
+    """Windows 窗口几何：优先取 DWM 的可见边框，不含窗口阴影"""
+
+    DWMWA_EXTENDED_FRAME_BOUNDS = 9
+
+    def __init__(self):
+        if win32gui is None:
+            raise RuntimeError("需要安装 pywin32")
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._rect_type = wintypes.RECT
+        try:
+            self._dwm = ctypes.windll.dwmapi
+        except (AttributeError, OSError):
+            self._dwm = None
+
+    def window_at(self, x, y):
+        handle = win32gui.WindowFromPoint((x, y))
+        if not handle or handle == win32gui.GetDesktopWindow():
+            return None
+        # 点到的可能是子控件，取所属的顶层窗口
+        return win32gui.GetAncestor(handle, win32con.GA_ROOT)
+
+    def title(self, handle):
+        return win32gui.GetWindowText(handle)
+
+    def is_minimized(self, handle):
+        return bool(win32gui.IsIconic(handle))
+
+    def geometry(self, handle):
+        """返回 (左, 上, 宽, 高)，窗口已关闭或不可见时返回 None"""
+        if not win32gui.IsWindow(handle) or not win32gui.IsWindowVisible(handle):
+            return None
+        if self._dwm is not None:
+            rect = self._rect_type()
+            result = self._dwm.DwmGetWindowAttribute(
+                handle, self.DWMWA_EXTENDED_FRAME_BOUNDS,
+                self._ctypes.byref(rect), self._ctypes.sizeof(rect))
+            if result == 0:
+                return rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
+        left, top, right, bottom = win32gui.GetWindowRect(handle)
+        return left, top, right - left, bottom - top
+
+    def cursor(self):
+        """返回 ((x, y), 左键是否按下)"""
+        x, y = win32api.GetCursorPos()
+        return (x, y), win32api.GetKeyState(0x01) < 0
+
+
+class X11Backend:
+    """X11 窗口几何：通过 EWMH 属性找到窗口管理器的框架，坐标换算到根窗口"""
+
+    def __init__(self):
+        if xdisplay is None:
+            raise RuntimeError("需要安装 python-xlib")
+        self._display = xdisplay.Display()
+        self._root = self._display.screen().root
+        self._client_list = self._display.intern_atom('_NET_CLIENT_LIST_STACKING')
+        self._frame_extents = self._display.intern_atom('_NET_FRAME_EXTENTS')
+        self._wm_state = self._display.intern_atom('_NET_WM_STATE')
+        self._hidden = self._display.intern_atom('_NET_WM_STATE_HIDDEN')
+        self._name = self._display.intern_atom('_NET_WM_NAME')
+        self._lock = threading.Lock()
+
+    def _property(self, window, atom):
+        value = window.get_full_property(atom, X.AnyPropertyType)
+        return value.value if value is not None else None
+
+    def window_at(self, x, y):
+        # 按叠放顺序从上到下找第一个包含该点的客户窗口
+        with self._lock:
+            stacking = self._property(self._root, self._client_list) or []
+        for window_id in reversed(list(stacking)):
+            geometry = self.geometry(window_id)
+            if geometry is None or self.is_minimized(window_id):
+                continue
+            left, top, width, height = geometry
+            if left <= x < left + width and top <= y < top + height:
+                return window_id
+        return None
+
+    def title(self, handle):
+        with self._lock:
+            window = self._display.create_resource_object('window', handle)
+            name = self._property(window, self._name)
+        if isinstance(name, bytes):
+            return name.decode('utf-8', errors='ignore')
+        return str(name or "")
+
+    def is_minimized(self, handle):
+        with self._lock:
+            window = self._display.create_resource_object('window', handle)
+            states = self._property(window, self._wm_state)
+        return states is not None and self._hidden in states
+
+    def geometry(self, handle):
+        try:
+            with self._lock:
+                window = self._display.create_resource_object('window', handle)
+                geometry = window.get_geometry()
+                origin = window.translate_coords(self._root, 0, 0)
+                extents = self._property(window, self._frame_extents)
+        except Exception:
+            # 窗口已经关闭
+            return None
+        left, right, top, bottom = extents if extents is not None and len(extents) == 4 else (0, 0, 0, 0)
+        return (-origin.x - left, -origin.y - top,
+                geometry.width + left + right, geometry.height + top + bottom)
+
+    def cursor(self):
+        """返回 ((x, y), 左键是否按下)，坐标相对于根窗口"""
+        with self._lock:
+            pointer = self._root.query_pointer()
+        return (pointer.root_x, pointer.root_y), bool(pointer.mask & X.Button1Mask)
+
+
+class ScriptedBackend:
+    """按脚本返回窗口几何的替身，用于在没有桌面环境时检查跟随逻辑
+
+    script 为 [(秒, (左, 上, 宽, 高) 或 None)]，时间从创建开始计算；None 表示窗口已关闭，
+    几何为字符串 'minimized' 时表示最小化（沿用之前的位置）。
+    """
+
+    def __init__(self, script, clock=time.monotonic):
+        self.script = sorted(script, key=lambda item: item[0])
+        self.clock = clock
+        self.started = clock()
+
+    def _current(self):
+        elapsed = self.clock() - self.started
+        current = self.script[0][1]
+        for seconds, geometry in self.script:
+            if seconds > elapsed:
+                break
+            current = geometry
+        return current
+
+    def window_at(self, x, y):
+        return 1
+
+    def title(self, handle):
+        return "scripted"
+
+    def is_minimized(self, handle):
+        return self._current() == 'minimized'
+
+    def geometry(self, handle):
+        current = self._current()
+        if current == 'minimized':
+            return 0, 0, 0, 0
+        return current
+
+
+def default_backend():
+    """当前平台可用的窗口几何后端，不可用时返回 None"""
+    try:
+        if sys.platform == 'win32':
+            return Win32Backend()
+        if os.environ.get('DISPLAY'):
+            return X11Backend()
+    except Exception as e:
+        print(f"窗口跟随不可用: {e}")
+    return None
+
+
+class WindowTracker(threading.Thread):
+    """在后台线程里低频查询窗口位置，采集循环只读取最新结果
+
+    采集区域保持开始时的尺寸（编码尺寸不变），窗口移动时跟着平移；
+    窗口大小变化时报告新的尺寸，由采集端决定如何缩放到固定的输出尺寸。
+    区域限制在 bounds（虚拟桌面）以内，窗口最小化时保持上一次的位置，关闭后停止。
+    state 为 (版本号, (左, 上, 宽, 高))，整体替换，读取时不需要加锁。
+    """
+
+    def __init__(self, backend, handle, rect, bounds=None, interval=0.1, on_change=None):
+        super().__init__(name="WindowTracker", daemon=True)
+        self.backend = backend
+        self.handle = handle
+        self.bounds = bounds
+        self.interval = interval
+        self.on_change = on_change
+        self.state = (0, tuple(rect))
+        self.closed = False
+        self.polls = 0
+        self.poll_seconds = 0.0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def _clamp(self, left, top, width, height):
+        if self.bounds is None:
+            return left, top, width, height
+        bound_left, bound_top, bound_width, bound_height = self.bounds
+        width = min(width, bound_width)
+        height = min(height, bound_height)
+        left = min(max(left, bound_left), bound_left + bound_width - width)
+        top = min(max(top, bound_top), bound_top + bound_height - height)
+        return left, top, width, height
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            started = time.perf_counter()
+            try:
+                geometry = self.backend.geometry(self.handle)
+                minimized = geometry is not None and self.backend.is_minimized(self.handle)
+            except Exception as e:
+                print(f"查询窗口位置失败: {e}")
+                continue
+            finally:
+                self.polls += 1
+                self.poll_seconds += time.perf_counter() - started
+            if geometry is None:
+                print("跟随的窗口已关闭，采集区域保持不变")
+                self.closed = True
+                return
+            if minimized or geometry[2] <= 0 or geometry[3] <= 0:
+                continue
+            rect = self._clamp(*geometry)
+            version, current = self.state
+            if rect != current:
+                self.state = (version + 1, rect)
+                if self.on_change is not None:
+                    self.on_change(rect)
+
@@ -1,8 +1,11 @@
 import sys
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from ui.main_window import MainWindow
 
 def main():
+    # 降噪等工作进程在打包后的程序中也能正常启动
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,199 @@
+import threading
+
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+pytest.importorskip("sounddevice")
+
+from core.audio_capture import AudioMixer, AudioRingBuffer, AudioSource, StreamResampler
+
+
+class _SimulatedSource(AudioSource):
+    # 不打开设备的模拟输入，数据直接送进回调
+    latency = 0.0
+
+    def __init__(self, name, samplerate, channels, data_ready):
+        self.name = name
+        self.device = None
+        self.samplerate = samplerate
+        self.channels = channels
+        self.ring = AudioRingBuffer(samplerate * 2, channels)
+        self.data_ready = data_ready
+        self.overflow_count = self.overflow_frames = 0
+        self.underflow_count = self.underflow_frames = 0
+        self.driver_overflow_count = 0
+
+
+@pytest.mark.parametrize("src_rate, dst_rate", [(44100, 48000), (48000, 44100), (16000, 48000), (96000, 48000)])
+def test_streaming_resampler_matches_whole_signal(src_rate, dst_rate):
+    # 随机分块的流式重采样必须与整段 resample_poly 一致
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal((src_rate * 2, 2)).astype(np.float32)
+    resampler = StreamResampler(src_rate, dst_rate, 2)
+    parts = []
+    position = 0
+    while position < len(audio):
+        size = int(rng.integers(1, 3000))
+        parts.append(resampler.process(audio[position:position + size]))
+        position += size
+    actual = np.concatenate(parts)
+    expected = resample_poly(audio, resampler.up, resampler.down, axis=0).astype(np.float32)
+
+    # 末尾不足一个滤波器长度的部分要等后续输入，其余部分必须逐样本一致
+    assert len(expected) - len(actual) < resampler.pad * dst_rate // src_rate + dst_rate // 100
+    np.testing.assert_allclose(actual, expected[:len(actual)], atol=1e-5)
+
+
+def _simulate_drift(ppm, reference_ppm=0, seconds=120, block_size=4096):
+    """模拟时钟偏差 reference_ppm 的 48kHz 系统声音和偏差 ppm 的 44.1kHz 麦克风，
+    每秒一个脉冲，返回混音后两路之间以及相对时钟的对齐误差（毫秒）"""
+    data_ready = threading.Event()
+    reference = _SimulatedSource("系统声音", 48000, 2, data_ready)
+    mic = _SimulatedSource("麦克风", 44100, 2, data_ready)
+    now = 0.0
+    mixer = AudioMixer([reference, mic], [1.0, 1.0], block_size, 48000, 2, data_ready,
+                       clock=lambda: int(now * 1e9))
+
+    class Status:
+        input_overflow = False
+
+    def pulses(rate, offset, frames):
+        t = (offset + np.arange(frames)) / rate
+        return np.exp(-((t - np.round(t)) * 2000) ** 2).astype(np.float32)
+
+    reference_rate = 48000 * (1 + reference_ppm * 1e-6)
+    mic_rate = 44100 * (1 + ppm * 1e-6)
+    mic_delay = 0.03  # 麦克风晚 30ms 启动
+    produced = [0, 0]
+    blocks = []
+    step = 0.01
+    for k in range(int(seconds / step)):
+        now = (k + 1) * step
+        # 参考设备的脉冲放在左声道，麦克风的放在右声道
+        for index, (source, rate, start, column) in enumerate((
+                (reference, reference_rate, 0.0, 0), (mic, mic_rate, mic_delay, 1))):
+            if now <= start:
+                continue
+            frames = int((now - start) * rate) - produced[index]
+            data = np.zeros((frames, 2), dtype=np.float32)
+            data[:, column] = pulses(rate, produced[index] + start * rate, frames)
+            source._callback(data, frames, None, Status())
+            produced[index] += frames
+        # 只在数据已就绪时读取，避免 read_block 等待真实时间
+        mixer._pull()
+        if not mixer.aligned:
+            mixer._align()
+        while mixer.aligned and mixer._ready():
+            blocks.append(mixer.read_block(lambda: True))
+
+    output = np.concatenate(blocks)
+    start = mixer.start_ns / 1e9
+    errors = []
+    clock_errors = []
+    for second in range(2, int(len(output) / 48000) - 1):
+        expected = int(round((second - start) * 48000))
+        segment = output[expected - 24000:expected + 24000]
+        errors.append((np.argmax(segment[:, 1]) - np.argmax(segment[:, 0])) * 1000 / 48000)
+        clock_errors.append((np.argmax(segment[:, 0]) - 24000) * 1000 / 48000)
+    return np.abs(errors), np.abs(clock_errors)
+
+
+@pytest.mark.parametrize("ppm, reference_ppm", [(0, 0), (100, 0), (-150, 0), (100, -80)])
+def test_drift_compensation_keeps_sources_aligned(ppm, reference_ppm):
+    # 不补偿时 120 秒内 100ppm 的偏差累积到 12ms，补偿后两路和时钟的误差都保持在 3ms 以内
+    errors, clock_errors = _simulate_drift(ppm, reference_ppm)
+    assert errors.max() < 3.0
+    assert clock_errors.max() < 3.0
+
+
+class _Status:
+    input_overflow = False
+
+
+def _pulses(frames, offset, rate=48000):
+    t = (offset + np.arange(frames)) / rate
+    return np.exp(-((t - np.round(t)) * 2000) ** 2).astype(np.float32)
+
+
+def test_late_device_is_realigned_after_padding():
+    # 麦克风在第 5 秒卡住 0.5 秒后一次性送来积压的数据，卡住期间超时补零，
+    # 迟到的样本到达后必须丢弃，两路的脉冲仍然对齐
+    data_ready = threading.Event()
+    reference = _SimulatedSource("系统声音", 48000, 2, data_ready)
+    mic = _SimulatedSource("麦克风", 48000, 2, data_ready)
+    now = 0.0
+    mixer = AudioMixer([reference, mic], [1.0, 1.0], 4096, 48000, 2, data_ready,
+                       clock=lambda: int(now * 1e9))
+    mixer.max_wait = 0.0
+    produced = [0, 0]
+    blocks = []
+    step = 0.01
+    for k in range(int(20 / step)):
+        now = (k + 1) * step
+        for index, (source, column) in enumerate(((reference, 0), (mic, 1))):
+            if index == 1 and 5.0 <= now < 5.5:
+                continue
+            frames = int(now * 48000) - produced[index]
+            data = np.zeros((frames, 2), dtype=np.float32)
+            data[:, column] = _pulses(frames, produced[index])
+            source._callback(data, frames, None, _Status())
+            produced[index] += frames
+        mixer._pull()
+        if not mixer.aligned:
+            mixer._align()
+        # 正常情况下等齐各路；参考设备领先超过 0.2 秒时视为超时，不再等麦克风
+        while mixer.aligned and (mixer._ready() or (mixer._fresh(0) > 4096 and
+                                                     mixer._fresh(0) - mixer._fresh(1) > 9600)):
+            blocks.append(mixer.read_block(lambda: True))
+
+    assert mic.underflow_count > 0
+    assert mic.underflow_frames >= 9600
+    assert reference.underflow_count == 0
+    assert mixer.late_frames == [0, 0]
+    output = np.concatenate(blocks)
+    start = mixer.start_ns / 1e9
+    errors = []
+    for second in range(7, int(len(output) / 48000) - 1):
+        expected = int(round((second - start) * 48000))
+        segment = output[expected - 24000:expected + 24000]
+        errors.append((np.argmax(segment[:, 1]) - np.argmax(segment[:, 0])) * 1000 / 48000)
+    assert np.abs(errors).max() < 3.0
+
+
+def test_overflow_counters():
+    # 设备环形缓冲区写满时回调数据被丢弃，计入溢出
+    data_ready = threading.Event()
+    source = _SimulatedSource("麦克风", 1000, 1, data_ready)
+    source._callback(np.ones((1500, 1), dtype=np.float32), 1500, None, _Status())
+    source._callback(np.ones((1000, 1), dtype=np.float32), 1000, None, _Status())
+    assert source.get_stats()['overflows'] == 1
+    assert source.get_stats()['overflow_frames'] == 500
+    assert data_ready.is_set()
+
+    class _DriverOverflow:
+        input_overflow = True
+    source.ring.skip(source.ring.available)
+    source._callback(np.ones((10, 1), dtype=np.float32), 10, None, _DriverOverflow())
+    assert source.get_stats()['driver_overflows'] == 1
+
+
+def test_underflow_counters_on_timeout():
+    # 慢设备超时后按欠载补零，只统计实际缺少的样本
+    data_ready = threading.Event()
+    fast = _SimulatedSource("系统声音", 48000, 1, data_ready)
+    slow = _SimulatedSource("麦克风", 48000, 1, data_ready)
+    mixer = AudioMixer([fast, slow], [1.0, 1.0], 1024, 48000, 1, data_ready)
+    mixer.max_wait = 0.0
+    for source in (fast, slow):
+        source._callback(np.ones((1000, 1), dtype=np.float32), 1000, None, _Status())
+    mixer._pull()
+    assert mixer._align()
+    fast._callback(np.ones((2048, 1), dtype=np.float32), 2048, None, _Status())
+    blocks = mixer.read_tracks(lambda: True)
+    assert [len(block) for block in blocks] == [1024, 1024]
+    stats = slow.get_stats()
+    assert stats['underflows'] == 1
+    assert stats['underflow_frames'] == blocks[1][:, 0].tolist().count(0.0)
+    assert fast.get_stats()['underflows'] == 0
+    assert mixer.late_frames[1] == stats['underflow_frames']
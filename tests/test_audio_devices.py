@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+pytest.importorskip("sounddevice")
+pytest.importorskip("PySide6")
+
+import core.audio_devices as audio_devices
+from core.audio_devices import AudioDeviceRegistry
+
+
+class _FakePortAudio:
+    """按脚本返回设备列表的 sounddevice 替身，重新初始化后才换成新插入的设备"""
+
+    def __init__(self, devices):
+        self.devices = devices
+        self.plugged = devices
+        self.initializations = 0
+        self.default = type('default', (), {'device': (0, 0)})()
+        self.scan_started = threading.Event()
+        self.scan_gate = None
+
+    def query_hostapis(self):
+        return [{'name': 'MME'}, {'name': 'Windows WASAPI'}]
+
+    def query_devices(self):
+        self.scan_started.set()
+        if self.scan_gate is not None:
+            self.scan_gate.wait(5)
+        return self.devices
+
+    def _terminate(self):
+        pass
+
+    def _initialize(self):
+        self.initializations += 1
+        self.devices = self.plugged
+
+
+def _device(name, hostapi=0, inputs=2):
+    return {'name': name, 'hostapi': hostapi, 'max_input_channels': inputs, 'default_samplerate': 48000}
+
+
+MIC = _device("麦克风 (USB)")
+LOOPBACK = _device("扬声器 (Loopback)", hostapi=1)
+SPEAKER = _device("扬声器", inputs=0)
+
+
+@pytest.fixture
+def portaudio(monkeypatch):
+    fake = _FakePortAudio([MIC, SPEAKER, LOOPBACK])
+    monkeypatch.setattr(audio_devices, 'sd', fake)
+    return fake
+
+
+def _refreshed(registry, started):
+    assert started
+    assert registry.wait_ready(5)
+
+
+def test_keys_stay_stable_when_indexes_change(portaudio):
+    registry = AudioDeviceRegistry()
+    _refreshed(registry, registry.start())
+    assert [device.key for device in registry.input_devices()] == ["MME:麦克风 (USB)"]
+    assert registry.system_devices()[0].index == 2
+    assert registry.default_input().key == "MME:麦克风 (USB)"
+    assert portaudio.initializations == 0
+
+    # 插入新设备后索引整体后移，按名称保存的设置仍然找到同一个设备
+    portaudio.plugged = [_device("耳机麦克风"), MIC, SPEAKER, LOOPBACK]
+    _refreshed(registry, registry.refresh())
+    assert portaudio.initializations == 1
+    assert registry.get("MME:麦克风 (USB)").index == 1
+    assert registry.get("Windows WASAPI:扬声器 (Loopback)").index == 3
+    assert registry.get("MME:耳机麦克风").index == 0
+    assert registry.resolve("MME:不存在", lambda: "fallback") == "fallback"
+
+
+def test_devices_changed_only_when_list_changes(portaudio):
+    registry = AudioDeviceRegistry()
+    changes = []
+    registry.devices_changed.connect(lambda: changes.append(len(registry.devices)))
+    _refreshed(registry, registry.start())
+    assert changes == [2]
+    _refreshed(registry, registry.refresh())
+    assert changes == [2]
+    # 设备拔出后列表变化
+    portaudio.plugged = [LOOPBACK]
+    _refreshed(registry, registry.refresh())
+    assert changes == [2, 1]
+    assert registry.get("MME:麦克风 (USB)") is None
+
+
+def test_refresh_while_refreshing_is_ignored(portaudio):
+    portaudio.scan_gate = threading.Event()
+    registry = AudioDeviceRegistry()
+    assert registry.start()
+    assert portaudio.scan_started.wait(5)
+    assert not registry.refresh()
+    portaudio.scan_gate.set()
+    assert registry.wait_ready(5)
+
+
+def test_open_streams_blocks_scan_and_defers_reinitialization(portaudio):
+    registry = AudioDeviceRegistry()
+    _refreshed(registry, registry.start())
+    portaudio.plugged = [MIC, LOOPBACK, _device("新麦克风")]
+    portaudio.scan_started.clear()
+    with registry.open_streams():
+        started = registry.refresh()
+        # 打开音频流期间枚举线程等待同一把锁
+        assert not portaudio.scan_started.wait(0.2)
+    _refreshed(registry, started)
+    # 流仍在使用，只重新读取列表，不重新初始化 PortAudio
+    assert portaudio.initializations == 0
+    assert registry.get("MME:新麦克风") is None
+
+    # 最后一个流关闭后补做重新初始化，新设备出现
+    registry.streams_closed()
+    assert registry.wait_ready(5)
+    assert portaudio.initializations == 1
+    assert registry.get("MME:新麦克风").index == 2
@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+import pytest
+
+from core.audio_dsp import StreamingDSP
+
+
+def _voice(sample_rate, seconds, rng):
+    # 间歇的 440Hz 正弦加白噪声，立体声
+    frames = int(sample_rate * seconds)
+    t = np.arange(frames) / sample_rate
+    voice = 0.3 * np.sin(2 * np.pi * 440 * t) * (np.sin(2 * np.pi * 0.7 * t) > 0)
+    return (voice[:, None] + 0.02 * rng.standard_normal((frames, 2))).astype(np.float32)
+
+
+def _process_in_chunks(dsp, audio, sizes):
+    parts = []
+    position = 0
+    for size in sizes:
+        if position >= len(audio):
+            break
+        parts.append(dsp.process(audio[position:position + size]))
+        position += size
+    if position < len(audio):
+        parts.append(dsp.process(audio[position:]))
+    parts.append(dsp.flush())
+    return np.concatenate(parts)
+
+
+@pytest.mark.parametrize("chunking", ["random", "tiny", "odd"])
+def test_output_independent_of_chunk_size(chunking):
+    # 整段处理与分块处理的输出必须逐样本一致
+    sample_rate = 44100
+    rng = np.random.default_rng(0)
+    # 逐样本送入很慢，只用半秒音频
+    audio = _voice(sample_rate, 0.5 if chunking == "tiny" else 3.0, rng)
+
+    whole = StreamingDSP(sample_rate, 2)
+    expected = np.concatenate([whole.process(audio), whole.flush()])
+
+    if chunking == "random":
+        sizes = rng.integers(1, 5000, len(audio)).tolist()
+    elif chunking == "tiny":
+        sizes = [1, 2, 3] * len(audio)
+    else:
+        sizes = [127, 129, 4097, 511] * len(audio)
+    actual = _process_in_chunks(StreamingDSP(sample_rate, 2), audio, sizes)
+
+    assert actual.shape == audio.shape
+    assert np.array_equal(actual, expected)
+
+
+def test_flush_without_input_is_empty():
+    dsp = StreamingDSP(44100, 2)
+    assert dsp.flush().shape == (0, 2)
+
+
+def _gate_loop_reference(dsp, buffer):
+    # 逐帧循环实现噪声门，作为向量化版本的参照
+    hop = dsp.HOP_LENGTH
+    frame_length = dsp.FRAME_LENGTH
+    num_out = len(buffer) // hop - 6
+    num_frames = num_out + 3
+    accumulated = np.zeros(((num_frames + 3) * hop, dsp.channels), dtype=np.float32)
+    for i in range(num_frames):
+        start = i * hop
+        end = start + frame_length
+        frame = buffer[start:end]
+        frame_energy = np.mean(frame ** 2, axis=0)
+        noise_threshold = np.sqrt(frame_energy) * 0.1
+        gain = 1.0 / (1.0 + np.exp(-(np.abs(frame) - noise_threshold) * 10))
+        accumulated[start:end] += gain * dsp.window[:, None]
+
+    gain = accumulated[3 * hop:(3 + num_out) * hop].reshape(num_out, hop, dsp.channels)
+    gain = (gain / dsp.window_norm[None, :, None]).reshape(-1, dsp.channels)
+    strength = dsp.strength * 0.8
+    data = buffer[3 * hop:(3 + num_out) * hop]
+    return (data * ((1 - strength) + strength * gain)).astype(np.float32)
+
+
+def test_vectorized_gate_matches_frame_loop():
+    rng = np.random.default_rng(0)
+    dsp = StreamingDSP(44100, 2)
+    buffer = (0.1 * rng.standard_normal((4096 + 6 * dsp.HOP_LENGTH, 2))).astype(np.float32)
+
+    vectorized, _ = dsp._gate(buffer)
+    np.testing.assert_allclose(vectorized, _gate_loop_reference(dsp, buffer), atol=1e-5)
+
+
+def _best_time(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def test_vectorized_gate_is_faster_than_frame_loop():
+    # 一个 4096 样本的录制数据块：向量化版本不能比逐帧循环慢，打印两者耗时供对比
+    rng = np.random.default_rng(1)
+    dsp = StreamingDSP(44100, 2)
+    buffer = (0.1 * rng.standard_normal((4096 + 6 * dsp.HOP_LENGTH, 2))).astype(np.float32)
+
+    vectorized = _best_time(lambda: dsp._gate(buffer))
+    loop = _best_time(lambda: _gate_loop_reference(dsp, buffer))
+    print(f"噪声门: 向量化 {vectorized * 1000:.3f}ms, 逐帧循环 {loop * 1000:.3f}ms")
+    assert vectorized <= loop
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+import core.audio_writer as audio_writer
+from core.audio_writer import AUDIO_FORMATS, AudioWriter, audio_extension, resolve_audio_format
+
+OPUS_AVAILABLE = 'OPUS' in sf.available_subtypes('OGG')
+
+
+def _blocks(samplerate, count=12, size=4096):
+    # 0.3 振幅的 440Hz 正弦，分成采集大小的数据块
+    t = np.arange(count * size) / samplerate
+    audio = np.repeat((0.3 * np.sin(2 * np.pi * 440 * t))[:, None], 2, axis=1).astype(np.float32)
+    return audio, [audio[i:i + size] for i in range(0, len(audio), size)]
+
+
+@pytest.mark.parametrize("audio_format", [
+    'flac', 'wav', pytest.param('opus', marks=pytest.mark.skipif(not OPUS_AVAILABLE, reason="libsndfile 不支持 Opus"))])
+def test_writer_round_trip(tmp_path, audio_format):
+    samplerate = 48000
+    path = str(tmp_path / f"audio{audio_extension(audio_format)}")
+    audio, blocks = _blocks(samplerate)
+    writer = AudioWriter(path, samplerate, 2, audio_format, batch_seconds=0.25)
+    writer.start()
+    for block in blocks:
+        writer.write(block)
+    writer.close()
+
+    assert writer.error is None
+    assert not writer.is_alive()
+    assert writer.frames_written == len(audio)
+    info = sf.info(path)
+    assert (info.format, info.subtype) == AUDIO_FORMATS[audio_format][:2]
+    assert (info.samplerate, info.channels) == (samplerate, 2)
+    data, _ = sf.read(path, dtype='float32', always_2d=True)
+    if audio_format == 'opus':
+        # 有损编码只检查时长和能量
+        assert abs(len(data) - len(audio)) < samplerate // 10
+        assert np.sqrt(np.mean(data ** 2)) == pytest.approx(np.sqrt(np.mean(audio ** 2)), rel=0.1)
+    else:
+        assert len(data) == len(audio)
+        np.testing.assert_allclose(data, audio, atol=1 / 32768 if audio_format == 'flac' else 0)
+
+
+def test_writer_clips_out_of_range_samples(tmp_path):
+    path = str(tmp_path / "audio.wav")
+    writer = AudioWriter(path, 16000, 1, 'wav')
+    writer.start()
+    writer.write(np.array([[2.0], [-3.0], [0.5]], dtype=np.float32))
+    writer.close()
+    data, _ = sf.read(path, dtype='float32')
+    assert data.tolist() == [1.0, -1.0, 0.5]
+
+
+def test_writer_error_still_closes(tmp_path):
+    # 文件无法创建时记录错误，队列照常清空，close() 能返回
+    writer = AudioWriter(str(tmp_path / "missing" / "audio.flac"), 48000, 2)
+    writer.start()
+    for _ in range(5):
+        writer.write(np.zeros((4096, 2), dtype=np.float32))
+    writer.close()
+    assert writer.error is not None
+    assert not writer.is_alive()
+    assert writer.frames_written == 0
+
+
+def test_resolve_audio_format(monkeypatch):
+    assert resolve_audio_format('flac', 44100) == 'flac'
+    assert resolve_audio_format('wav', 44100) == 'wav'
+    assert resolve_audio_format('mp3', 44100) == 'flac'
+    # Opus 不支持 44.1kHz
+    assert resolve_audio_format('opus', 44100) == 'flac'
+    subtypes = {'OGG': {'VORBIS'}, 'FLAC': {'PCM_16'}, 'WAV': {'FLOAT'}}
+    monkeypatch.setattr(audio_writer.sf, 'available_formats', lambda: {name: name for name in subtypes})
+    monkeypatch.setattr(audio_writer.sf, 'available_subtypes', lambda container: subtypes.get(container, {}))
+    assert resolve_audio_format('opus', 48000) == 'flac'
+    subtypes['OGG'] = {'OPUS'}
+    assert resolve_audio_format('opus', 48000) == 'opus'
+    # 没有 FLAC 支持时 Opus 的回退和 FLAC 本身都改用 WAV
+    del subtypes['FLAC']
+    assert resolve_audio_format('flac', 48000) == 'wav'
+    assert resolve_audio_format('opus', 44100) == 'wav'
@@ -0,0 +1,33 @@
+import numpy as np
+
+import core.compositor as compositor
+from core.compositor import FrameCompositor
+
+MOUSE = {
+    'enable_trail': True, 'trail_color': (0, 0, 255), 'trail_width': 2,
+    'enable_highlight': True, 'highlight_style': "圆形光环", 'highlight_size': 20,
+    'enable_click': True, 'click_size': 30, 'click_color': (0, 255, 0), 'enable_sound': True,
+}
+MONITOR = {'left': 0, 'top': 0, 'width': 160, 'height': 90}
+
+
+def _raw():
+    raw = np.zeros((90, 160, 4), dtype=np.uint8)
+    raw[..., 3] = 255
+    return raw
+
+
+def test_compose_without_cursor_backend(monkeypatch):
+    # 没有可用的平台后端时不绘制鼠标效果，也不播放点击音效
+    monkeypatch.setattr(compositor, 'cursor_state', lambda: None)
+    frame, changed = FrameCompositor((160, 90), {}, MOUSE).compose(_raw(), MONITOR)
+    assert changed
+    assert not frame.any()
+
+
+def test_compose_draws_cursor_from_argument(monkeypatch):
+    monkeypatch.setattr(compositor, 'winsound', None)
+    comp = FrameCompositor((160, 90), {}, MOUSE)
+    frame, _ = comp.compose(_raw(), MONITOR, cursor=((80, 45), True))
+    assert frame.any()
+    assert len(comp.click_effects) == 1
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from core.audio_dsp import StreamingDSP
+from core.denoiser import DenoiseWorker, NoiseProfile, SpectralGate
+
+SAMPLE_RATE = 16000
+
+
+def _noise(seconds, rng, channels=2):
+    return (0.05 * rng.standard_normal((int(SAMPLE_RATE * seconds), channels))).astype(np.float32)
+
+
+def _tone(frames, frequency=1000):
+    t = np.arange(frames) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * frequency * t))[:, None].astype(np.float32)
+
+
+@pytest.fixture
+def profile():
+    return NoiseProfile.from_audio(_noise(2.0, np.random.default_rng(1)), SAMPLE_RATE)
+
+
+def _process_in_chunks(processor, audio, sizes):
+    parts = []
+    position = 0
+    for size in sizes:
+        if position >= len(audio):
+            break
+        parts.append(processor.process(audio[position:position + size]))
+        position += size
+    parts.append(processor.flush())
+    return np.concatenate(parts)
+
+
+def test_profile_round_trip(profile):
+    restored = NoiseProfile.from_list(profile.to_list())
+    assert (restored.sample_rate, restored.n_fft) == (SAMPLE_RATE, 1024)
+    np.testing.assert_allclose(restored.threshold_db, profile.threshold_db)
+    assert NoiseProfile.from_list([]) is None
+    assert NoiseProfile.from_list([16000, 1024]) is None
+
+
+def test_profile_needs_one_fft_frame():
+    assert NoiseProfile.from_audio(np.zeros((1000, 2)), SAMPLE_RATE) is None
+
+
+def test_profile_resample(profile):
+    assert profile.resample(SAMPLE_RATE, 1024) is profile
+    resampled = profile.resample(48000, 1024)
+    assert resampled.threshold_db.shape == (513,)
+    # 白噪声的门限大致平坦，超出原采样率的频点沿用最高频点的值
+    assert resampled.threshold_db[-1] == profile.threshold_db[-1]
+
+
+@pytest.mark.parametrize("sizes", [[4096], [1, 7, 255, 256, 1023, 4000], [333]])
+def test_gate_output_independent_of_chunk_size(profile, sizes):
+    rng = np.random.default_rng(0)
+    audio = _noise(1.0, rng) + _tone(SAMPLE_RATE)
+    whole = SpectralGate(SAMPLE_RATE, 2, profile)
+    expected = np.concatenate([whole.process(audio), whole.flush()])
+    actual = _process_in_chunks(SpectralGate(SAMPLE_RATE, 2, profile), audio, sizes * len(audio))
+    assert actual.shape == audio.shape
+    np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+
+def test_gate_attenuates_stationary_noise_and_keeps_tone(profile):
+    rng = np.random.default_rng(2)
+    noise = _noise(2.0, rng)
+    gate = SpectralGate(SAMPLE_RATE, 2, profile, strength=0.9)
+    denoised = np.concatenate([gate.process(noise), gate.flush()])
+    # 只有噪声时能量降到 1/4 以下
+    assert np.mean(denoised ** 2) < 0.25 * np.mean(noise ** 2)
+
+    tone = _tone(len(noise))
+    gate = SpectralGate(SAMPLE_RATE, 2, profile, strength=0.9)
+    mixed = noise + tone
+    output = np.concatenate([gate.process(mixed), gate.flush()])
+    # 远高于噪声门限的正弦基本不受影响
+    middle = slice(SAMPLE_RATE // 2, -SAMPLE_RATE // 2)
+    residual = output[middle] - np.repeat(tone, 2, axis=1)[middle]
+    assert np.mean(residual ** 2) < 0.25 * np.mean(noise ** 2)
+
+
+def test_bypass_passes_audio_through(profile):
+    audio = _noise(1.0, np.random.default_rng(3))
+    gate = SpectralGate(SAMPLE_RATE, 2, profile)
+    parts = [gate.process(audio[i:i + 1000], bypass=True) for i in range(0, len(audio), 1000)]
+    # flush 不带 bypass，会影响结尾 6 个跳步，其余部分必须原样输出
+    output = np.concatenate(parts + [gate.flush()])
+    assert output.shape == audio.shape
+    np.testing.assert_allclose(output[:-6 * gate.hop], audio[:-6 * gate.hop], atol=1e-5)
+
+
+def _run_worker(worker, audio, block=1600):
+    worker.start()
+    outputs = []
+    for i in range(0, len(audio), block):
+        worker.submit(audio[i:i + block])
+        outputs.extend(worker.poll())
+    outputs.extend(worker.close())
+    return np.concatenate(outputs)
+
+
+def test_worker_matches_in_process_gate(profile):
+    audio = _noise(1.0, np.random.default_rng(4)) + _tone(SAMPLE_RATE)
+    gate = SpectralGate(SAMPLE_RATE, 2, profile)
+    expected = np.concatenate([gate.process(audio), gate.flush()])
+    worker = DenoiseWorker(SAMPLE_RATE, 2, profile, max_latency=60.0)
+    output = _run_worker(worker, audio)
+    np.testing.assert_allclose(output, expected, atol=1e-6)
+    assert worker.bypassed_blocks == 0
+    assert not worker.process.is_alive()
+
+
+def test_worker_without_profile_runs_voice_filter():
+    audio = _noise(1.0, np.random.default_rng(5))
+    dsp = StreamingDSP(SAMPLE_RATE, 2)
+    expected = np.concatenate([dsp.process(audio), dsp.flush()])
+    output = _run_worker(DenoiseWorker(SAMPLE_RATE, 2, None), audio)
+    np.testing.assert_allclose(output, expected, atol=1e-6)
+
+
+def test_worker_bypasses_when_backlogged(profile):
+    # 延迟上限为 0 时每块都跳过频谱处理，输出仍然连续
+    audio = _noise(1.0, np.random.default_rng(6))
+    worker = DenoiseWorker(SAMPLE_RATE, 2, profile, max_latency=0.0)
+    output = _run_worker(worker, audio)
+    assert output.shape == audio.shape
+    assert worker.bypassed_blocks == 10
+    np.testing.assert_allclose(output[:-6 * 256], audio[:-6 * 256], atol=1e-5)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from core.dirty_tiles import DirtyTileTracker, IncrementalScaler, _convert_full, dirty_rects
+from core.strip_engine import StripEngine
+
+
+def _frame(height=360, width=640, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 4), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("row", range(0, 64, 7))
+def test_single_pixel_change_detected_on_the_same_frame(row):
+    # 任何一行上的单个像素变化都必须在当帧被发现，不能等到后续帧
+    base = _frame()
+    tracker = DirtyTileTracker(tile=64)
+    tracker.update(base)
+    frame = base.copy()
+    frame[64 + row, 200, 1] ^= 1
+    mask = tracker.update(frame)
+    expected = np.zeros_like(mask)
+    expected[1, 200 // 64] = True
+    assert np.array_equal(mask, expected)
+    # 参考帧已更新，同一画面再次送入时没有变化
+    assert not tracker.update(frame).any()
+
+
+def test_unchanged_frame_and_partial_edge_tiles():
+    base = _frame(height=100, width=150)
+    tracker = DirtyTileTracker(tile=64)
+    assert tracker.update(base).all()
+    assert not tracker.update(base.copy()).any()
+    frame = base.copy()
+    frame[99, 149] = 0
+    assert np.flatnonzero(tracker.update(frame)).tolist() == [1 * 3 + 2]
+
+
+def test_engine_gives_the_same_mask():
+    base = _frame(height=1080, width=1920)
+    frame = base.copy()
+    frame[10:12, 10:12] = 0
+    frame[900, 1800] ^= 255
+    engine = StripEngine(workers=2)
+    engine.strips = 2
+    try:
+        masks = []
+        for tracker in (DirtyTileTracker(), DirtyTileTracker(engine=engine)):
+            tracker.update(base)
+            masks.append(tracker.update(frame))
+    finally:
+        engine.close()
+    assert np.array_equal(*masks)
+    assert masks[0].sum() == 2
+
+
+def test_dirty_rects_merge_runs():
+    mask = np.zeros((4, 5), dtype=bool)
+    mask[0:2, 1:3] = True
+    mask[3, 4] = True
+    assert sorted(dirty_rects(mask, 64, 300, 250)) == [(64, 0, 192, 128), (256, 192, 300, 250)]
+
+
+def test_incremental_scaler_matches_full_conversion():
+    # 模拟打字：每帧只有一小块变化，增量缩放的结果与整幅缩放相差不超过 1
+    rng = np.random.default_rng(1)
+    frame = _frame(height=1080, width=1920)
+    scaler = IncrementalScaler((960, 540))
+    output, changed = scaler.update(frame)
+    assert changed and scaler.full
+    for i in range(20):
+        y, x = 200 + (i % 5) * 20, 300 + i * 12
+        frame = frame.copy()
+        frame[y:y + 20, x:x + 12] = rng.integers(0, 256, (20, 12, 4), dtype=np.uint8)
+        output, changed = scaler.update(frame)
+        assert changed and not scaler.full
+    output, changed = scaler.update(frame.copy())
+    assert not changed
+    error = np.abs(output.astype(int) - _convert_full(frame, (960, 540)).astype(int)).max()
+    assert error <= 1
@@ -0,0 +1,164 @@
+import shutil
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from core.compositor import FrameCompositor
+from core.encoder import VfrEncoder, VideoEncoder, crop_i420, frame_dimensions, resize_i420
+from core.muxer import probe_video_size
+from core.shm_ring import SharedFrameRing
+from core.trim import probe_duration
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None,
+                                  reason="需要 ffmpeg/ffprobe")
+
+
+def _bgr(width=320, height=240):
+    rng = np.random.default_rng(0)
+    return cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+
+
+def test_frame_dimensions():
+    frame = _bgr()
+    assert frame_dimensions(frame) == (320, 240)
+    assert frame_dimensions(cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420), 'yuv420p') == (320, 240)
+
+
+@pytest.mark.parametrize("size", [(160, 120), (160, 90)])
+def test_resize_i420_matches_bgr_resize(size):
+    # 高度不是 4 的倍数时平面边界不在行首，也要按平面正确缩放
+    frame = _bgr()
+    resized = resize_i420(cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420), size)
+    assert frame_dimensions(resized, 'yuv420p') == size
+    reference = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    error = np.abs(cv2.cvtColor(resized, cv2.COLOR_YUV2BGR_I420).astype(int) - reference.astype(int))
+    assert error.mean() < 3
+
+
+def test_crop_i420_matches_bgr_crop():
+    frame = _bgr()
+    cropped = crop_i420(cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420), (40, 20, 100, 60))
+    assert frame_dimensions(cropped, 'yuv420p') == (100, 60)
+    reference = cv2.cvtColor(cv2.cvtColor(frame[20:80, 40:140], cv2.COLOR_BGR2YUV_I420), cv2.COLOR_YUV2BGR_I420)
+    error = np.abs(cv2.cvtColor(cropped, cv2.COLOR_YUV2BGR_I420).astype(int) - reference.astype(int))
+    assert error.max() <= 2
+
+
+@needs_ffmpeg
+@pytest.mark.parametrize("pixel_format", ['bgr24', 'yuv420p'])
+def test_encoder_writes_every_frame(tmp_path, pixel_format):
+    # 合成阶段输出 BGR 或 I420，经过编码队列和管道编码为 H.264
+    path = str(tmp_path / "video.mkv")
+    encoder = VideoEncoder(path, (320, 240), 30, pixel_format=pixel_format)
+    encoder.start()
+    base = _bgr()
+    for i in range(30):
+        frame = np.roll(base, i * 8, axis=1)
+        if pixel_format == 'yuv420p':
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420)
+        encoder.write(frame)
+    encoder.release()
+    assert encoder.error is None
+    assert encoder.frames_written == 30
+    assert probe_video_size(path) == (320, 240)
+    assert probe_duration(path) == pytest.approx(1.0, abs=0.1)
+
+
+@needs_ffmpeg
+def test_encoder_scales_frames_to_its_size(tmp_path):
+    # 编码档位降低分辨率时写入的整尺寸帧缩放到编码尺寸
+    path = str(tmp_path / "video.mkv")
+    encoder = VideoEncoder(path, (160, 120), 30)
+    encoder.start()
+    for _ in range(10):
+        encoder.write(_bgr())
+    encoder.release()
+    assert encoder.frames_written == 10
+    assert probe_video_size(path) == (160, 120)
+
+
+_NO_MOUSE = {'enable_trail': False, 'enable_highlight': False, 'enable_click': False, 'enable_sound': False}
+
+
+def _pipeline_throughput(tmp_path, pixel_format, frame_size=(1280, 720), count=60):
+    # 合成 -> 共享内存槽位 -> 就绪队列 -> 编码器，与多进程采集的数据路径相同，返回 (每帧字节数, 帧/秒)
+    width, height = frame_size
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 4), dtype=np.uint8), (0, 0), 3)
+    monitor = {'left': 0, 'top': 0, 'width': width, 'height': height}
+    shape = (height * 3 // 2, width) if pixel_format == 'yuv420p' else (height, width, 3)
+    ring = SharedFrameRing(shape, 8)
+    compositor = FrameCompositor(frame_size, {}, _NO_MOUSE, pixel_format=pixel_format)
+    encoder = VideoEncoder(str(tmp_path / f"{pixel_format}.mkv"), frame_size, 30, pixel_format=pixel_format)
+    encoder.start()
+    try:
+        started = time.perf_counter()
+        for i in range(count):
+            index = ring.acquire(timeout=10)
+            compositor.compose(np.roll(base, i * 8, axis=1), monitor, out=ring.frame(index), cursor=((0, 0), False))
+            ring.publish(index, i)
+            index, _ = ring.receive(timeout=10)
+            encoder.write(ring.frame(index), True, done=lambda index=index: ring.release(index))
+        encoder.release()
+        elapsed = time.perf_counter() - started
+    finally:
+        ring.close()
+    assert encoder.error is None
+    assert encoder.frames_written == count
+    return int(np.prod(shape)), count / elapsed
+
+
+@needs_ffmpeg
+def test_i420_pipeline_halves_bytes_per_frame(tmp_path):
+    # 端到端对比 BGR 与 I420：每帧经过共享内存和管道的数据量，以及整条流水线的吞吐量
+    results = {fmt: _pipeline_throughput(tmp_path, fmt) for fmt in ('bgr24', 'yuv420p')}
+    for fmt, (size, fps) in results.items():
+        print(f"{fmt}: 每帧 {size / 1e6:.2f}MB, {fps:.1f} 帧/秒")
+    assert results['yuv420p'][0] * 2 == results['bgr24'][0]
+    # 吞吐量受机器负载影响，只防止 I420 模式明显退化
+    assert results['yuv420p'][1] > 0.5 * results['bgr24'][1]
+
+
+def _decoded_times(path):
+    av = pytest.importorskip("av")
+    with av.open(path) as container:
+        return [float(frame.time) for frame in container.decode(video=0)]
+
+
+@pytest.mark.skipif(not VfrEncoder.available(), reason="需要 PyAV")
+def test_vfr_skips_repeated_frames_and_forces_max_interval(tmp_path):
+    # 10fps，画面只在第 0 格变化：每隔 max_interval（10 格）强制编码一帧，结尾补上最后一格
+    path = str(tmp_path / "vfr.mkv")
+    encoder = VfrEncoder(path, (160, 120), 10, max_interval=1.0)
+    encoder.start()
+    released = []
+    frame = _bgr(160, 120)
+    for slot in range(35):
+        encoder.write(frame, changed=slot == 0, done=lambda slot=slot: released.append(slot))
+    encoder.release()
+    assert encoder.error is None
+    assert encoder.frames_written == 5
+    assert encoder.unchanged_frames == 31
+    # 每一帧的 done 回调都恰好调用一次
+    assert sorted(released) == list(range(35))
+    assert _decoded_times(path) == pytest.approx([0.0, 1.0, 2.0, 3.0, 3.4])
+
+
+@pytest.mark.skipif(not VfrEncoder.available(), reason="需要 PyAV")
+def test_vfr_pts_follow_slots_and_duration_matches(tmp_path):
+    # 画面不定期变化：输出时间戳单调递增，就是各帧的时间格，时长与写入的格数一致
+    path = str(tmp_path / "vfr.mkv")
+    encoder = VfrEncoder(path, (160, 120), 10, max_interval=0.5)
+    encoder.start()
+    base = _bgr(160, 120)
+    changed_slots = {0, 1, 2, 7, 8, 20, 21, 22, 23, 29}
+    for slot in range(30):
+        encoder.write(np.roll(base, slot, axis=1), changed=slot in changed_slots)
+    encoder.release()
+    times = _decoded_times(path)
+    assert all(later > earlier for earlier, later in zip(times, times[1:]))
+    expected = sorted(changed_slots | {13, 18, 28})
+    assert times == pytest.approx([slot / 10 for slot in expected])
+    assert probe_duration(path) == pytest.approx(3.0, abs=0.11)
@@ -0,0 +1,57 @@
+import pytest
+
+from core.frame_layout import plan_layout
+
+
+def test_native_size_needs_no_resize():
+    layout = plan_layout((1920, 1080), (1920, 1080), 'letterbox', True)
+    assert layout.output == (1920, 1080)
+    assert not layout.needs_resize
+    assert not layout.letterboxed
+
+
+def test_letterbox_keeps_aspect_ratio():
+    layout = plan_layout((2560, 1600), (1920, 1080), 'letterbox', True)
+    assert layout.output == (1920, 1080)
+    left, top, width, height = layout.content
+    assert height == 1080 and abs(width / height - 1.6) < 0.01
+    # 画面居中，偏移为偶数
+    assert left == (1920 - width) // 4 * 2 and top == 0
+    assert layout.letterboxed
+
+
+@pytest.mark.parametrize("source", [(401, 301), (800, 2000), (1000, 700)])
+def test_fit_without_upscale_never_enlarges(source):
+    layout = plan_layout(source, (1920, 1080), 'fit', False)
+    assert layout.output == layout.content_size
+    assert layout.output[0] <= source[0] and layout.output[1] <= source[1]
+    assert layout.output[0] % 2 == 0 and layout.output[1] % 2 == 0
+    assert abs(layout.output[0] / layout.output[1] - source[0] / source[1]) < 0.02
+
+
+def test_small_region_is_captured_at_native_size():
+    layout = plan_layout((401, 301), (1920, 1080), 'fit', False)
+    # 奇数宽高少采集一行/一列，不做缩放
+    assert layout.source == (400, 300)
+    assert not layout.needs_resize
+
+
+def test_window_letterbox_without_upscale():
+    layout = plan_layout((1000, 700), (1920, 1080), 'letterbox', False)
+    assert layout.output == (1920, 1080)
+    assert layout.content_size == (1000, 700)
+    assert not layout.needs_resize and layout.letterboxed
+
+
+@pytest.mark.parametrize("size", [(1001, 701), (1400, 700), (600, 900)])
+def test_follow_keeps_output_size(size):
+    layout = plan_layout((1001, 701), (1920, 1080), 'fit')
+    followed = layout.follow(size)
+    assert followed.output == layout.output
+    content = followed.content
+    assert content[0] + content[2] <= layout.output[0] and content[1] + content[3] <= layout.output[1]
+
+
+def test_follow_same_size_returns_same_layout():
+    layout = plan_layout((1001, 701), (1920, 1080), 'fit')
+    assert layout.follow((1001, 701)) == layout
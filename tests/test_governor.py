@@ -0,0 +1,40 @@
+from core.governor import QualityGovernor, build_ladder
+
+
+def test_ladder_order():
+    # 先换更快的预设、提高 CRF，再降帧率，最后降分辨率
+    ladder = build_ladder('veryfast', crf=23, max_crf=31, min_scale=0.5)
+    assert [level.preset for level in ladder[:3]] == ['veryfast', 'superfast', 'ultrafast']
+    assert [level.crf for level in ladder[2:5]] == [23, 27, 31]
+    assert ladder[5].fps_divisor == 2 and ladder[5].scale == 1.0
+    assert [level.scale for level in ladder[6:]] == [0.75, 0.5]
+
+
+def _simulate(fps=60, seconds=60):
+    # 模拟编码能力不足的机器：前 30 秒是复杂画面，之后画面变简单
+    now = [0.0]
+    governor = QualityGovernor(build_ladder(), fps, log=lambda message: None, clock=lambda: now[0])
+    capacity = fps
+    backlog = 0.0
+    levels = []
+    while now[0] < seconds:
+        level = governor.level
+        heavy = now[0] < 30
+        # 编码开销与像素数和 CRF 近似相关，采集合成开销与像素数相关
+        cost = (1.6 if heavy else 0.5) * level.scale ** 2 * (1 - (level.crf - 23) * 0.03)
+        produced = 1.0 / level.fps_divisor
+        backlog = min(capacity, max(0.0, backlog + produced - 1.0 / cost))
+        governor.record('compose', 0.004 * level.scale ** 2)
+        governor.update(backlog, capacity)
+        levels.append((now[0], governor.index))
+        now[0] += level.fps_divisor / fps
+    return governor, levels
+
+
+def test_governor_degrades_under_load_and_recovers():
+    governor, levels = _simulate()
+    heavy = max(index for t, index in levels if t < 30)
+    assert heavy > 0
+    # 画面变简单后逐步升回，结束时档位比最重负载时高
+    assert governor.index < heavy
+    assert governor.decisions
@@ -0,0 +1,40 @@
+import numpy as np
+
+from core.level_meter import SILENCE_FLOOR_DB, LevelMeter
+
+
+def _meter(**kwargs):
+    warnings = []
+    meter = LevelMeter(["系统声音", "麦克风"], 48000, lambda levels: None,
+                       lambda name, state: warnings.append((name, state)), **kwargs)
+    return meter, warnings
+
+
+def test_block_levels():
+    meter, _ = _meter()
+    tone = np.full((4800, 2), 0.5, dtype=np.float32)
+    silence = np.zeros((4800, 2), dtype=np.float32)
+    levels = meter.update([tone, silence])
+    assert abs(levels[0] - 20 * np.log10(0.5)) < 1e-6
+    assert levels[1] == SILENCE_FLOOR_DB
+
+
+def test_silence_warning_raised_once_and_cleared():
+    meter, warnings = _meter(silence_seconds=0.5)
+    rng = np.random.default_rng(0)
+    noise = (0.1 * rng.standard_normal((4800, 2))).astype(np.float32)
+    silence = np.zeros((4800, 2), dtype=np.float32)
+    for _ in range(10):
+        meter.update([noise, silence])
+    assert warnings == [("麦克风", 'silent')]
+    meter.update([noise, noise])
+    assert warnings[-1] == ("麦克风", 'ok')
+
+
+def test_clip_warning():
+    meter, warnings = _meter(clip_blocks=3)
+    clipped = np.ones((4800, 2), dtype=np.float32)
+    quiet = np.full((4800, 2), 0.1, dtype=np.float32)
+    for _ in range(3):
+        meter.update([clipped, quiet])
+    assert warnings == [("系统声音", 'clipped')]
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+mss = pytest.importorskip("mss")
+
+import core.multi_monitor as multi_monitor
+from core.multi_monitor import MonitorGroup, MonitorRecording, copy_into, stitch_canvas
+
+
+class _FakeScreen:
+    # 每个显示器的截图填上按左上角坐标区分的颜色，方便检查拼接位置
+    def grab(self, monitor):
+        shot = np.empty((monitor['height'], monitor['width'], 4), dtype=np.uint8)
+        shot[:] = (monitor['left'] // 10 + 1) % 256
+        return shot
+
+    def close(self):
+        pass
+
+
+def test_stitched_group_copies_each_monitor_into_its_region(monkeypatch):
+    monkeypatch.setattr(multi_monitor.mss, 'mss', _FakeScreen)
+    monitors = [{'left': 0, 'top': 0, 'width': 64, 'height': 48},
+                {'left': 640, 'top': 10, 'width': 32, 'height': 24}]
+    canvas, views = stitch_canvas(monitors, (672, 58))
+    assert canvas.shape == (58, 672, 4)
+    group = MonitorGroup(monitors, [copy_into(view) for view in views])
+    try:
+        for _ in range(5):
+            group.grab()
+    finally:
+        group.close()
+    assert (canvas[:48, :64] == 1).all()
+    assert (canvas[10:34, 640:672] == 65).all()
+    # 显示器之间的空隙保持黑色
+    assert not canvas[:, 64:640].any()
+    assert not canvas[34:, 640:].any()
+    assert all(grabber.error is None for grabber in group.grabbers)
+    assert group.max_skew_ns >= 0
+
+
+class _Encoder:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame, changed=True):
+        self.frames.append((frame, changed))
+
+
+class _Compositor:
+    def compose(self, raw, monitor):
+        return raw, True
+
+
+def test_separate_recording_fills_skipped_slots():
+    encoder = _Encoder()
+    recording = MonitorRecording({'left': 0, 'top': 0, 'width': 4, 'height': 4}, _Compositor(), encoder, "out.mp4")
+    frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(3)]
+    for slot, frame in zip([0, 3, 3], frames):
+        recording.slot = slot
+        recording.handler(frame, 0)
+    # 落后的时间格用上一帧补齐，同一时间格只写一次
+    assert [int(frame[0, 0, 0]) for frame, _ in encoder.frames] == [0, 0, 0, 1]
+    assert [changed for _, changed in encoder.frames] == [True, False, False, True]
+    assert recording.next_slot == 4
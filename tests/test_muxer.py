@@ -0,0 +1,96 @@
+import shutil
+
+import pytest
+
+from core import muxer
+from core.encoder import VideoEncoder
+from core.muxer import concat_segments, mux, probe_codecs, probe_video_size, run_ffmpeg
+from core.trim import probe_duration
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None,
+                                reason="需要 ffmpeg/ffprobe")
+
+
+@pytest.fixture
+def media(tmp_path):
+    # 2 秒 H.264 中间视频和两条 FLAC 音轨
+    video = str(tmp_path / "video.mkv")
+    run_ffmpeg(['-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=30:duration=2',
+                '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', video])
+    tracks = []
+    for name, frequency in (("系统声音", 660), ("麦克风", 440)):
+        path = str(tmp_path / f"{frequency}.flac")
+        run_ffmpeg(['-f', 'lavfi', '-i', f'sine=frequency={frequency}:sample_rate=48000:duration=2',
+                    '-ac', '2', path])
+        tracks.append((path, name, 1.0))
+    return video, tracks
+
+
+def test_copy_when_container_accepts_codecs(media, tmp_path):
+    video, tracks = media
+    output = str(tmp_path / "output.mkv")
+    plan, _ = mux(video, tracks[1:], output)
+    assert plan == {'video': 'copy', '麦克风': 'copy'}
+    assert probe_codecs(output) == [('video', 'h264'), ('audio', 'flac')]
+
+
+def test_encode_audio_the_container_cannot_hold(media, tmp_path):
+    # MP4 不接受 FLAC，音频重新编码为 AAC，视频仍然直接复制
+    video, tracks = media
+    output = str(tmp_path / "output.mp4")
+    plan, _ = mux(video, tracks[1:], output)
+    assert plan == {'video': 'copy', '麦克风': 'encode'}
+    assert probe_codecs(output) == [('video', 'h264'), ('audio', 'aac')]
+
+
+def test_premix_track_comes_first(media, tmp_path):
+    video, tracks = media
+    output = str(tmp_path / "output.mkv")
+    plan, _ = mux(video, tracks, output, premix=True)
+    assert plan == {'video': 'copy', '混音': 'encode', '系统声音': 'copy', '麦克风': 'copy'}
+    assert probe_codecs(output) == [('video', 'h264'), ('audio', 'aac'), ('audio', 'flac'), ('audio', 'flac')]
+
+
+def test_reencode_when_copy_not_allowed(media, tmp_path):
+    video, tracks = media
+    output = str(tmp_path / "output.mp4")
+    plan, _ = mux(video, tracks[1:], output, allow_copy=False)
+    assert plan == {'video': 'encode', '麦克风': 'encode'}
+
+
+def _segment(path, size, seconds):
+    run_ffmpeg(['-f', 'lavfi', '-i', f'testsrc=size={size}:rate=30:duration={seconds}',
+                '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', path])
+    return path
+
+
+def test_concat_upscales_only_reduced_segments(tmp_path):
+    # 中间一段按 50% 分辨率录制，只有这一段重新编码，拼接后尺寸和总时长不变
+    paths = [_segment(str(tmp_path / "seg0.mkv"), '320x240', 1),
+             _segment(str(tmp_path / "seg1.mkv"), '160x120', 1),
+             _segment(str(tmp_path / "seg2.mkv"), '320x240', 1)]
+    output = str(tmp_path / "joined.mkv")
+    assert concat_segments(paths, output, (320, 240)) == 1
+    assert probe_video_size(output) == (320, 240)
+    assert abs(probe_duration(output) - 3.0) < 0.1
+    # 放大用的临时文件和播放列表都已删除
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["joined.mkv", "seg0.mkv", "seg1.mkv", "seg2.mkv"]
+
+
+def test_concat_upscale_uses_recorder_encode_args(tmp_path, monkeypatch):
+    # 放大重编码的分段与录制分段使用同一组 x264 参数（包括 repeat-headers=1），拼接时参数集一致
+    commands = []
+    monkeypatch.setattr(muxer, 'run_ffmpeg', commands.append)
+    monkeypatch.setattr(muxer, 'probe_video_size', lambda path: (160, 120))
+    concat_segments([str(tmp_path / "seg0.mkv")], str(tmp_path / "joined.mkv"), (320, 240))
+    recorder_args = VideoEncoder("seg.mkv", (320, 240), 30)._command()
+    upscale = commands[0]
+    assert upscale[upscale.index('-c:v'):-1] == recorder_args[recorder_args.index('-c:v'):-1]
+    assert 'repeat-headers=1' in upscale
+
+
+def test_concat_same_size_is_pure_copy(tmp_path):
+    paths = [_segment(str(tmp_path / f"seg{i}.mkv"), '320x240', 1) for i in range(2)]
+    output = str(tmp_path / "joined.mkv")
+    assert concat_segments(paths, output, (320, 240)) == 0
+    assert abs(probe_duration(output) - 2.0) < 0.1
@@ -0,0 +1,55 @@
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from core.muxer import probe_video_size
+from core.output_branch import BranchFanout, OutputBranch
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None,
+                                reason="需要 ffmpeg/ffprobe")
+
+
+def test_fanout_shares_derived_frames_and_divides_fps(tmp_path):
+    # 主画面分出两路相同尺寸的输出（共用同一次缩放）和一路裁剪输出
+    source_size = (640, 360)
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 256, (360, 640, 3), dtype=np.uint8), (0, 0), 3)
+    branches = [
+        OutputBranch('proxy', (320, 180), crf=30),
+        OutputBranch('proxy_15fps', (320, 180), fps_divisor=2, crf=30),
+        OutputBranch('crop', (640, 360), crop=(101, 51, 201, 101), crf=30),
+    ]
+    fanout = BranchFanout(branches, source_size, 30, 'bgr24', str(tmp_path), str(tmp_path / "main.mp4"))
+    fanout.start()
+    released = []
+    for i in range(20):
+        fanout.write(np.roll(base, i * 8, axis=1), changed=True, done=lambda i=i: released.append(i))
+    fanout.release()
+
+    assert released == list(range(20))
+    encoders = [output['encoder'] for output in fanout.outputs]
+    assert [encoder.frames_written for encoder in encoders] == [20, 10, 20]
+    # 15fps 的一路与 30fps 的一路在偶数时间格共用缩放结果
+    assert fanout.shared == 10
+    assert fanout.derived == 40
+    assert probe_video_size(encoders[0].path) == (320, 180)
+    # 裁剪区域取偶数，不放大
+    assert probe_video_size(encoders[2].path) == (200, 100)
+    assert [output['output_file'] for output in fanout.outputs] == [
+        str(tmp_path / "main_proxy.mp4"), str(tmp_path / "main_proxy_15fps.mp4"), str(tmp_path / "main_crop.mp4")]
+    assert "proxy" in fanout.describe()
+
+
+def test_unchanged_frames_are_not_derived_again(tmp_path):
+    branches = [OutputBranch('proxy', (160, 90))]
+    fanout = BranchFanout(branches, (320, 180), 30, 'bgr24', str(tmp_path), str(tmp_path / "main.mkv"))
+    fanout.start()
+    frame = np.zeros((180, 320, 3), dtype=np.uint8)
+    fanout.write(frame, changed=True)
+    for _ in range(9):
+        fanout.write(frame, changed=False)
+    fanout.release()
+    assert fanout.derived == 1
+    assert fanout.outputs[0]['encoder'].frames_written == 10
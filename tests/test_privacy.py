@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+import pytest
+
+from core.dirty_tiles import IncrementalScaler
+from core.privacy import PrivacyMask, PrivacyRegion, redact
+
+SOURCE = (1920, 1080)
+FRAME = (960, 540)
+
+
+def _frame(rng):
+    return rng.integers(0, 256, (SOURCE[1], SOURCE[0], 4), dtype=np.uint8)
+
+
+def _reference(frame):
+    return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR), FRAME)
+
+
+@pytest.mark.parametrize("style", ['mosaic', 'blur'])
+def test_redact_changes_only_the_region(style):
+    buffer = np.random.default_rng(0).integers(0, 256, (100, 100, 3), dtype=np.uint8)
+    original = buffer.copy()
+    redact(buffer, (10, 20, 60, 70), style, 8)
+    assert not np.array_equal(buffer[20:70, 10:60], original[20:70, 10:60])
+    outside = np.ones(buffer.shape[:2], dtype=bool)
+    outside[20:70, 10:60] = False
+    assert np.array_equal(buffer[outside], original[outside])
+
+
+def test_mask_skips_unchanged_regions_and_leaves_no_original_pixels():
+    # 一个区域内一直有变化，一个区域静止
+    rng = np.random.default_rng(0)
+    frame = _frame(rng)
+    regions = [PrivacyRegion((50, 50, 400, 300), 'mosaic'), PrivacyRegion((1200, 600, 500, 350), 'blur')]
+    mask = PrivacyMask(regions)
+    scaler = IncrementalScaler(FRAME)
+    count = 10
+    for _ in range(count):
+        frame[150:200, 150:300] = rng.integers(0, 256, (50, 150, 4), dtype=np.uint8)
+        scaler.update(frame)
+        mask.apply(scaler, frame, (0, 0))
+    # 第一帧两个区域都打码，之后只有变化的区域重新打码
+    assert mask.redacted == count + 1
+    assert mask.skipped == count - 1
+    buffer = scaler.buffer
+    reference = _reference(frame)
+    for region in regions:
+        x, y, width, height = region.rect
+        x0, y0, x1, y1 = scaler.output_rect(frame.shape, x, y, x + width, y + height)
+        same = np.all(buffer[y0:y1, x0:x1] == reference[y0:y1, x0:x1], axis=2)
+        assert same.mean() < 0.1
+
+
+def test_mask_leaves_pixels_outside_regions_untouched():
+    frame = _frame(np.random.default_rng(1))
+    mask = PrivacyMask([PrivacyRegion((400, 300, 600, 400), 'mosaic')])
+    scaler = IncrementalScaler(FRAME)
+    scaler.update(frame)
+    assert mask.apply(scaler, frame, (0, 0))
+    x0, y0, x1, y1 = scaler.output_rect(frame.shape, 400, 300, 1000, 700)
+    outside = np.ones(FRAME[::-1], dtype=bool)
+    # 打码区域向外扩出的一圈插值像素也算在内
+    outside[max(0, y0 - 1):y1 + 1, max(0, x0 - 1):x1 + 1] = False
+    reference = _reference(frame)
+    assert np.array_equal(scaler.buffer[outside], reference[outside])
+
+
+def test_moved_region_restores_its_previous_position():
+    # 区域移动（或移出截图）后旧位置恢复为原画面，新位置打码；与之重叠的静止区域仍保持打码
+    frame = _frame(np.random.default_rng(3))
+    regions = [PrivacyRegion((100, 100, 400, 300), 'mosaic'), PrivacyRegion((300, 300, 400, 300), 'blur')]
+    mask = PrivacyMask(regions)
+    scaler = IncrementalScaler(FRAME)
+    scaler.update(frame)
+    mask.apply(scaler, frame, (0, 0))
+    reference = _reference(frame)
+
+    def difference(rect):
+        x0, y0, x1, y1 = scaler.output_rect(frame.shape, *rect)
+        return np.abs(scaler.buffer[y0:y1, x0:x1].astype(int) - reference[y0:y1, x0:x1])
+
+    for rect in [(1200, 600, 400, 300), (5000, 5000, 100, 100)]:
+        mask.move(0, rect)
+        scaler.update(frame)
+        assert mask.apply(scaler, frame, (0, 0))
+        # 旧位置中不属于另一个区域的部分恢复原画面（局部重新缩放与整幅缩放最多差 1）
+        assert difference((100, 100, 290, 290)).max() <= 1
+        assert np.all(difference((300, 300, 700, 600)) == 0, axis=2).mean() < 0.1
+    assert difference((1200, 600, 1600, 900)).max() <= 1
+
+
+def test_region_outside_capture_is_ignored():
+    frame = _frame(np.random.default_rng(2))
+    mask = PrivacyMask([PrivacyRegion((5000, 5000, 100, 100))])
+    scaler = IncrementalScaler(FRAME)
+    scaler.update(frame)
+    assert not mask.apply(scaler, frame, (0, 0))
+    assert mask.redacted == 0
@@ -0,0 +1,152 @@
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+pytest.importorskip("PySide6")
+pytest.importorskip("sounddevice")
+pytest.importorskip("mss")
+
+import core.screen_recorder as screen_recorder
+from core.audio_capture import AudioRingBuffer, AudioSource
+from core.audio_devices import AudioDevice
+from core.muxer import run_ffmpeg
+from core.screen_recorder import ScreenRecorder
+from core.sync import PtsWriter
+
+FREQUENCIES = {"系统声音": 660, "麦克风": 440}
+
+
+class _ScriptedSource(AudioSource):
+    # 不打开设备：start() 后按真实时间每 10ms 把一段正弦送进回调，频率按音频源区分
+    latency = 0.0
+
+    def __init__(self, name, device, data_ready=None, **kwargs):
+        self.name = name
+        self.device = device
+        self.samplerate = 48000
+        self.channels = 2
+        self.ring = AudioRingBuffer(self.samplerate * 2, self.channels)
+        self.data_ready = data_ready
+        self.overflow_count = self.overflow_frames = 0
+        self.underflow_count = self.underflow_frames = 0
+        self.driver_overflow_count = 0
+        self.stream = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._feed, daemon=True)
+
+    def _feed(self):
+        class Status:
+            input_overflow = False
+        started = time.monotonic()
+        produced = 0
+        while not self._stop_event.wait(0.01):
+            frames = int((time.monotonic() - started) * self.samplerate) - produced
+            t = (produced + np.arange(frames)) / self.samplerate
+            tone = 0.2 * np.sin(2 * np.pi * FREQUENCIES[self.name] * t)
+            self._callback(np.repeat(tone[:, None], 2, axis=1).astype(np.float32), frames, None, Status())
+            produced += frames
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def _band_level(audio, samplerate, frequency):
+    # 加窗后取 ±10Hz 内的能量，不受录音长度与频点对齐的影响
+    spectrum = np.abs(np.fft.rfft(audio[:, 0] * np.hanning(len(audio))))
+    freqs = np.fft.rfftfreq(len(audio), 1 / samplerate)
+    return np.sqrt((spectrum[np.abs(freqs - frequency) < 10] ** 2).sum())
+
+
+@pytest.fixture
+def recorder(tmp_path, monkeypatch):
+    monkeypatch.setattr(screen_recorder, 'AudioSource', _ScriptedSource)
+    recorder = ScreenRecorder()
+    registry = recorder.device_registry
+    registry.wait_ready(5)
+    loopback = AudioDevice("Windows WASAPI:扬声器 (Loopback)", 3, "扬声器 (Loopback)", "Windows WASAPI", 2, 48000)
+    registry._devices = {loopback.key: loopback}
+    recorder.audio_source = "系统声音 + 麦克风"
+    recorder.multitrack_audio = True
+    recorder.premix_track = True
+    recorder.system_volume = 80
+    recorder.mic_volume = 50
+    recorder.audio_format = 'wav'
+    recorder.temp_audio = str(tmp_path / "temp_audio.wav")
+    recorder.temp_vad = str(tmp_path / "temp.vad")
+    recorder.temp_sync = str(tmp_path / "temp_sync.pts")
+    recorder.pts_writer = PtsWriter(recorder.temp_sync, 30, 48000)
+    return recorder
+
+
+def _record(recorder, seconds=1.5):
+    recorder.session.arm()
+    thread = threading.Thread(target=recorder._record_audio)
+    thread.start()
+    time.sleep(seconds)
+    recorder.session.finish()
+    thread.join(timeout=10)
+    recorder.pts_writer.close()
+    assert not thread.is_alive()
+
+
+def test_multitrack_writes_one_file_per_source(recorder, tmp_path):
+    _record(recorder)
+    names = [name for name, _, _ in recorder.audio_tracks]
+    assert names == ["系统声音", "麦克风"]
+    assert [volume for _, _, volume in recorder.audio_tracks] == [0.8, 0.5]
+    assert [path for _, path, _ in recorder.audio_tracks] == [
+        str(tmp_path / "temp_audio_track0.wav"), str(tmp_path / "temp_audio_track1.wav")]
+    for name, path, _ in recorder.audio_tracks:
+        audio, samplerate = sf.read(path, always_2d=True)
+        assert samplerate == 48000 and audio.shape[1] == 2
+        assert len(audio) > 48000
+        # 分轨保存原始电平，每条音轨只有自己的音频源
+        other = FREQUENCIES["麦克风" if name == "系统声音" else "系统声音"]
+        assert _band_level(audio, samplerate, FREQUENCIES[name]) > 100 * _band_level(audio, samplerate, other)
+        assert np.abs(audio).max() == pytest.approx(0.2, abs=0.02)
+
+
+def test_single_track_mixes_sources_with_volume(recorder):
+    recorder.multitrack_audio = False
+    _record(recorder)
+    assert recorder.audio_tracks == []
+    audio, samplerate = sf.read(recorder.temp_audio, always_2d=True)
+    ratio = _band_level(audio, samplerate, 660) / _band_level(audio, samplerate, 440)
+    assert ratio == pytest.approx(0.8 / 0.5, rel=0.05)
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None, reason="需要 ffmpeg/ffprobe")
+def test_premix_track_comes_first_and_mixes_every_source(recorder, tmp_path):
+    _record(recorder)
+    recorder.temp_video = str(tmp_path / "temp_video.mkv")
+    run_ffmpeg(['-f', 'lavfi', '-i', 'testsrc=size=160x120:rate=30:duration=1.5',
+                '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', recorder.temp_video])
+    recorder.output_file = str(tmp_path / "output.mkv")
+    recorder._merge_audio_video()
+
+    titles = subprocess.run(['ffprobe', '-v', 'error', '-select_streams', 'a', '-show_entries',
+                             'stream_tags=title', '-of', 'csv=p=0', recorder.output_file],
+                            capture_output=True, text=True).stdout.split()
+    assert titles == ["混音", "系统声音", "麦克风"]
+    tracks = []
+    for index in range(3):
+        path = str(tmp_path / f"track{index}.wav")
+        run_ffmpeg(['-i', recorder.output_file, '-map', f'0:a:{index}', '-c:a', 'pcm_f32le', path])
+        tracks.append(sf.read(path, always_2d=True))
+    premix, samplerate = tracks[0]
+    # 混音轨包含两个音频源，音量只作用于混音轨
+    ratio = _band_level(premix, samplerate, 660) / _band_level(premix, samplerate, 440)
+    assert ratio == pytest.approx(0.8 / 0.5, rel=0.05)
+    for (audio, rate), name in zip(tracks[1:], ["系统声音", "麦克风"]):
+        other = FREQUENCIES["麦克风" if name == "系统声音" else "系统声音"]
+        assert _band_level(audio, rate, FREQUENCIES[name]) > 100 * _band_level(audio, rate, other)
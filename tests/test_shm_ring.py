@@ -0,0 +1,55 @@
+import multiprocessing
+
+import numpy as np
+
+from core.shm_ring import SharedFrameRing
+
+
+def _produce(ring, count):
+    # 子进程：每帧整幅填上帧序号，直接写进槽位
+    for i in range(count):
+        index = ring.acquire(timeout=10)
+        ring.frame(index)[:] = i % 256
+        ring.publish(index, i)
+    ring.publish(None, None)
+
+
+def test_frames_cross_process_without_copy():
+    context = multiprocessing.get_context('spawn')
+    ring = SharedFrameRing((90, 160, 3), 4, context=context)
+    process = context.Process(target=_produce, args=(ring, 40))
+    process.start()
+    try:
+        received = []
+        while True:
+            index, info = ring.receive(timeout=30)
+            if index is None:
+                break
+            # 槽位在释放之前不会被生产者覆盖
+            assert (ring.frame(index) == info % 256).all()
+            received.append(info)
+            ring.release(index)
+        assert received == list(range(40))
+    finally:
+        process.join(timeout=30)
+        ring.close()
+
+
+def test_slot_returns_to_free_queue_after_last_release():
+    ring = SharedFrameRing((4, 4, 3), 2)
+    try:
+        first = ring.acquire(timeout=1)
+        second = ring.acquire(timeout=1)
+        assert ring.acquire(timeout=0.05) is None
+        ring.publish(first, 'a')
+        index, info = ring.receive(timeout=1)
+        assert (index, info) == (first, 'a')
+        # 编码器另外占用一次引用，两次都释放后槽位才空闲
+        ring.retain(index)
+        ring.release(index)
+        assert ring.acquire(timeout=0.05) is None
+        ring.release(index)
+        assert ring.acquire(timeout=1) == first
+        assert second is not None
+    finally:
+        ring.close()
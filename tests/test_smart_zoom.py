@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+
+from core.smart_zoom import SmartZoom
+
+SOURCE = (3840, 2160)
+
+
+def _zoomed(**kwargs):
+    # 放大 2 倍并等过渡完成
+    zoom = SmartZoom(levels=(1.0, 2.0), click_zoom=False, **kwargs)
+    zoom.cycle()
+    for i in range(60):
+        zoom.update((SOURCE[0] / 2, SOURCE[1] / 2), False, SOURCE, now=i / 30)
+    return zoom
+
+
+def test_no_zoom_returns_none():
+    zoom = SmartZoom(levels=(1.0, 2.0), click_zoom=False)
+    assert zoom.update((100, 100), False, SOURCE, now=0.0) is None
+
+
+def test_zoomed_viewport_keeps_aspect_ratio_and_stays_inside():
+    zoom = _zoomed()
+    for i in range(30):
+        cursor = (SOURCE[0] * i / 30, SOURCE[1] * i / 30)
+        x, y, width, height = zoom.update(cursor, False, SOURCE, now=2.0 + i / 30)
+        assert (width, height) == (1920, 1080)
+        assert 0 <= x <= SOURCE[0] - width and 0 <= y <= SOURCE[1] - height
+        assert x % 2 == 0 and y % 2 == 0
+
+
+def test_viewport_does_not_move_while_cursor_in_middle():
+    zoom = _zoomed()
+    first = zoom.update((1920, 1080), False, SOURCE, now=2.0)
+    assert zoom.update((1990, 1100), False, SOURCE, now=2.1) == first
+
+
+def test_viewport_reaches_corners():
+    zoom = _zoomed()
+    for i in range(120):
+        crop = zoom.update((0, 0), False, SOURCE, now=2.0 + i / 30)
+    assert crop[:2] == (0, 0)
+    for i in range(120):
+        crop = zoom.update(SOURCE, False, SOURCE, now=6.0 + i / 30)
+    assert crop[:2] == (SOURCE[0] - crop[2], SOURCE[1] - crop[3])
+
+
+def test_click_zoom_holds_then_returns():
+    zoom = SmartZoom(levels=(1.0, 2.0), hold_seconds=1.0)
+    zoom.update((100, 100), True, SOURCE, now=0.0)
+    assert zoom.update((100, 100), False, SOURCE, now=0.9) is not None
+    for i in range(60):
+        crop = zoom.update((100, 100), False, SOURCE, now=1.0 + i / 30)
+    assert crop is None
+
+
+def test_cropped_conversion_matches_full_frame_region():
+    # 先裁出视口再转换缩放，等同于整幅转换后取对应区域再缩放
+    frame = np.random.default_rng(0).integers(0, 256, (SOURCE[1], SOURCE[0], 4), dtype=np.uint8)
+    x, y, width, height = _zoomed().update((3000, 1800), False, SOURCE, now=2.0)
+    cropped = cv2.resize(cv2.cvtColor(frame[y:y + height, x:x + width], cv2.COLOR_BGRA2BGR), (1920, 1080))
+    full = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)[y:y + height, x:x + width]
+    assert np.array_equal(cropped, cv2.resize(full, (1920, 1080)))
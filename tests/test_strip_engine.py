@@ -0,0 +1,60 @@
+import cv2
+import numpy as np
+import pytest
+
+from core.strip_engine import StripEngine
+
+
+@pytest.fixture
+def engine():
+    engine = StripEngine(4)
+    yield engine
+    engine.close()
+
+
+@pytest.mark.parametrize("shape,frame_size", [
+    ((1080, 1920, 4), (960, 540)),     # 缩小
+    ((270, 480, 4), (960, 540)),       # 放大
+    ((540, 960, 4), (960, 540)),       # 原始尺寸只转换颜色
+])
+@pytest.mark.parametrize("strips", [2, 3, 4])
+def test_strips_match_whole_frame(engine, shape, frame_size, strips):
+    # 各条带按整幅画面的同一个映射采样，条带之间没有接缝
+    frame = np.random.default_rng(1).integers(0, 256, shape, dtype=np.uint8)
+    reference = engine.convert_resize(frame, frame_size, strips=1)
+    out = engine.convert_resize(frame, frame_size, strips=strips)
+    assert out.shape == reference.shape
+    assert np.abs(out.astype(int) - reference.astype(int)).max() <= 1
+
+
+def test_run_covers_every_row_once(engine):
+    rows = np.zeros(1000, dtype=int)
+
+    def strip(y0, y1):
+        rows[y0:y1] += 1
+    engine.run(len(rows), strip, strips=4)
+    assert (rows == 1).all()
+
+
+def test_add_weighted_matches_opencv(engine):
+    rng = np.random.default_rng(2)
+    first = rng.integers(0, 256, (540, 960, 3), dtype=np.uint8)
+    second = rng.integers(0, 256, (540, 960, 3), dtype=np.uint8)
+    dst = np.empty_like(first)
+    engine.add_weighted(first, 0.7, second, 0.3, 0, dst=dst, strips=4)
+    assert np.array_equal(dst, cv2.addWeighted(first, 0.7, second, 0.3, 0))
+
+
+def test_calibrate_picks_a_valid_strip_count(engine):
+    strips = engine.calibrate((540, 960, 4), (480, 270), repeat=1)
+    assert 1 <= strips <= engine.workers
+    # 同一组参数只测一次
+    assert engine.calibrate((540, 960, 4), (480, 270), repeat=1) == strips
+
+
+def test_single_worker_has_no_pool():
+    engine = StripEngine(1)
+    frame = np.random.default_rng(3).integers(0, 256, (90, 160, 4), dtype=np.uint8)
+    out = engine.convert_resize(frame, (80, 45), strips=4)
+    assert np.array_equal(out, cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR), (80, 45)))
+    engine.close()
@@ -0,0 +1,86 @@
+import numpy as np
+import soundfile as sf
+
+from core.sync import EVENT_PAUSE, EVENT_RESUME, STREAM_AUDIO, STREAM_VIDEO, PtsWriter, align_audio
+
+
+def test_align_audio_with_start_offset_and_pause(tmp_path):
+    # 音频比视频晚开始、中间有暂停，对齐后每个音频块都落在成片中的正确位置
+    samplerate, fps = 48000, 30
+    pts_path = str(tmp_path / "sync.pts")
+    audio_path = str(tmp_path / "audio.wav")
+    output_path = str(tmp_path / "aligned.flac")
+
+    block = 4800  # 100ms
+    audio_start = 0.25     # 音频比视频晚 250ms 开始
+    pause = (2.0, 3.5)     # 第 2 秒暂停 1.5 秒
+    duration = 5.0
+    video_frames = int((duration - (pause[1] - pause[0])) * fps)
+
+    writer = PtsWriter(pts_path, fps, samplerate)
+    for frame in range(video_frames):
+        writer.write(STREAM_VIDEO, frame * 1e9 / fps, frame)
+    writer.write(EVENT_PAUSE, pause[0] * 1e9)
+    writer.write(EVENT_RESUME, pause[1] * 1e9)
+
+    # 每个写入文件的块用块序号填充，暂停期间的块不写入
+    blocks = []
+    t = audio_start
+    while t < duration:
+        if not pause[0] <= t < pause[1]:
+            writer.write(STREAM_AUDIO, t * 1e9, block)
+            blocks.append(t)
+        t += block / samplerate
+    writer.close()
+    data = np.repeat(np.arange(1, len(blocks) + 1, dtype=np.float32) / 256, block)
+    sf.write(audio_path, np.stack([data, data], axis=1), samplerate, subtype='FLOAT')
+
+    assert align_audio(pts_path, audio_path, output_path) == output_path
+    aligned, _ = sf.read(output_path, dtype='float32')
+    assert len(aligned) == int(round(video_frames / fps * samplerate))
+    assert not aligned[:int(audio_start * samplerate)].any()
+    for index, t in enumerate(blocks):
+        media = t if t < pause[0] else t - (pause[1] - pause[0])
+        # 跨过暂停起点的块只有前半段在成片中，取每块的前四分之一处检查
+        position = int(round(media * samplerate)) + block // 4
+        if position < len(aligned):
+            assert abs(aligned[position, 0] - (index + 1) / 256) < 1e-3, (index, t)
+
+
+def test_block_straddling_pause_is_cut_at_pause_boundary(tmp_path):
+    # 每个样本的值等于它的会话时间 / 10，对齐后成片中的每个位置都应该是暂停前后相接的时间
+    samplerate, fps = 48000, 30
+    pts_path = str(tmp_path / "sync.pts")
+    audio_path = str(tmp_path / "audio.wav")
+    output_path = str(tmp_path / "aligned.flac")
+
+    block = 4800
+    pause = (2.0, 3.5)
+    duration = 5.0
+    video_frames = int((duration - (pause[1] - pause[0])) * fps)
+
+    writer = PtsWriter(pts_path, fps, samplerate)
+    for frame in range(video_frames):
+        writer.write(STREAM_VIDEO, frame * 1e9 / fps, frame)
+    writer.write(EVENT_PAUSE, pause[0] * 1e9)
+    writer.write(EVENT_RESUME, pause[1] * 1e9)
+
+    # 1.95s 开始的块跨过暂停起点，后半段是暂停期间的声音；3.45s 开始的块跨过恢复点
+    starts = [0.05 + 0.1 * i for i in range(20)] + [3.45 + 0.1 * i for i in range(16)]
+    parts = []
+    for start in starts:
+        writer.write(STREAM_AUDIO, round(start * 1e9), block)
+        parts.append((start + np.arange(block) / samplerate) / 10)
+    writer.close()
+    data = np.concatenate(parts).astype(np.float32)
+    sf.write(audio_path, np.stack([data, data], axis=1), samplerate, subtype='FLOAT')
+
+    align_audio(pts_path, audio_path, output_path)
+    aligned, _ = sf.read(output_path, dtype='float32')
+    boundary = int(pause[0] * samplerate)
+    media = np.arange(int(0.05 * samplerate), len(aligned)) / samplerate
+    session = np.where(media < pause[0], media, media + pause[1] - pause[0])
+    np.testing.assert_allclose(aligned[int(0.05 * samplerate):, 0], session / 10, atol=1e-4)
+    # 暂停起点前后的两个样本分别来自暂停前和恢复后
+    assert abs(aligned[boundary - 1, 0] - (pause[0] - 1 / samplerate) / 10) < 1e-4
+    assert abs(aligned[boundary, 0] - pause[1] / 10) < 1e-4
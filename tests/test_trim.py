@@ -0,0 +1,43 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from core.trim import _run, load_activity, probe_duration, trim_video
+from core.vad import VadWriter, vad_path
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None,
+                                reason="需要 ffmpeg/ffprobe")
+
+
+@pytest.fixture
+def source(tmp_path):
+    # 20 秒测试视频：5-9 秒和 13-16 秒有声音，每秒一个关键帧
+    path = str(tmp_path / "source.mp4")
+    _run(['ffmpeg', '-y', '-v', 'error',
+          '-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=30:duration=20',
+          '-f', 'lavfi', '-i', "aevalsrc='0.3*sin(2*PI*440*t)*(between(t,5,9)+between(t,13,16))':s=48000:d=20",
+          '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '30', '-c:a', 'aac', path])
+    writer = VadWriter(vad_path(path), 0.1)
+    for i in range(200):
+        t = i * 0.1
+        writer.add(t, -13.5 if 5 <= t < 9 or 13 <= t < 16 else -90.0)
+    writer.close()
+    return path
+
+
+def test_trim_edges_and_pauses(source, tmp_path):
+    edges = str(tmp_path / "edges.mp4")
+    pauses = str(tmp_path / "pauses.mp4")
+    assert trim_video(source, edges, 'edges') in ('copy', 'reencode')
+    assert trim_video(source, pauses, 'pauses') in ('copy', 'reencode')
+    # 保留 4.7-16.3 秒，对齐关键帧时最多外扩到相邻的关键帧
+    assert 11.5 <= probe_duration(edges) <= 13.5
+    # 再缩短 9-13 秒之间的长停顿
+    assert 7.0 <= probe_duration(pauses) < probe_duration(edges)
+
+
+def test_activity_from_audio_track_without_index(source):
+    os.remove(vad_path(source))
+    assert np.allclose(load_activity(source), [(5.0, 9.0), (13.0, 16.0)], atol=0.2)
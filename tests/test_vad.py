@@ -0,0 +1,32 @@
+import numpy as np
+
+from core.vad import detect_activity, plan_trim
+
+
+def _levels():
+    # 合成的电平序列：开头 3 秒静音，两段讲话之间停顿 6 秒，结尾 4 秒静音
+    block = 0.1
+    times = np.arange(0, 30, block)
+    levels = np.full(len(times), -70.0)
+    levels[(times >= 3) & (times < 10)] = -25.0
+    levels[(times >= 16) & (times < 26)] = -20.0
+    levels[(times >= 5) & (times < 5.2)] = -70.0    # 字词之间的短停顿
+    return times, levels, block
+
+
+def test_short_gaps_do_not_split_speech():
+    times, levels, block = _levels()
+    segments = detect_activity(times, levels, block)
+    assert len(segments) == 2
+    assert np.allclose(segments, [(3.0, 10.0), (16.0, 26.0)], atol=block)
+
+
+def test_plan_trim_edges_and_pauses():
+    times, levels, block = _levels()
+    segments = detect_activity(times, levels, block)
+    assert np.allclose(plan_trim(segments, 30.0, 'edges'), [(2.7, 26.3)])
+    assert np.allclose(plan_trim(segments, 30.0, 'pauses'), [(2.7, 11.0), (15.0, 26.3)])
+
+
+def test_plan_trim_without_speech():
+    assert plan_trim([], 30.0, 'edges') == []
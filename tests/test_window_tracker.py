@@ -0,0 +1,26 @@
+from core.window_tracker import ScriptedBackend, WindowTracker
+
+
+def test_tracker_follows_move_resize_and_close():
+    # 用脚本模拟窗口移动、最小化、改变大小和关闭
+    backend = ScriptedBackend([
+        (0.0, (100, 100, 800, 600)),
+        (0.3, (400, 250, 800, 600)),
+        (0.6, 'minimized'),
+        (0.9, (1500, 700, 800, 600)),
+        (1.2, (1500, 700, 1000, 700)),
+        (1.5, None),
+    ])
+    changes = []
+    tracker = WindowTracker(backend, 1, (100, 100, 800, 600), bounds=(0, 0, 1920, 1080),
+                            interval=0.05, on_change=changes.append)
+    tracker.start()
+    tracker.join(timeout=5)
+    assert tracker.closed
+    # 最小化期间保持上一次的位置，超出桌面的部分推回桌面以内
+    assert changes == [
+        (400, 250, 800, 600),
+        (1120, 480, 800, 600),
+        (920, 380, 1000, 700),
+    ]
+    assert tracker.state == (3, (920, 380, 1000, 700))
@@ -3,11 +3,19 @@ from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout,
                               QSpinBox, QCheckBox, QMessageBox, QSystemTrayIcon, QMenu, QStyle,
                               QFileDialog, QListWidget, QHBoxLayout, QLineEdit, QToolButton,
                               QKeySequenceEdit, QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView,
-                              QInputDialog, QDialog, QApplication, QStyleFactory, QScrollArea, QSlider)
+                              QInputDialog, QDialog, QApplication, QStyleFactory, QScrollArea, QSlider,
+                              QProgressBar)
 from PySide6.QtCore import Qt, QTimer, QThread, QEvent, QMetaObject
 from PySide6.QtGui import QIcon, QKeySequence, QShortcut, QAction
 from core.screen_recorder import ScreenRecorder
 from core.settings import Settings
+from core.denoiser import NoiseProfile, load_audio_span
+from core.vad import vad_path
+from core.trim import trim_video
+from core.encoder import VfrEncoder
+from core.output_branch import OutputBranch
+from core.privacy import PrivacyRegion
+from core.window_tracker import default_backend
 from ui.region_selector import RegionSelector
 from ui.camera_window import CameraWindow
 from ui.window_selector import WindowSelector
@@ -17,6 +25,7 @@ from ui.mouse_settings import MouseSettings
 from ui.countdown_window import CountdownWindow
 import os
 import subprocess
+import time
 import mss
 from moviepy import VideoFileClip
 from datetime import datetime
@@ -85,6 +94,11 @@ class MainWindow(QMainWindow):
         # 立即加载必要组件
         self.settings = Settings()
         self.recorder = ScreenRecorder()
+        self.recorder.session.state_changed.connect(self._on_recording_state_changed)
+        self.recorder.audio_levels.connect(self._on_audio_levels)
+        self.recorder.audio_warning.connect(self._on_audio_warning)
+        self.audio_warnings = {}
+        self._last_tray_levels = 0.0
         self.countdown_timer = QTimer()
         self.countdown_timer.timeout.connect(self._countdown_tick)
         self.countdown_remaining = 0
@@ -562,6 +576,8 @@ class MainWindow(QMainWindow):
             self.settings.set_shortcut_stop(self.shortcut_stop.keySequence().toString())
         elif shortcut_type == 'drawing':
             self.settings.set_shortcut_drawing(self.shortcut_drawing.keySequence().toString())
+        elif shortcut_type == 'zoom':
+            self.settings.set_shortcut_zoom(self.shortcut_zoom.keySequence().toString())
         
         self._update_shortcuts()
         
@@ -577,25 +593,29 @@ class MainWindow(QMainWindow):
         pause_sequence = QKeySequence(self.settings.get_shortcut_pause())
         stop_sequence = QKeySequence(self.settings.get_shortcut_stop())
         drawing_sequence = QKeySequence(self.settings.get_shortcut_drawing())
+        zoom_sequence = QKeySequence(self.settings.get_shortcut_zoom())
         
         # 创建快捷键
         start_shortcut = QShortcut(start_sequence, self)
         pause_shortcut = QShortcut(pause_sequence, self)
         stop_shortcut = QShortcut(stop_sequence, self)
         drawing_shortcut = QShortcut(drawing_sequence, self)
+        zoom_shortcut = QShortcut(zoom_sequence, self)
         
         # 连接信号
         start_shortcut.activated.connect(self.start_recording)
         pause_shortcut.activated.connect(self.pause_recording)
         stop_shortcut.activated.connect(self.stop_recording)
         drawing_shortcut.activated.connect(self._toggle_drawing_window)
+        zoom_shortcut.activated.connect(self.recorder.cycle_zoom)
         
         # 保存快捷键引用
         self.shortcuts.extend([
             start_shortcut,
             pause_shortcut,
             stop_shortcut,
-            drawing_shortcut
+            drawing_shortcut,
+            zoom_shortcut
         ])
 
     def _trigger_start_recording(self):
@@ -669,6 +689,13 @@ class MainWindow(QMainWindow):
         # 获取倒计时设置
         countdown = self.settings.get_countdown()
         if countdown > 0:
+            # 倒计时期间采集环境噪声，用于频谱降噪
+            self.recorder.mic_device = self.mic_device_select.currentData() or ""
+            if (self.noise_reduction_enabled.isChecked() and
+                    self.noise_reduction_mode.currentData() == "spectral" and
+                    self.audio_source.currentText() in ["系统声音 + 麦克风", "仅麦克风声音"]):
+                self.recorder.start_noise_sampling()
+                
             self.countdown_remaining = countdown
             self.start_button.setEnabled(False)
             self.countdown_timer.start(1000)
@@ -709,7 +736,9 @@ class MainWindow(QMainWindow):
         if recording_type == "全屏录制":
             # 获取选中的显示器
             monitor = self.monitor_select.currentData()
-            if monitor:
+            if monitor and 'all' in monitor:
+                self._start_recording_now(None, all_monitors=monitor['all'])
+            elif monitor:
                 region = {
                     'top': monitor['top'],
                     'left': monitor['left'],
@@ -730,8 +759,10 @@ class MainWindow(QMainWindow):
                         'width': window_info.width,
                         'height': window_info.height
                     }
-                    self._start_recording_now(region)
+                    # 录制过程中采集区域跟随窗口移动
+                    self._start_recording_now(region, fit_region=True, window=window_info.handle)
                 else:
+                    self.recorder.stop_noise_sampling()
                     self.show()
                 
             self.window_selector = WindowSelector(on_window_selected)
@@ -748,15 +779,16 @@ class MainWindow(QMainWindow):
                         'width': rect.width(),
                         'height': rect.height()
                     }
-                    self._start_recording_now(region)
+                    self._start_recording_now(region, fit_region=True)
                 else:
+                    self.recorder.stop_noise_sampling()
                     self.show()
                 
             self.region_selector = RegionSelector(on_region_selected)
         else:
             self._start_recording_now(None)
             
-    def _start_recording_now(self, region=None):
+    def _start_recording_now(self, region=None, fit_region=False, window=None, all_monitors=None):
         # 生成输出文件路径
         output_file = os.path.join(
             self.settings.get_video_path(),
@@ -767,15 +799,50 @@ class MainWindow(QMainWindow):
         self.recorder.fps = int(self.fps.currentText())
         resolution = self.resolution.currentText().split('x')
         self.recorder.frame_size = (int(resolution[0]), int(resolution[1]))
+        # 全屏按所选分辨率输出；区域和窗口保持宽高比，不放大
+        if fit_region:
+            self.recorder.layout_mode = self.region_output.currentData()
+            self.recorder.layout_upscale = False
+        else:
+            self.recorder.layout_mode = 'letterbox'
+            self.recorder.layout_upscale = True
+        self.recorder.follow_window = window
+        self.recorder.all_monitors = all_monitors
         
         # 设置音频参数
         self.recorder.audio_source = self.audio_source.currentText()
         self.recorder.system_volume = self.system_volume.value()
         self.recorder.mic_volume = self.mic_volume.value()
+        self.recorder.audio_format = self.settings.get_audio_format()
+        self.recorder.multitrack_audio = self.settings.get_multitrack_audio()
+        self.recorder.system_device = self.system_device_select.currentData() or ""
+        self.recorder.mic_device = self.mic_device_select.currentData() or ""
+        self.recorder.premix_track = self.settings.get_premix_track()
+        self.recorder.adaptive_quality = self.settings.get_adaptive_quality()
+        self.recorder.variable_frame_rate = self.variable_frame_rate.isChecked()
+        self.recorder.vfr_max_interval = self.vfr_max_interval.value()
+        self.recorder.multiprocess_capture = self.multiprocess_capture.isChecked()
+        self.recorder.strip_parallel = self.strip_parallel.isChecked()
+        self.recorder.i420_pipeline = self.i420_pipeline.isChecked()
+        # 720p 代理文件与主文件共用同一份采集画面
+        self.recorder.output_branches = []
+        if self.proxy_output.isChecked():
+            self.recorder.output_branches.append(OutputBranch('proxy', (1280, 720), crf=28))
+        self.recorder.smart_zoom = {'levels': (1.0, 2.0)} if self.smart_zoom.isChecked() else None
+        self.recorder.privacy_regions = self._privacy_regions()
         
         # 设置降噪参数
         self.recorder.noise_reduction_enabled = self.noise_reduction_enabled.isChecked()
         self.recorder.noise_reduction_strength = self.noise_reduction_strength.value() / 100.0
+        self.recorder.noise_reduction_mode = self.noise_reduction_mode.currentData()
+        
+        # 优先使用倒计时期间采集的噪声样本，否则使用上次保存的样本
+        noise_profile = self.recorder.stop_noise_sampling()
+        if noise_profile is not None:
+            self.settings.set_noise_profile(noise_profile.to_list())
+        else:
+            noise_profile = NoiseProfile.from_list(self.settings.get_noise_profile())
+        self.recorder.noise_profile = noise_profile
         
         # 开始录制
         self.recorder.start_recording(region=region, output_file=output_file)
@@ -806,10 +873,12 @@ class MainWindow(QMainWindow):
             
         if self.recorder.paused:
             self.recorder.resume_recording()
-            self.pause_button.setText("暂停")
         else:
             self.recorder.pause_recording()
-            self.pause_button.setText("继续")
+            
+    def _on_recording_state_changed(self, state, timestamp):
+        # 按钮文字跟随录制状态机，快捷键和按钮触发的切换都会同步
+        self.pause_button.setText("继续" if state == "paused" else "暂停")
             
     def stop_recording(self):
         print("快捷键触发：停止录制")  # 调试信息
@@ -841,6 +910,7 @@ class MainWindow(QMainWindow):
         self.pause_button.setEnabled(False)
         self.stop_button.setEnabled(False)
         self.pause_button.setText("暂停")
+        self._reset_audio_levels()
         
         # 如果窗口被隐藏，则显示
         if not self.isVisible():
@@ -962,7 +1032,10 @@ class MainWindow(QMainWindow):
                 ("播放", self._play_video),
                 ("重命名", self._rename_video),
                 ("删除", self._delete_video),
-                ("定位", self._locate_video)
+                ("定位", self._locate_video),
+                ("学习噪声", self._learn_noise_from_video),
+                ("裁剪首尾静音", lambda p: self._trim_video(p, 'edges')),
+                ("剪掉长停顿", lambda p: self._trim_video(p, 'pauses'))
             ]:
                 action = menu.addAction(action_text)
                 action.triggered.connect(lambda checked, p=file_path, c=callback: c(p))
@@ -1061,6 +1134,9 @@ class MainWindow(QMainWindow):
             try:
                 new_path = os.path.join(os.path.dirname(file_path), new_name)
                 os.rename(file_path, new_path)
+                # 语音活动索引随视频一起改名
+                if os.path.exists(vad_path(file_path)):
+                    os.rename(vad_path(file_path), vad_path(new_path))
                 self._update_video_list()
             except Exception as e:
                 QMessageBox.warning(self, "重命名失败", str(e))
@@ -1076,10 +1152,56 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             try:
                 os.remove(file_path)
+                if os.path.exists(vad_path(file_path)):
+                    os.remove(vad_path(file_path))
                 self._update_video_list()
             except Exception as e:
                 QMessageBox.warning(self, "删除失败", str(e))
                 
+    def _learn_noise_from_video(self, file_path):
+        # 从录制文件中选取一段只有环境噪声的片段作为降噪样本
+        start, ok = QInputDialog.getDouble(
+            self, "学习噪声", "静音片段开始时间(秒):", 0.0, 0.0, 86400.0, 1)
+        if not ok:
+            return
+        end, ok = QInputDialog.getDouble(
+            self, "学习噪声", "静音片段结束时间(秒):", start + 2.0, start, 86400.0, 1)
+        if not ok:
+            return
+            
+        try:
+            audio = load_audio_span(file_path, start, end)
+            profile = NoiseProfile.from_audio(audio, 44100)
+            if profile is None:
+                QMessageBox.warning(self, "学习噪声", "选取的片段太短")
+                return
+            self.settings.set_noise_profile(profile.to_list())
+            QMessageBox.information(self, "学习噪声", "噪声样本已保存，之后的录制将使用该样本降噪")
+        except Exception as e:
+            QMessageBox.warning(self, "学习噪声失败", str(e))
+            
+    def _trim_video(self, file_path, mode):
+        # 按语音活动索引裁剪，结果另存为 "原文件名_trimmed"，不覆盖原视频
+        base, extension = os.path.splitext(file_path)
+        output_path = f"{base}_trimmed{extension}"
+        self.loading_overlay.show_with_text("正在裁剪静音...")
+        QApplication.processEvents()
+        try:
+            method = trim_video(file_path, output_path, mode)
+        except Exception as e:
+            self.loading_overlay.hide()
+            QMessageBox.warning(self, "裁剪失败", str(e))
+            return
+        self.loading_overlay.hide()
+        
+        if method is None:
+            QMessageBox.information(self, "裁剪静音", "没有需要裁剪的静音片段")
+            return
+        note = "直接复制码流" if method == 'copy' else "关键帧间隔过大，已重新编码"
+        QMessageBox.information(self, "裁剪静音",
+                                f"已保存为 {os.path.basename(output_path)}（{note}）")
+        self._update_video_list()
+            
     def _locate_video(self, file_path):
         # 打开文件所在文件夹并选中文件
         if os.name == 'nt':  # Windows
@@ -1111,7 +1233,10 @@ class MainWindow(QMainWindow):
         # 托盘图标双击显示窗口
         self.tray_icon.activated.connect(self._tray_icon_activated)
         
-        # 更新托盘提示信息，包含快捷键
+        self.tray_icon.setToolTip(self._tray_tooltip())
+        
+    def _tray_tooltip(self):
+        # 托盘提示信息，包含快捷键
         tooltip = "屏幕录制工具\n"
         if self.settings.get_shortcut_start():
             tooltip += f"开始录制: {self.settings.get_shortcut_start()}\n"
@@ -1119,8 +1244,45 @@ class MainWindow(QMainWindow):
             tooltip += f"暂停/继续: {self.settings.get_shortcut_pause()}\n"
         if self.settings.get_shortcut_stop():
             tooltip += f"停止录制: {self.settings.get_shortcut_stop()}"
+        return tooltip
+        
+    def _on_audio_levels(self, levels):
+        # 停止后才送达的排队信号不再显示
+        if not self.recorder.recording:
+            return
+        for name, (peak_db, rms_db) in levels.items():
+            bar = self.level_bars.get(name)
+            if bar is not None:
+                bar.setValue(int(max(rms_db, -60) + 60))
+                bar.setFormat(f"{rms_db:.0f} dB (峰值 {peak_db:.0f} dB)")
+        
+        # 托盘提示每秒更新一次
+        now = time.monotonic()
+        if now - self._last_tray_levels >= 1.0:
+            self._last_tray_levels = now
+            lines = [f"{name}: {rms_db:.0f} dB" for name, (_, rms_db) in levels.items()]
+            self.tray_icon.setToolTip("正在录制\n" + "\n".join(lines))
             
-        self.tray_icon.setToolTip(tooltip)
+    def _on_audio_warning(self, name, state):
+        messages = {
+            'silent': f"{name}没有声音，请检查设备或音量",
+            'clipped': f"{name}音量过大，出现削波失真",
+        }
+        if state in messages:
+            self.audio_warnings[name] = messages[state]
+            self.tray_icon.showMessage("音频警告", messages[state], QSystemTrayIcon.Warning, 3000)
+        else:
+            self.audio_warnings.pop(name, None)
+        self.audio_warning_label.setText("\n".join(self.audio_warnings.values()))
+        self.audio_warning_label.setVisible(bool(self.audio_warnings))
+        
+    def _reset_audio_levels(self):
+        for bar in self.level_bars.values():
+            bar.setValue(0)
+            bar.setFormat("-- dB")
+        self.audio_warnings = {}
+        self.audio_warning_label.hide()
+        self.tray_icon.setToolTip(self._tray_tooltip())
 
     def _on_tab_changed(self, index):
         # 当切换到文件标签页时，刷新文件列表
@@ -1181,6 +1343,45 @@ class MainWindow(QMainWindow):
         if dialog.exec_() == QDialog.Accepted:
             dialog.save_settings()
 
+    def _add_privacy_region(self):
+        # 框选一个需要打码的屏幕区域
+        self.hide()
+
+        def on_region_selected(rect):
+            if rect:
+                rects = self.settings.get_privacy_regions()
+                rects.append((rect.left(), rect.top(), rect.width(), rect.height()))
+                self.settings.set_privacy_regions(rects)
+                self._update_privacy_label()
+            self.show()
+
+        self.privacy_selector = RegionSelector(on_region_selected)
+
+    def _clear_privacy_regions(self):
+        self.settings.set_privacy_regions([])
+        self._update_privacy_label()
+
+    def _update_privacy_label(self):
+        count = len(self.settings.get_privacy_regions())
+        self.privacy_label.setText(f"打码区域: {count} 个" if count else "打码区域: 无")
+
+    def _privacy_regions(self):
+        # 跟随窗口时，区域换算为相对其中心点所在窗口左上角的坐标
+        style = self.privacy_style.currentData()
+        backend = default_backend() if self.privacy_follow_window.isChecked() else None
+        regions = []
+        for x, y, width, height in self.settings.get_privacy_regions():
+            handle = None
+            if backend is not None:
+                handle = backend.window_at(x + width // 2, y + height // 2)
+                geometry = backend.geometry(handle) if handle else None
+                if geometry is None:
+                    handle = None
+                else:
+                    x, y = x - geometry[0], y - geometry[1]
+            regions.append(PrivacyRegion((x, y, width, height), style, window=handle))
+        return regions
+
     def _update_recording_options(self):
         self.recording_type.clear()
         self.monitor_select.clear()
@@ -1193,6 +1394,10 @@ class MainWindow(QMainWindow):
             for i, monitor in enumerate(sct.monitors[1:], 1):  # 跳过第一个（全部显示器）
                 name = f"显示器 {i} ({monitor['width']}x{monitor['height']})"
                 self.monitor_select.addItem(name, monitor)
+            # 多个显示器时可以同时录制全部显示器
+            if len(sct.monitors) > 2:
+                self.monitor_select.addItem("所有显示器（拼接为一个画面）", {'all': 'stitched'})
+                self.monitor_select.addItem("所有显示器（每个显示器单独保存）", {'all': 'separate'})
                 
     def _on_recording_type_changed(self, index):
         recording_type = self.recording_type.currentText()
@@ -1246,6 +1451,22 @@ class MainWindow(QMainWindow):
         resolution_layout.addWidget(self.resolution)
         recording_layout.addLayout(resolution_layout)
         
+        # 区域和窗口录制的输出尺寸
+        region_output_layout = QHBoxLayout()
+        region_output_layout.addWidget(QLabel("区域/窗口输出:"))
+        self.region_output = QComboBox()
+        self.region_output.addItem("按区域比例（不放大）", "fit")
+        self.region_output.addItem("固定分辨率（加黑边）", "letterbox")
+        self.region_output.setToolTip(
+            "按区域比例：小区域按原始尺寸录制，大区域保持宽高比缩小到分辨率以内\n"
+            "固定分辨率：输出尺寸等于所选分辨率，画面保持宽高比居中，其余部分为黑边")
+        index = self.region_output.findData(self.settings.get_region_output())
+        self.region_output.setCurrentIndex(max(0, index))
+        self.region_output.currentIndexChanged.connect(
+            lambda: self.settings.set_region_output(self.region_output.currentData()))
+        region_output_layout.addWidget(self.region_output)
+        recording_layout.addLayout(region_output_layout)
+        
         fps_layout = QHBoxLayout()
         fps_layout.addWidget(QLabel("帧率:"))
         self.fps = QComboBox()
@@ -1274,6 +1495,31 @@ class MainWindow(QMainWindow):
         audio_layout.addWidget(QLabel("音频源:"))
         audio_layout.addWidget(self.audio_source)
         
+        # 设备选择，列表由后台枚举的设备注册表提供
+        system_device_layout = QHBoxLayout()
+        system_device_layout.addWidget(QLabel("系统声音设备:"))
+        self.system_device_select = QComboBox()
+        system_device_layout.addWidget(self.system_device_select, 1)
+        audio_layout.addLayout(system_device_layout)
+        
+        mic_device_layout = QHBoxLayout()
+        mic_device_layout.addWidget(QLabel("麦克风设备:"))
+        self.mic_device_select = QComboBox()
+        mic_device_layout.addWidget(self.mic_device_select, 1)
+        refresh_devices_btn = QToolButton()
+        refresh_devices_btn.setText("刷新")
+        refresh_devices_btn.setToolTip("重新检测音频设备（插拔设备后点击）")
+        refresh_devices_btn.clicked.connect(lambda: self.recorder.device_registry.refresh())
+        mic_device_layout.addWidget(refresh_devices_btn)
+        audio_layout.addLayout(mic_device_layout)
+        
+        self._update_audio_device_list()
+        self.recorder.device_registry.devices_changed.connect(self._update_audio_device_list)
+        self.system_device_select.activated.connect(
+            lambda: self.settings.set_system_audio_device(self.system_device_select.currentData()))
+        self.mic_device_select.activated.connect(
+            lambda: self.settings.set_mic_device(self.mic_device_select.currentData()))
+        
         # 音量控制
         volume_layout = QHBoxLayout()
         volume_layout.addWidget(QLabel("系统音量:"))
@@ -1299,6 +1545,18 @@ class MainWindow(QMainWindow):
         self.noise_reduction_enabled = QCheckBox("启用降噪")
         noise_reduction_layout.addWidget(self.noise_reduction_enabled)
         
+        # 降噪方式
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("降噪方式:"))
+        self.noise_reduction_mode = QComboBox()
+        self.noise_reduction_mode.addItem("频谱降噪", "spectral")
+        self.noise_reduction_mode.addItem("人声滤波", "voice")
+        self.noise_reduction_mode.setToolTip(
+            "频谱降噪会在倒计时期间采集环境噪声作为样本，\n"
+            "也可以在文件列表中选择一段静音学习噪声")
+        mode_layout.addWidget(self.noise_reduction_mode)
+        noise_reduction_layout.addLayout(mode_layout)
+        
         # 降噪强度
         strength_layout = QHBoxLayout()
         strength_layout.addWidget(QLabel("降噪强度:"))
@@ -1323,6 +1581,24 @@ class MainWindow(QMainWindow):
         audio_group.setLayout(audio_layout)
         return audio_group
 
+    def _update_audio_device_list(self):
+        registry = self.recorder.device_registry
+        for combo, auto_text, devices, saved in (
+                (self.system_device_select, "自动选择", registry.system_devices(),
+                 self.settings.get_system_audio_device()),
+                (self.mic_device_select, "系统默认", registry.input_devices(),
+                 self.settings.get_mic_device())):
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem(auto_text, "")
+            for device in devices:
+                combo.addItem(device.label, device.key)
+            # 保存的设备暂时拔出时仍保留选项，重新插入后自动恢复
+            if saved and combo.findData(saved) < 0:
+                combo.addItem(f"{saved.split(':', 1)[-1]} (未连接)", saved)
+            combo.setCurrentIndex(max(combo.findData(saved), 0))
+            combo.blockSignals(False)
+            
     def _create_camera_group(self):
         camera_group = QGroupBox("摄像头设置")
         camera_layout = QVBoxLayout()
@@ -1418,6 +1694,24 @@ class MainWindow(QMainWindow):
         control_layout.addWidget(self.pause_button)
         control_layout.addWidget(self.stop_button)
         
+        # 音频电平（RMS，-60dB 到 0dB）
+        self.level_bars = {}
+        for name in ("系统声音", "麦克风"):
+            level_layout = QHBoxLayout()
+            level_layout.addWidget(QLabel(f"{name}:"))
+            bar = QProgressBar()
+            bar.setRange(0, 60)
+            bar.setValue(0)
+            bar.setFormat("-- dB")
+            level_layout.addWidget(bar)
+            control_layout.addLayout(level_layout)
+            self.level_bars[name] = bar
+        self.audio_warning_label = QLabel()
+        self.audio_warning_label.setStyleSheet("color: #d9534f;")
+        self.audio_warning_label.setWordWrap(True)
+        self.audio_warning_label.hide()
+        control_layout.addWidget(self.audio_warning_label)
+        
         # 连接按钮信号
         self.start_button.clicked.connect(self.start_recording)
         self.pause_button.clicked.connect(self.pause_recording)
@@ -1491,6 +1785,13 @@ class MainWindow(QMainWindow):
         drawing_layout.addWidget(self.shortcut_drawing)
         shortcut_layout.addLayout(drawing_layout)
         
+        # 自动放大倍数切换快捷键
+        zoom_layout = QHBoxLayout()
+        zoom_layout.addWidget(QLabel("放大/还原:"))
+        self.shortcut_zoom = QKeySequenceEdit(self.settings.get_shortcut_zoom())
+        zoom_layout.addWidget(self.shortcut_zoom)
+        shortcut_layout.addLayout(zoom_layout)
+        
         # 连接快捷键变更事件
         self.shortcut_start.editingFinished.connect(
             lambda: self._update_shortcut('start'))
@@ -1500,6 +1801,8 @@ class MainWindow(QMainWindow):
             lambda: self._update_shortcut('stop'))
         self.shortcut_drawing.editingFinished.connect(
             lambda: self._update_shortcut('drawing'))
+        self.shortcut_zoom.editingFinished.connect(
+            lambda: self._update_shortcut('zoom'))
             
         shortcut_group.setLayout(shortcut_layout)
         return shortcut_group
@@ -1523,6 +1826,109 @@ class MainWindow(QMainWindow):
         output_layout.addWidget(QLabel("保存目录:"))
         output_layout.addLayout(path_layout)
         
+        # 录制过程中的音频中间格式
+        audio_format_layout = QHBoxLayout()
+        audio_format_layout.addWidget(QLabel("音频中间格式:"))
+        self.audio_format = QComboBox()
+        self.audio_format.addItem("FLAC (无损压缩)", "flac")
+        self.audio_format.addItem("Opus (有损，体积最小)", "opus")
+        self.audio_format.addItem("WAV (不压缩)", "wav")
+        index = self.audio_format.findData(self.settings.get_audio_format())
+        self.audio_format.setCurrentIndex(max(index, 0))
+        self.audio_format.currentIndexChanged.connect(
+            lambda: self.settings.set_audio_format(self.audio_format.currentData()))
+        audio_format_layout.addWidget(self.audio_format)
+        output_layout.addLayout(audio_format_layout)
+        
+        # 分轨录制
+        self.multitrack_audio = QCheckBox("系统声音和麦克风分轨保存")
+        self.multitrack_audio.setToolTip(
+            "每个音频源保存为独立音轨（原始电平），便于后期单独调整，\n"
+            "降噪只作用于麦克风音轨")
+        self.multitrack_audio.setChecked(self.settings.get_multitrack_audio())
+        self.premix_track = QCheckBox("额外生成混音轨（作为第一条音轨）")
+        self.premix_track.setToolTip("兼容只播放第一条音轨的播放器，混音按音量设置生成")
+        self.premix_track.setChecked(self.settings.get_premix_track())
+        self.premix_track.setEnabled(self.multitrack_audio.isChecked())
+        self.multitrack_audio.toggled.connect(self.settings.set_multitrack_audio)
+        self.multitrack_audio.toggled.connect(self.premix_track.setEnabled)
+        self.premix_track.toggled.connect(self.settings.set_premix_track)
+        output_layout.addWidget(self.multitrack_audio)
+        output_layout.addWidget(self.premix_track)
+        
+        # 自适应画质
+        self.adaptive_quality = QCheckBox("编码跟不上时自动降低画质")
+        self.adaptive_quality.setToolTip(
+            "依次提高压缩率、降低帧率、降低分辨率，负载下降后自动恢复，\n"
+            "每次调整都会记录在日志中")
+        self.adaptive_quality.setChecked(self.settings.get_adaptive_quality())
+        self.adaptive_quality.toggled.connect(self.settings.set_adaptive_quality)
+        output_layout.addWidget(self.adaptive_quality)
+        
+        # 可变帧率
+        vfr_layout = QHBoxLayout()
+        self.variable_frame_rate = QCheckBox("画面不变时不重复编码（可变帧率）")
+        self.vfr_max_interval = QSpinBox()
+        self.vfr_max_interval.setRange(1, 10)
+        self.vfr_max_interval.setSuffix(" 秒")
+        self.vfr_max_interval.setToolTip("画面静止时两帧之间的最长间隔，间隔越短拖动定位越精确")
+        self.vfr_max_interval.setValue(self.settings.get_vfr_max_interval())
+        if VfrEncoder.available():
+            self.variable_frame_rate.setToolTip("适合幻灯片等静止画面较多的录制，可以大幅降低 CPU 占用和文件体积")
+            self.variable_frame_rate.setChecked(self.settings.get_variable_frame_rate())
+        else:
+            self.variable_frame_rate.setToolTip("需要安装 PyAV：pip install av")
+            self.variable_frame_rate.setEnabled(False)
+        self.vfr_max_interval.setEnabled(self.variable_frame_rate.isChecked())
+        self.variable_frame_rate.toggled.connect(self.settings.set_variable_frame_rate)
+        self.variable_frame_rate.toggled.connect(self.vfr_max_interval.setEnabled)
+        self.vfr_max_interval.valueChanged.connect(self.settings.set_vfr_max_interval)
+        vfr_layout.addWidget(self.variable_frame_rate)
+        vfr_layout.addWidget(QLabel("最长间隔:"))
+        vfr_layout.addWidget(self.vfr_max_interval)
+        output_layout.addLayout(vfr_layout)
+        
+        # 独立进程
+        self.multiprocess_capture = QCheckBox("采集和音频处理使用独立进程")
+        self.multiprocess_capture.setToolTip(
+            "截图、水印和鼠标效果以及降噪在各自的进程中运行，不和界面争抢 CPU，\n"
+            "画面通过共享内存传递；高分辨率、高帧率录制时更流畅")
+        self.multiprocess_capture.setChecked(self.settings.get_multiprocess_capture())
+        self.multiprocess_capture.toggled.connect(self.settings.set_multiprocess_capture)
+        output_layout.addWidget(self.multiprocess_capture)
+        
+        self.strip_parallel = QCheckBox("多线程转换和缩放画面")
+        self.strip_parallel.setToolTip(
+            "把整幅画面分成水平条带交给多个线程处理，适合 4K 等高分辨率屏幕；\n"
+            "开始录制时自动测试并选择条带数，单核或没有提升时不分条带")
+        self.strip_parallel.setChecked(self.settings.get_strip_parallel())
+        self.strip_parallel.toggled.connect(self.settings.set_strip_parallel)
+        output_layout.addWidget(self.strip_parallel)
+        
+        self.i420_pipeline = QCheckBox("合成后直接转换为 YUV420 格式")
+        self.i420_pipeline.setToolTip(
+            "画面合成后立即转换为编码器使用的 YUV420 格式，\n"
+            "缓冲区、共享内存和编码管道中传递的数据量减半")
+        self.i420_pipeline.setChecked(self.settings.get_i420_pipeline())
+        self.i420_pipeline.toggled.connect(self.settings.set_i420_pipeline)
+        output_layout.addWidget(self.i420_pipeline)
+        
+        self.proxy_output = QCheckBox("同时输出 720p 代理文件")
+        self.proxy_output.setToolTip(
+            "同一份采集画面再编码一个 720p 的文件（文件名加 _proxy），\n"
+            "不需要重复截图，与主文件共用同一条音轨")
+        self.proxy_output.setChecked(self.settings.get_proxy_output())
+        self.proxy_output.toggled.connect(self.settings.set_proxy_output)
+        output_layout.addWidget(self.proxy_output)
+        
+        self.smart_zoom = QCheckBox("跟随鼠标自动放大")
+        self.smart_zoom.setToolTip(
+            "点击时画面放大 2 倍并平滑跟随鼠标，停止点击 3 秒后恢复；\n"
+            "也可以用快捷键切换放大倍数。放大时只处理视口内的像素")
+        self.smart_zoom.setChecked(self.settings.get_smart_zoom())
+        self.smart_zoom.toggled.connect(self.settings.set_smart_zoom)
+        output_layout.addWidget(self.smart_zoom)
+        
         output_group.setLayout(output_layout)
         return output_group
 
@@ -1540,5 +1946,35 @@ class MainWindow(QMainWindow):
         mouse_btn.clicked.connect(self._show_mouse_settings)
         settings_layout.addWidget(mouse_btn)
         
+        # 打码区域：录制画面中这些区域做马赛克或模糊处理
+        self.privacy_label = QLabel()
+        self._update_privacy_label()
+        settings_layout.addWidget(self.privacy_label)
+        
+        privacy_layout = QHBoxLayout()
+        add_privacy_btn = QPushButton("添加打码区域")
+        add_privacy_btn.clicked.connect(self._add_privacy_region)
+        privacy_layout.addWidget(add_privacy_btn)
+        clear_privacy_btn = QPushButton("清除打码区域")
+        clear_privacy_btn.clicked.connect(self._clear_privacy_regions)
+        privacy_layout.addWidget(clear_privacy_btn)
+        settings_layout.addLayout(privacy_layout)
+        
+        self.privacy_style = QComboBox()
+        self.privacy_style.addItem("马赛克", "mosaic")
+        self.privacy_style.addItem("模糊", "blur")
+        index = self.privacy_style.findData(self.settings.get_privacy_style())
+        self.privacy_style.setCurrentIndex(max(0, index))
+        self.privacy_style.currentIndexChanged.connect(
+            lambda: self.settings.set_privacy_style(self.privacy_style.currentData()))
+        settings_layout.addWidget(self.privacy_style)
+        
+        self.privacy_follow_window = QCheckBox("打码区域跟随所在窗口")
+        self.privacy_follow_window.setToolTip(
+            "开始录制时记下每个打码区域所在的窗口，录制过程中窗口移动时打码区域随之移动")
+        self.privacy_follow_window.setChecked(self.settings.get_privacy_follow_window())
+        self.privacy_follow_window.toggled.connect(self.settings.set_privacy_follow_window)
+        settings_layout.addWidget(self.privacy_follow_window)
+        
         settings_group.setLayout(settings_layout)
         return settings_group 
\ No newline at end of file
@@ -1,9 +1,8 @@
-from PySide6.QtWidgets import QWidget
+from PySide6.QtWidgets import QWidget, QApplication
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QCursor
-import win32gui
-import win32con
+from PySide6.QtGui import QCursor, QPainter, QColor
 from dataclasses import dataclass
+from core.window_tracker import default_backend
 
 @dataclass
 class WindowInfo:
@@ -18,40 +17,41 @@ class WindowSelector(QWidget):
     def __init__(self, callback):
         super().__init__()
         self.callback = callback
+        self.backend = default_backend()
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.setCursor(Qt.CrossCursor)
-        
-        # 设置全屏大小
-        screen = QApplication.primaryScreen().geometry()
+
+        # 覆盖所有显示器，任意显示器上的窗口都可以选择
+        screen = QApplication.primaryScreen().virtualGeometry()
         self.setGeometry(screen)
-        
+
         self.show()
-        
+
+    def paintEvent(self, event):
+        # 完全透明的窗口收不到鼠标点击，画一层几乎不可见的底色
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 1))
+
     def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            # 获取鼠标位置的窗口
+        if event.button() == Qt.LeftButton and self.backend is not None:
+            # 先隐藏选择层，否则取到的是选择层自己
             pos = QCursor.pos()
-            hwnd = win32gui.WindowFromPoint((pos.x(), pos.y()))
-            
-            # 获取窗口信息
-            if hwnd and hwnd != win32gui.GetDesktopWindow():
-                # 获取窗口标题
-                title = win32gui.GetWindowText(hwnd)
-                
-                # 获取窗口位置和大小
-                rect = win32gui.GetWindowRect(hwnd)
-                x = rect[0]
-                y = rect[1]
-                width = rect[2] - rect[0]
-                height = rect[3] - rect[1]
-                
-                # 确保窗口可见且不是最小化
-                if win32gui.IsWindowVisible(hwnd) and not win32gui.IsIconic(hwnd):
-                    window_info = WindowInfo(hwnd, title, x, y, width, height)
-                    self.callback(window_info)
-                    self.close()
-                    return
-                    
+            ratio = self.screen().devicePixelRatio()
+            self.hide()
+            QApplication.processEvents()
+
+            # 获取鼠标位置的顶层窗口，坐标换算为物理像素
+            handle = self.backend.window_at(int(pos.x() * ratio), int(pos.y() * ratio))
+            geometry = self.backend.geometry(handle) if handle else None
+
+            # 确保窗口可见且不是最小化
+            if geometry is not None and not self.backend.is_minimized(handle):
+                x, y, width, height = geometry
+                window_info = WindowInfo(handle, self.backend.title(handle), x, y, width, height)
+                self.callback(window_info)
+                self.close()
+                return
+
         self.callback(None)
-        self.close() 
\ No newline at end of file
+        self.close()